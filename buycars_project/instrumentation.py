@@ -0,0 +1,195 @@
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+from . import metrics as prometheus
+
+# The request being measured on this thread/task (None outside RequestMetricsMiddleware)
+_current = ContextVar('request_metrics', default=None)
+_template_depth = ContextVar('template_depth', default=0)
+
+_NUMBER = re.compile(r"\b\d+(\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST = re.compile(r"\bIN \((?:\s*(?:%s|\?|\$\d+)\s*,?)+\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """SQL with literals and IN-list lengths folded, so the same query from an N+1 loop collapses to one line."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+@dataclass
+class RequestMetrics:
+    view: str = ''
+    method: str = ''
+    path: str = ''
+    status: int = 0
+    total_ms: float = 0.0
+    queries: int = 0
+    db_ms: float = 0.0
+    template_ms: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    # fingerprint -> [count, total ms]
+    sql: dict = field(default_factory=lambda: defaultdict(lambda: [0, 0.0]))
+
+    def top_sql(self, limit=5):
+        """[(fingerprint, count, ms)], most repeated first."""
+        ranked = sorted(self.sql.items(), key=lambda item: (-item[1][0], -item[1][1]))
+        return [(sql, count, ms) for sql, (count, ms) in ranked[:limit]]
+
+    def budget(self):
+        """(max queries, max ms) for this view: QUERY_BUDGETS entry, else the global defaults."""
+        override = settings.QUERY_BUDGETS.get(self.view, {})
+        return override.get('queries', settings.QUERY_BUDGET), override.get('ms', settings.LATENCY_BUDGET_MS)
+
+    def over_budget(self):
+        queries, ms = self.budget()
+        return self.queries > queries or self.total_ms > ms
+
+
+def _execute(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        metrics.queries += 1
+        metrics.db_ms += elapsed
+        entry = metrics.sql[fingerprint(sql)]
+        entry[0] += 1
+        entry[1] += elapsed
+
+
+def note_cache(cache, hit):
+    """Counts a lookup in a named cache: Prometheus totals, plus the current request's counts if there is one."""
+    prometheus.observe_cache(cache, hit)
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+# --- Template time ---
+# Same hook Django's test runner uses (setup_test_environment swaps Template._render);
+# only the outermost render is timed, so {% extends %}/{% include %} aren't counted twice
+_original_render = None
+
+
+def _timed_render(self, context):
+    metrics = _current.get()
+    depth = _template_depth.get()
+    if metrics is None or depth:
+        return _original_render(self, context)
+    token = _template_depth.set(depth + 1)
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        metrics.template_ms += (time.perf_counter() - started) * 1000
+        _template_depth.reset(token)
+
+
+def _install_template_timer():
+    global _original_render
+    if _original_render is None:
+        _original_render = Template._render
+        Template._render = _timed_render
+
+
+# --- Per-view totals for this process ---
+class ViewStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def add(self, metrics):
+        with self.lock:
+            totals = self.views.setdefault(metrics.view, Counter())
+            totals['requests'] += 1
+            totals['over_budget'] += metrics.over_budget()
+            for name in ('total_ms', 'queries', 'db_ms', 'template_ms', 'cache_hits', 'cache_misses'):
+                totals[name] += getattr(metrics, name)
+            totals['max_ms'] = max(totals['max_ms'], metrics.total_ms)
+
+    def snapshot(self):
+        with self.lock:
+            return {view: dict(totals) for view, totals in self.views.items()}
+
+
+view_stats = ViewStats()
+
+
+def report_over_budget(metrics):
+    queries, ms = metrics.budget()
+    print(
+        f"⚠️ Over budget: {metrics.method} {metrics.path} ({metrics.view}) {metrics.status}: "
+        f"{metrics.queries} queries / {metrics.total_ms:.0f} ms (budget {queries} / {ms}); "
+        f"db {metrics.db_ms:.0f} ms, templates {metrics.template_ms:.0f} ms"
+    )
+    for sql, count, sql_ms in metrics.top_sql():
+        print(f"    {count:>5}x {sql_ms:>8.1f} ms  {sql[:300]}")
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures every routed request: latency, DB queries (count, time, repeated SQL),
+    template render time and cache hits/misses. Totals per view are kept in
+    `view_stats` and exported to Prometheus (buycars_project.metrics); requests
+    over their budget (QUERY_BUDGET / LATENCY_BUDGET_MS, per view in
+    QUERY_BUDGETS) are printed with their most repeated SQL.
+    Streaming responses are timed up to the first byte.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _install_template_timer()
+
+    def __call__(self, request):
+        if not settings.REQUEST_METRICS:
+            return self.get_response(request)
+
+        metrics = RequestMetrics(method=request.method, path=request.path)
+        token = _current.set(metrics)
+        prometheus.IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_execute))
+                response = self.get_response(request)
+        finally:
+            metrics.total_ms = (time.perf_counter() - started) * 1000
+            _current.reset(token)
+            prometheus.IN_FLIGHT.dec()
+
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response  # 404s and static files: nothing per-view to attribute
+        metrics.view = match.view_name or match._func_path
+        metrics.status = response.status_code
+        response.request_metrics = metrics  # For the query budget test helper
+        view_stats.add(metrics)
+        prometheus.observe_request(metrics)
+        if metrics.over_budget():
+            report_over_budget(metrics)
+        if settings.REQUEST_METRICS_HEADER:
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_ms:.1f};desc="{metrics.queries} queries", '
+                f'tpl;dur={metrics.template_ms:.1f}, total;dur={metrics.total_ms:.1f}'
+            )
+        return response
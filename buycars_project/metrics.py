@@ -0,0 +1,152 @@
+import hmac
+import os
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import DatabaseError, connection, connections
+from django.db.models import Count
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+# gunicorn.conf.py and run_workers set this up; every process then writes its samples
+# to files in that folder and /metrics adds them up (prometheus_client multiprocess mode)
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+# --- Per-process samples (aggregated across processes at scrape time) ---
+REQUEST_SECONDS = Histogram(
+    'buycars_request_duration_seconds', 'Request latency by URL name', ['view', 'method', 'status'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUEST_QUERIES = Histogram(
+    'buycars_request_queries', 'DB queries per request by URL name', ['view'],
+    buckets=(1, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+REQUEST_DB_SECONDS = Counter('buycars_request_db_seconds', 'Time spent in DB queries by URL name', ['view'])
+REQUEST_TEMPLATE_SECONDS = Counter('buycars_request_template_seconds', 'Time spent rendering templates by URL name', ['view'])
+OVER_BUDGET = Counter('buycars_requests_over_budget', 'Requests over their query/latency budget', ['view'])
+IN_FLIGHT = Gauge('buycars_requests_in_flight', 'Requests being served', multiprocess_mode='livesum')
+DB_CONNECTIONS = Gauge(
+    'buycars_db_connections_open', 'Persistent DB connections held by live processes', ['alias'],
+    multiprocess_mode='livesum',
+)
+CACHE_LOOKUPS = Counter('buycars_cache_lookups', 'Cache lookups by cache and result (hit/miss)', ['cache', 'result'])
+EXTERNAL_SECONDS = Histogram(
+    'buycars_external_call_duration_seconds', 'Latency of calls to outside services', ['service', 'operation'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+EXTERNAL_ERRORS = Counter('buycars_external_call_errors', 'Failed calls to outside services', ['service', 'operation'])
+
+
+def observe_request(metrics):
+    """Called by RequestMetricsMiddleware once per routed request."""
+    view = metrics.view
+    REQUEST_SECONDS.labels(view, metrics.method, f"{metrics.status // 100}xx").observe(metrics.total_ms / 1000)
+    REQUEST_QUERIES.labels(view).observe(metrics.queries)
+    REQUEST_DB_SECONDS.labels(view).inc(metrics.db_ms / 1000)
+    REQUEST_TEMPLATE_SECONDS.labels(view).inc(metrics.template_ms / 1000)
+    if metrics.over_budget():
+        OVER_BUDGET.labels(view).inc()
+    for db in connections.all(initialized_only=True):
+        DB_CONNECTIONS.labels(db.alias).set(1 if db.connection is not None else 0)
+
+
+def observe_cache(cache, hit):
+    CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+@contextmanager
+def track_call(service, operation):
+    """
+    Times a call to an outside service; an exception escaping the block counts
+    as an error (and is re-raised). Use inside the caller's own try/except.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        EXTERNAL_ERRORS.labels(service, operation).inc()
+        raise
+    finally:
+        EXTERNAL_SECONDS.labels(service, operation).observe(time.perf_counter() - started)
+
+
+# --- Read from the database at scrape time (the same for every process) ---
+class BacklogCollector:
+    """Job queue depth, work waiting in other tables, and server-side DB connections."""
+    def describe(self):
+        return []  # Otherwise registering would run collect(), i.e. query the DB at import
+
+    def collect(self):
+        from cars.models import CarImage, MediaTombstone
+        from jobs.models import Job
+        from users.models import EmailDelivery
+
+        try:
+            jobs = GaugeMetricFamily('buycars_jobs', 'Jobs in the queue by state', labels=['state'])
+            now = timezone.now()
+            counts = dict(Job.objects.filter(status__in=Job.ACTIVE).values_list('status').annotate(n=Count('id')))
+            due = Job.objects.filter(status='QUEUED', run_at__lte=now).count()
+            jobs.add_metric(['due'], due)
+            jobs.add_metric(['scheduled'], counts.get('QUEUED', 0) - due)
+            jobs.add_metric(['running'], counts.get('RUNNING', 0))
+            yield jobs
+
+            oldest = Job.objects.filter(status='QUEUED', run_at__lte=now).order_by('run_at').values_list('run_at', flat=True).first()
+            yield GaugeMetricFamily('buycars_jobs_oldest_due_seconds', 'How long the oldest due job has waited',
+                                    value=(now - oldest).total_seconds() if oldest else 0)
+
+            backlog = GaugeMetricFamily('buycars_backlog', 'Rows waiting for background processing', labels=['queue'])
+            backlog.add_metric(['image_processing'], CarImage.objects.filter(processing_status='PENDING').count())
+            backlog.add_metric(['media_gc'], MediaTombstone.objects.count())
+            backlog.add_metric(['email'], EmailDelivery.objects.filter(status='QUEUED').count())
+            yield backlog
+
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT COALESCE(state, 'unknown'), COUNT(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() GROUP BY 1"
+                    )
+                    rows = cursor.fetchall()
+                server = GaugeMetricFamily('buycars_db_server_connections', 'Connections to this database by state', labels=['state'])
+                for state, n in rows:
+                    server.add_metric([state], n)
+                yield server
+        except DatabaseError as e:
+            print(f"Metrics: database unavailable: {e}")
+
+
+_backlog = BacklogCollector()
+if not MULTIPROCESS:
+    REGISTRY.register(_backlog)
+
+
+def render():
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_backlog)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+
+def mark_process_dead(pid):
+    """Lets livesum gauges forget a process that exited (gunicorn child_exit, run_workers)."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint. Needs `Authorization: Bearer <METRICS_TOKEN>`; open without a token only in DEBUG."""
+    token = settings.METRICS_TOKEN
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+            return HttpResponse('Unauthorized', status=401)
+    elif not settings.DEBUG:
+        raise Http404
+    return HttpResponse(render(), content_type=CONTENT_TYPE_LATEST)
@@ -1,5 +1,5 @@
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 import os
 import dj_database_url 
 
@@ -48,11 +48,15 @@ INSTALLED_APPS = [
     'saas.apps.SaasConfig',
     'payments', # Payment App
     'wallet',   # Wallet App
+    'jobs.apps.JobsConfig',  # Background job queue (manage.py run_workers)
+    'profiler.apps.ProfilerConfig',  # Sampled request profiles & flamegraphs (/super-admin/profiles/)
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', # Critical for Static Files
+    'profiler.middleware.ProfilingMiddleware', # Sampled stack profiles (before metrics, to see the query count)
+    'buycars_project.instrumentation.RequestMetricsMiddleware', # Latency, queries & budgets per view
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -115,6 +119,22 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads larger than this (width x height) are rejected before decoding
+IMAGE_MAX_PIXELS = config('IMAGE_MAX_PIXELS', default=60_000_000, cast=int)
+IMAGE_MAX_UPLOAD_BYTES = config('IMAGE_MAX_UPLOAD_BYTES', default=15 * 1024 * 1024, cast=int)
+# Threads per web process that validate and store uploaded photos in parallel (cars.uploads)
+UPLOAD_WORKERS = config('UPLOAD_WORKERS', default=4, cast=int)
+# Bulk inventory import (cars.bulk_import): rows per file, rows per INSERT,
+# cars whose zipped photos are stored at once, and the timeout for photo URLs
+IMPORT_MAX_ROWS = config('IMPORT_MAX_ROWS', default=1000, cast=int)
+IMPORT_BATCH_SIZE = config('IMPORT_BATCH_SIZE', default=500, cast=int)
+IMPORT_WORKERS = config('IMPORT_WORKERS', default=4, cast=int)
+IMPORT_FETCH_TIMEOUT = config('IMPORT_FETCH_TIMEOUT', default=20, cast=int)
+# Stored monthly report PDFs (cars.build_report) older than this are deleted by cars.prune_pdfs
+PDF_KEEP_MONTHS = config('PDF_KEEP_MONTHS', default=3, cast=int)
+# Freshly built PDFs up to this size are sent from memory; bigger or stored ones stream from storage
+PDF_INLINE_MAX_BYTES = config('PDF_INLINE_MAX_BYTES', default=512 * 1024, cast=int)
+
 # Cloudinary Configuration
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': config('CLOUDINARY_CLOUD_NAME', default=''),
@@ -130,6 +150,9 @@ if DEBUG:
         "default": {
             "BACKEND": "django.core.files.storage.FileSystemStorage",
         },
+        "pdfs": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+        },
         "staticfiles": {
             "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
         },
@@ -140,6 +163,10 @@ else:
         "default": {
             "BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage",
         },
+        # Generated PDFs (cars.pdf) are raw files, not images
+        "pdfs": {
+            "BACKEND": "cloudinary_storage.storage.RawMediaCloudinaryStorage",
+        },
         "staticfiles": {
             "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
         },
@@ -158,10 +185,77 @@ LOGOUT_REDIRECT_URL = 'home'
 LOGIN_URL = 'login'
 
 # --- EMAIL CONFIGURATION (SAFE MODE) ---
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=30, cast=int)
 DEFAULT_FROM_EMAIL = 'BuyCars Africa <noreply@buycars.africa>'
 SERVER_EMAIL = 'admin@buycars.africa'  # Where lead notifications go
 
+# Bulk sends (users.mailer): parallel SMTP connections, messages per connection, tries per message
+MAIL_WORKERS = config('MAIL_WORKERS', default=8, cast=int)
+MAIL_BATCH_SIZE = config('MAIL_BATCH_SIZE', default=50, cast=int)
+MAIL_MAX_ATTEMPTS = config('MAIL_MAX_ATTEMPTS', default=3, cast=int)
+MAIL_RETRY_DELAY = config('MAIL_RETRY_DELAY', default=2.0, cast=float)  # Seconds, doubled per retry
+
+# How long a finished report window's numbers are reused across emails/PDFs (users.reports)
+REPORT_MEMO_SECONDS = config('REPORT_MEMO_SECONDS', default=600, cast=int)
+
+# Rows fetched per round trip by the streaming CSV/XLSX exports (cars.exports)
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Where run_benchmarks stores its results for comparing runs (cars.benchmarks)
+BENCHMARK_DIR = config('BENCHMARK_DIR', default=str(BASE_DIR / 'benchmarks'))
+
+# --- REQUEST METRICS (buycars_project.instrumentation) ---
+REQUEST_METRICS = config('REQUEST_METRICS', default=True, cast=bool)
+REQUEST_METRICS_HEADER = config('REQUEST_METRICS_HEADER', default=DEBUG, cast=bool)  # Server-Timing header for browser devtools
+QUERY_BUDGET = config('QUERY_BUDGET', default=50, cast=int)  # Queries per request before it is reported
+LATENCY_BUDGET_MS = config('LATENCY_BUDGET_MS', default=500, cast=int)
+# Per-view overrides, keyed by URL name
+QUERY_BUDGETS = {
+    'dealer_dashboard': {'queries': 80, 'ms': 1000},
+    'admin_dashboard': {'queries': 90, 'ms': 1000},  # Fixed 30-day chart loops, independent of data size
+    'google_inventory_feed': {'ms': 2000},
+}
+# Bearer token Prometheus sends to /metrics (without one the endpoint only answers in DEBUG).
+# Multiprocess mode: set PROMETHEUS_MULTIPROC_DIR in the environment (see gunicorn.conf.py)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# --- SAMPLED PROFILING (profiler app, /super-admin/profiles/) ---
+PROFILE_SAMPLE_RATE = config('PROFILE_SAMPLE_RATE', default=0.0, cast=float)  # Share of requests profiled, e.g. 0.01
+PROFILE_VIEWS = config('PROFILE_VIEWS', default='', cast=Csv())  # URL names the sample rate applies to (empty = all)
+PROFILE_MIN_MS = config('PROFILE_MIN_MS', default=200, cast=int)  # Sampled requests faster than this aren't stored
+PROFILE_INTERVAL_MS = config('PROFILE_INTERVAL_MS', default=5.0, cast=float)  # Time between stack samples
+PROFILE_MAX_SAMPLES = config('PROFILE_MAX_SAMPLES', default=20000, cast=int)  # Per request
+PROFILE_TOKEN_MAX_AGE = config('PROFILE_TOKEN_MAX_AGE', default=3600, cast=int)  # Seconds an X-Profile token stays valid
+PROFILE_KEEP_DAYS = config('PROFILE_KEEP_DAYS', default=14, cast=int)
+
+# --- BACKGROUND JOBS (jobs app, stored in the main database) ---
+JOB_WORKERS = config('JOB_WORKERS', default=2, cast=int)  # Processes started by run_workers
+JOB_POLL_SECONDS = config('JOB_POLL_SECONDS', default=1.0, cast=float)
+JOB_LEASE_SECONDS = config('JOB_LEASE_SECONDS', default=300, cast=int)  # Renewed while running; expired = worker died
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=5, cast=int)
+JOB_RETRY_DELAY = config('JOB_RETRY_DELAY', default=30, cast=int)  # Seconds, doubled per attempt
+JOB_KEEP_DAYS = config('JOB_KEEP_DAYS', default=7, cast=int)
+# Periodic tasks queued by the scheduler (run_scheduler, or the child run_workers starts):
+# task name -> crontab "minute hour day month weekday" in TIME_ZONE. Only one scheduler
+# fires them at a time (PostgreSQL advisory lock), so every worker node can run one.
+JOB_SCHEDULE = {
+    'users.check_expiry': '* * * * *',
+    'cars.collect_media': '17 * * * *',
+    'cars.sweep_images': '*/10 * * * *',   # Photos whose processing job never ran
+    'users.weekly_report': '0 8 * * mon',   # Last 7 days, Monday morning
+    'users.monthly_report': '0 8 1 * *',    # Previous calendar month
+    'wallet.build_checkpoints': '15 2 * * *',  # After the day's last transactions
+    'jobs.prune': '30 3 * * *',
+    'profiler.prune': '45 3 * * *',
+    'cars.prune_pdfs': '0 4 2 * *',    # Once a month, after the new reports are built
+}
+
 # ========================================================
 #             M-PESA DARAJA API CONFIGURATION
 # ========================================================
@@ -182,6 +276,11 @@ else:
 
 MPESA_CALLBACK_URL = config('MPESA_CALLBACK_URL', default='https://buycars-africa.onrender.com/payments/callback/')
 
+# --- WALLET PAYOUTS (B2C) ---
+# Dotted path to the disbursement backend; the local stub never touches Safaricom
+PAYOUT_BACKEND = config('PAYOUT_BACKEND', default='wallet.payouts.LocalB2CBackend')
+PAYOUT_BATCH_SIZE = config('PAYOUT_BATCH_SIZE', default=500, cast=int)
+
 # --- AFRICA'S TALKING SMS CONFIGURATION ---
 AFRICASTALKING_USERNAME = config('AFRICASTALKING_USERNAME', default='sandbox')
 AFRICASTALKING_API_KEY = config('AFRICASTALKING_API_KEY', default='')
@@ -0,0 +1,48 @@
+from django.test import Client
+from django.urls import reverse
+
+
+def measure(url_name, args=None, kwargs=None, client=None, method='get', data=None, **extra):
+    """
+    Requests a named URL through the normal middleware stack and returns
+    (response, RequestMetrics). The test client must not bypass middleware.
+    """
+    client = client or Client()
+    response = getattr(client, method)(reverse(url_name, args=args, kwargs=kwargs), data, **extra)
+    metrics = getattr(response, 'request_metrics', None)
+    if metrics is None:
+        raise AssertionError(
+            f"No metrics for {url_name!r}: is RequestMetricsMiddleware in MIDDLEWARE and REQUEST_METRICS on?"
+        )
+    return response, metrics
+
+
+def assert_query_budget(url_name, queries=None, ms=None, args=None, kwargs=None, client=None, method='get', data=None, **extra):
+    """
+    Fails if the named URL runs more queries (or takes longer) than its budget.
+    Budgets default to the view's QUERY_BUDGETS entry / QUERY_BUDGET; pass ms=None
+    to skip the latency check (the default, since test timings are noisy).
+
+        assert_query_budget('dealer_showroom', queries=10, args=['bench_dealer_00000'])
+    """
+    response, metrics = measure(url_name, args, kwargs, client, method, data, **extra)
+    default_queries, _ = metrics.budget()
+    queries = default_queries if queries is None else queries
+    problems = []
+    if metrics.queries > queries:
+        problems.append(f"{metrics.queries} queries (budget {queries})")
+    if ms is not None and metrics.total_ms > ms:
+        problems.append(f"{metrics.total_ms:.0f} ms (budget {ms})")
+    if problems:
+        lines = [f"{url_name} ({metrics.view}) over budget: {', '.join(problems)}. Most repeated SQL:"]
+        lines += [f"  {count}x  {sql}" for sql, count, _ in metrics.top_sql()]
+        raise AssertionError('\n'.join(lines))
+    return response
+
+
+class QueryBudgetMixin:
+    """For TestCase classes: self.assertQueryBudget('home', queries=5)."""
+    def assertQueryBudget(self, url_name, queries=None, ms=None, **kwargs):
+        kwargs.setdefault('client', self.client)
+        return assert_query_budget(url_name, queries=queries, ms=ms, **kwargs)
+
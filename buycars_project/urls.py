@@ -6,6 +6,7 @@ from cars import views as car_views
 from users import views as user_views 
 from django.conf import settings
 from django.conf.urls.static import static
+from buycars_project.metrics import metrics_view
 
 # --- SEO IMPORTS ---
 from django.contrib.sitemaps.views import sitemap
@@ -24,12 +25,17 @@ urlpatterns = [
     path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
     path('robots.txt', TemplateView.as_view(template_name="robots.txt", content_type="text/plain")),
     
+    # --- PROMETHEUS SCRAPE ENDPOINT ---
+    path('metrics', metrics_view, name='metrics'),
+
     # --- GOOGLE MERCHANT FEED ---
     path('feeds/google-cars.xml', car_views.google_inventory_feed, name='google_inventory_feed'),
 
     # --- SUPER ADMIN (CEO Dashboard) ---
     path('super-admin/', user_views.admin_dashboard, name='admin_dashboard'),
     path('super-admin/verify/<int:user_id>/', user_views.verify_dealer, name='verify_dealer'),
+    path('super-admin/export/payments/', user_views.export_payments, name='export_payments'),
+    path('super-admin/profiles/', include('profiler.urls')),
     path('platform/', car_views.platform_dashboard, name='platform_dashboard'), 
 
     # --- PASSWORD RESET ROUTES ---
@@ -91,7 +97,10 @@ urlpatterns = [
     # --- DEALER SIDE ---
     path('dashboard/', car_views.dealer_dashboard, name='dealer_dashboard'),
     path('dashboard/add/', car_views.add_car, name='add_car'), 
+    path('dashboard/import/', car_views.import_inventory, name='import_inventory'),
+    path('dashboard/import/template/', car_views.import_template, name='import_template'),
     path('dashboard/report/', car_views.download_report, name='download_report'),
+    path('dashboard/export/<str:kind>/', car_views.export_data, name='export_data'),
     path('dashboard/tools/agreement/', car_views.create_agreement, name='create_agreement'),
     
     # --- DEALER ACADEMY ---
@@ -109,6 +118,7 @@ urlpatterns = [
     path('dashboard/edit/<int:car_id>/', car_views.edit_car, name='edit_car'),
     path('dashboard/delete/<int:car_id>/', car_views.delete_car, name='delete_car'),
     path('dashboard/car/<int:car_id>/mark-sold/', car_views.mark_as_sold, name='mark_as_sold'),
+    path('dashboard/cars/bulk/', car_views.bulk_car_action, name='bulk_car_action'),
 
     # --- IMAGE MANAGEMENT ---
     path('dashboard/car/<int:car_id>/image/<int:image_id>/set-main/', car_views.set_main_image, name='set_main_image'),
@@ -1,9 +1,11 @@
 from django.contrib import admin
-from .models import Car, CarImage, CarView, Lead, Booking, SearchTerm
+from .models import Car, CarImage, CarView, Lead, Booking, SearchTerm, MediaBlob, MediaTombstone
 
 class CarImageInline(admin.TabularInline):
     model = CarImage
     extra = 1
+    fields = ('image', 'is_main', 'processing_status', 'duplicate_of', 'is_recycled')
+    readonly_fields = ('processing_status', 'duplicate_of', 'is_recycled')
 
 @admin.register(Car)
 class CarAdmin(admin.ModelAdmin):
@@ -52,6 +54,35 @@ class BookingAdmin(admin.ModelAdmin):
     search_fields = ('car__make', 'car__model', 'renter__username', 'renter__email')
     readonly_fields = ('total_price', 'created_at', 'updated_at')
 
+@admin.register(CarImage)
+class CarImageAdmin(admin.ModelAdmin):
+    # Recycled = the same photo is listed by another dealer; worth a look for fraud
+    list_display = ('id', 'car', 'dealer', 'duplicate_of', 'is_recycled', 'processing_status', 'uploaded_at')
+    list_filter = ('is_recycled', 'processing_status')
+    list_select_related = ('car__dealer', 'duplicate_of__car')
+    search_fields = ('car__make', 'car__model', 'car__dealer__username')
+    raw_id_fields = ('car', 'duplicate_of')
+    readonly_fields = ('phash', 'phash_band0', 'phash_band1', 'phash_band2', 'phash_band3', 'renditions', 'uploaded_at')
+
+    @admin.display(ordering='car__dealer__username')
+    def dealer(self, obj):
+        return obj.car.dealer
+
+# --- MEDIA STORAGE ---
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'refcount', 'size', 'created_at')
+    search_fields = ('name', 'digest')
+    readonly_fields = ('digest', 'name', 'size', 'refcount', 'created_at')
+
+@admin.register(MediaTombstone)
+class MediaTombstoneAdmin(admin.ModelAdmin):
+    # Deleted by `manage.py collect_media`; rows with attempts left over need a look
+    list_display = ('name', 'attempts', 'last_error', 'created_at')
+    list_filter = ('attempts',)
+    search_fields = ('name',)
+
 # --- ANALYTICS ---
 
 @admin.register(CarView)
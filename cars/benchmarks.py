@@ -0,0 +1,207 @@
+import json
+import statistics
+import subprocess
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from users.reports import DealerReport
+from .models import Car, CarImage, CarView, Lead
+from .seeding import existing_dealers
+
+User = get_user_model()
+
+# Changes smaller than this are noise, whatever the percentage
+NOISE_FLOOR_MS = 5
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Dataset:
+    """What the cases run against: the seeded dataset's busiest dealer, a sample of cars and logged-in clients."""
+    def __init__(self):
+        dealer = (existing_dealers().annotate(n=Count('cars')).order_by('-n', 'id')
+                  .select_related('dealer_profile').first())
+        if dealer is None:
+            raise BenchmarkError("No benchmark dataset. Run seed_benchmark first.")
+        self.dealer = dealer
+        self.car_ids = list(Car.objects.filter(dealer__in=existing_dealers(), status='AVAILABLE')
+                            .order_by('id').values_list('id', flat=True)[:50])
+        self.anonymous = Client()
+        self.as_dealer = Client()
+        self.as_dealer.force_login(dealer)
+        admin = User.objects.create(username='bench_admin', is_superuser=True, is_staff=True)
+        self.as_admin = Client()
+        self.as_admin.force_login(admin)
+        self._next_car = 0
+
+    def next_car(self):
+        self._next_car = (self._next_car + 1) % len(self.car_ids)
+        return self.car_ids[self._next_car]
+
+
+def fingerprint():
+    """Row counts that identify a dataset; results are only compared between equal fingerprints."""
+    return {
+        'vendor': connection.vendor,
+        'dealers': existing_dealers().count(),
+        'cars': Car.objects.count(),
+        'photos': CarImage.objects.count(),
+        'views': CarView.objects.count(),
+        'leads': Lead.objects.count(),
+    }
+
+
+def _get(client, path):
+    def request(data):
+        response = client(data).get(path(data) if callable(path) else path)
+        if response.status_code != 200:
+            raise BenchmarkError(f"GET {response.request['PATH_INFO']} returned {response.status_code}")
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+    return request
+
+
+def _command(name, **options):
+    return lambda data: call_command(name, stdout=StringIO(), **options)
+
+
+def _weekly_report(data):
+    return list(DealerReport(timezone.now() - timedelta(days=7)).items())
+
+
+# name -> callable(Dataset); each run is rolled back, so writes (view counters, downgrades) never accumulate
+CASES = {
+    'home': _get(lambda d: d.anonymous, '/'),
+    'search': _get(lambda d: d.anonymous, '/?q=toyota'),
+    'filter': _get(lambda d: d.anonymous, '/?make=Toyota&region=NBI'),
+    'car_detail': _get(lambda d: d.anonymous, lambda d: f"/car/{d.next_car()}/"),
+    'brands': _get(lambda d: d.anonymous, '/brands/'),
+    'showroom': _get(lambda d: d.anonymous, lambda d: f"/dealer/{d.dealer.username}/"),
+    'google_feed': _get(lambda d: d.anonymous, '/feeds/google-cars.xml'),
+    'dealer_dashboard': _get(lambda d: d.as_dealer, '/dashboard/'),
+    'export_inventory': _get(lambda d: d.as_dealer, '/dashboard/export/inventory/?format=csv'),
+    'admin_dashboard': _get(lambda d: d.as_admin, '/super-admin/'),
+    'check_expiry': _command('check_expiry'),
+    'weekly_report': _weekly_report,
+}
+
+
+def _percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def run(names=None, repeat=5, warmup=1, log=print):
+    """Times each case `repeat` times (after `warmup` untimed runs). Returns {name: stats}."""
+    names = names or list(CASES)
+    unknown = set(names) - set(CASES)
+    if unknown:
+        raise BenchmarkError(f"Unknown case(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    with override_settings(ALLOWED_HOSTS=['*']), transaction.atomic():
+        data = Dataset()
+        for name in names:
+            case, timings, queries = CASES[name], [], []
+            for attempt in range(warmup + repeat):
+                counter = QueryCounter()
+                with transaction.atomic(), connection.execute_wrapper(counter):
+                    started = time.perf_counter()
+                    case(data)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    transaction.set_rollback(True)
+                if attempt >= warmup:
+                    timings.append(elapsed)
+                    queries.append(counter.count)
+            results[name] = {
+                'median_ms': round(statistics.median(timings), 2),
+                'p95_ms': round(_percentile(timings, 0.95), 2),
+                'min_ms': round(min(timings), 2),
+                'queries': max(queries),
+            }
+            log(name, results[name])
+        transaction.set_rollback(True)  # The admin login and sessions go too
+    return results
+
+
+# --- Stored results ---
+def results_dir():
+    return Path(settings.BENCHMARK_DIR)
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=settings.BASE_DIR, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def save(results, dataset, label=''):
+    folder = results_dir()
+    folder.mkdir(parents=True, exist_ok=True)
+    record = {
+        'run_at': timezone.now().isoformat(), 'label': label, 'commit': _commit(),
+        'dataset': dataset, 'cases': results,
+    }
+    path = folder / f"{timezone.now():%Y%m%d-%H%M%S}{'-' + label if label else ''}.json"
+    path.write_text(json.dumps(record, indent=2))
+    return path
+
+
+def load(path):
+    return json.loads(Path(path).read_text())
+
+
+def latest(dataset, exclude=None):
+    """Most recent stored run against an identical dataset, or None."""
+    for path in sorted(results_dir().glob('*.json'), reverse=True):
+        if exclude and path.resolve() == Path(exclude).resolve():
+            continue
+        try:
+            record = load(path)
+        except (OSError, ValueError):
+            continue
+        if record.get('dataset') == dataset:
+            return path, record
+    return None
+
+
+def compare(results, baseline, threshold):
+    """
+    [(name, stats, change or None, regressed)] where change is the median's relative
+    difference from the baseline. Slower by more than `threshold` (and NOISE_FLOOR_MS),
+    or more queries than before, counts as a regression.
+    """
+    rows = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if not before:
+            rows.append((name, stats, None, False))
+            continue
+        change = (stats['median_ms'] - before['median_ms']) / max(before['median_ms'], 1e-9)
+        slower = change > threshold and stats['median_ms'] - before['median_ms'] > NOISE_FLOOR_MS
+        rows.append((name, stats, change, slower or stats['queries'] > before['queries']))
+    return rows
@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+from django.db.models.functions import Round
+from users.models import DealerProfile
+from .models import Car
+from .signals import batched_release
+
+MAX_CARS = 500  # Per request
+DEALER_STATUSES = ('AVAILABLE', 'RESERVED', 'SOLD')  # Same choices as edit_car
+LOCKED_STATUSES = ('AUCTION',)  # Live auctions are left alone by bulk status changes and deletes
+
+
+class BulkActionError(ValueError):
+    """The whole batch is rejected (bad input, or it would break a plan limit)."""
+
+
+@dataclass
+class BulkResult:
+    action: str
+    updated: int
+    skipped: int  # Selected cars that weren't changed (not the dealer's, in auction, not eligible)
+    message: str
+
+
+def parse_ids(raw):
+    try:
+        ids = {int(value) for value in raw}
+    except (TypeError, ValueError):
+        raise BulkActionError("Car ids must be numbers.")
+    if not ids:
+        raise BulkActionError("Select at least one car.")
+    if len(ids) > MAX_CARS:
+        raise BulkActionError(f"At most {MAX_CARS} cars per action.")
+    return ids
+
+
+def _price(value):
+    """'2500000' sets the price; '-5%' / '+10%' changes it relative to each car's price."""
+    text = str(value).replace(',', '').strip()
+    relative = text.endswith('%')
+    try:
+        number = Decimal(text.rstrip('%'))
+    except InvalidOperation:
+        raise BulkActionError(f"{value!r} is not a price or a percentage.")
+    if not number.is_finite():
+        raise BulkActionError(f"{value!r} is not a price or a percentage.")
+    if relative:
+        if not Decimal('-90') <= number <= Decimal('100'):
+            raise BulkActionError("Price changes must be between -90% and +100%.")
+        factor = Value(1 + number / 100, output_field=DecimalField(max_digits=6, decimal_places=4))
+        # Whole shillings, computed in the database for every selected car at once
+        return ExpressionWrapper(Round(F('price') * factor), output_field=Car._meta.get_field('price'))
+    if not Decimal('0') < number < Decimal('1e10'):
+        raise BulkActionError("Enter a price above zero.")
+    return number.quantize(Decimal('0.01'))
+
+
+def apply(dealer, action, ids, value=None, car_limit=None, featured_limit=None):
+    """
+    Runs one action on many of `dealer`'s cars with set-based queries:
+      status  - value 'AVAILABLE' | 'RESERVED' | 'SOLD' (one UPDATE)
+      price   - value '2500000' or '-5%' (one UPDATE, relative prices computed in SQL)
+      feature - value true/false (one UPDATE)
+      delete  - no value (one cascade; photo references released in one go)
+    Plan limits (pass the dealer's profile.plan_limits) are checked once for the whole
+    batch: relisting more AVAILABLE cars than car_limit, HIDDEN ones included, or
+    featuring more than featured_limit, rejects the batch. HIDDEN cars only leave
+    HIDDEN as AVAILABLE, so RESERVED/SOLD can't put them back on show past the limit.
+    Ids that aren't the dealer's are ignored (counted as skipped).
+    """
+    ids = parse_ids(ids)
+    with transaction.atomic():
+        # Serializes this dealer's batches, so two requests can't both pass a limit check
+        DealerProfile.objects.select_for_update().filter(user=dealer).first()
+        cars = Car.objects.filter(dealer=dealer, pk__in=ids)
+
+        if action == 'status':
+            if value not in DEALER_STATUSES:
+                raise BulkActionError(f"Status must be one of {', '.join(DEALER_STATUSES)}.")
+            targets = cars.exclude(status__in=LOCKED_STATUSES).exclude(status=value)
+            if value != 'AVAILABLE':
+                targets = targets.exclude(status='HIDDEN')
+            if value == 'AVAILABLE' and car_limit is not None:
+                # Every car going live counts, including HIDDEN ones check_expiry took offline
+                live = Car.objects.filter(dealer=dealer, status='AVAILABLE').count()
+                adding = targets.count()
+                if live + adding > car_limit:
+                    hidden = targets.filter(status='HIDDEN').count()
+                    raise BulkActionError(
+                        f"Your plan allows {car_limit} live listings; you have {live} and selected {adding} more"
+                        f"{f' ({hidden} hidden when your plan ran out)' if hidden else ''}. Upgrade to list them all."
+                    )
+            updated = targets.update(status=value)
+            message = f"{updated} car(s) marked {value.lower()}."
+
+        elif action == 'price':
+            updated = cars.update(price=_price(value))
+            message = f"Updated the price of {updated} car(s)."
+
+        elif action == 'feature':
+            on = value in (True, 'true', 'True', '1', 1, 'on')
+            if on:
+                targets = cars.filter(status='AVAILABLE', is_featured=False)
+                if featured_limit is not None:
+                    featured = Car.objects.filter(dealer=dealer, is_featured=True).count()
+                    adding = targets.count()
+                    if featured + adding > featured_limit:
+                        raise BulkActionError(
+                            f"Your plan allows {featured_limit} featured car(s); you have {featured} and selected {adding} more."
+                        )
+            else:
+                targets = cars.filter(is_featured=True)
+            updated = targets.update(is_featured=on)
+            message = f"{'Featured' if on else 'Unfeatured'} {updated} car(s)."
+
+        elif action == 'delete':
+            targets = cars.exclude(status__in=LOCKED_STATUSES)
+            with batched_release():
+                _, per_model = targets.delete()
+            updated = per_model.get(Car._meta.label, 0)
+            message = f"Removed {updated} car(s)."
+
+        else:
+            raise BulkActionError(f"Unknown action {action!r}.")
+
+    return BulkResult(action=action, updated=updated, skipped=len(ids) - updated, message=message)
+
+
+def set_status(dealer, car, value, car_limit=None):
+    """
+    apply('status') for one car (edit_car, mark_as_sold), with the reason spelled
+    out instead of a silent skip when the car can't take the new status.
+    """
+    if car.status in LOCKED_STATUSES:
+        raise BulkActionError("This car is in a live auction; its status changes when the auction ends.")
+    if car.status == 'HIDDEN' and value != 'AVAILABLE':
+        raise BulkActionError("This car was hidden when your plan ran out; it can only be relisted as Available.")
+    return apply(dealer, 'status', [car.pk], value, car_limit=car_limit)
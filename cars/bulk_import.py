@@ -0,0 +1,448 @@
+import csv
+import io
+import ipaddress
+import os
+import re
+import socket
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urljoin, urlparse
+from xml.etree import ElementTree
+import requests
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections, transaction
+from django.db.models import Value
+from django.db.models.functions import Replace, Upper
+from django.utils import timezone
+from jobs.queue import enqueue
+from . import uploads
+from .models import Car
+
+# Also accepts the column names of the inventory export (cars.exports), so an export can be edited and re-imported
+HEADER_ALIASES = {
+    'registration': 'registration_number', 'reg': 'registration_number', 'reg_no': 'registration_number',
+    'listing': 'listing_type', 'rent_day': 'rent_price_per_day', 'rent_price': 'rent_price_per_day',
+    'min_hire': 'min_hire_days', 'engine': 'engine_cc', 'fuel': 'fuel_type', 'body': 'body_type',
+    'drive': 'drive_type', 'colour': 'color', 'photo': 'photos', 'images': 'photos',
+}
+TEMPLATE_HEADER = ['Registration', 'Make', 'Model', 'Year', 'Price', 'Mileage', 'Engine CC', 'Color', 'Condition',
+                   'Transmission', 'Fuel', 'Body', 'Drive', 'City', 'Listing', 'Rent Price', 'Min Hire Days',
+                   'Description', 'Photos']
+TEMPLATE_EXAMPLE = ['KDA 123X', 'Toyota', 'Harrier', 2017, 3250000, 85000, 2000, 'Pearl White', 'Foreign Used',
+                    'Automatic', 'Petrol', 'SUV', '4WD', 'Nairobi', 'For Sale', '', '',
+                    'Clean unit, full service history', 'harrier-front.jpg; harrier-side.jpg']
+
+
+@dataclass
+class ImportResult:
+    created: list = field(default_factory=list)  # (line, car)
+    errors: list = field(default_factory=list)   # (line, reason): row not imported
+    notes: list = field(default_factory=list)    # (line, reason): imported, but a photo had a problem
+    photos_added: int = 0
+    photos_queued: int = 0                       # URLs handed to the job workers to download
+
+    @property
+    def report(self):
+        """Per-row report, spreadsheet line numbers (header = line 1)."""
+        rows = [(line, 'imported', f"#{car.pk} {car}") for line, car in self.created]
+        rows += [(line, 'error', reason) for line, reason in self.errors]
+        rows += [(line, 'photo', reason) for line, reason in self.notes]
+        return sorted(rows, key=lambda row: row[0])
+
+
+class SheetError(ValueError):
+    """The file as a whole can't be imported (unreadable, missing columns, too many rows)."""
+
+
+# --- Reading the sheet ---
+
+def read_sheet(upload):
+    """Returns the rows of a CSV or XLSX upload as lists of strings (header first)."""
+    data = upload.read()
+    if data[:2] == b'PK':
+        try:
+            return _read_xlsx(io.BytesIO(data))
+        except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+            raise SheetError("That Excel file could not be read. Save it as .xlsx or CSV and try again.")
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = data.decode('cp1252', errors='replace')  # CSV saved by Excel on Windows
+    return list(csv.reader(io.StringIO(text)))
+
+
+def _tag(element):
+    return element.tag.rsplit('}', 1)[-1]
+
+
+def _column_index(ref):
+    index = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+
+def _read_xlsx(fileobj):
+    """First worksheet of an .xlsx, streamed with iterparse (no openpyxl needed)."""
+    book = zipfile.ZipFile(fileobj)
+    shared = []
+    if 'xl/sharedStrings.xml' in book.namelist():
+        for _, element in ElementTree.iterparse(book.open('xl/sharedStrings.xml')):
+            if _tag(element) == 'si':
+                shared.append(''.join(node.text or '' for node in element.iter() if _tag(node) == 't'))
+                element.clear()
+
+    workbook = ElementTree.parse(book.open('xl/workbook.xml')).getroot()
+    first = next(node for node in workbook.iter() if _tag(node) == 'sheet')
+    rel_id = next(value for key, value in first.attrib.items() if key.endswith('}id'))
+    rels = ElementTree.parse(book.open('xl/_rels/workbook.xml.rels')).getroot()
+    target = next(node.get('Target') for node in rels if node.get('Id') == rel_id)
+    path = target.lstrip('/') if target.startswith('/') else f"xl/{target}"
+
+    rows = []
+    for _, element in ElementTree.iterparse(book.open(path)):
+        if _tag(element) != 'row':
+            continue
+        row = []
+        for position, cell in enumerate(node for node in element if _tag(node) == 'c'):
+            index = _column_index(cell.get('r', '')) if cell.get('r') else position
+            kind = cell.get('t')
+            if kind == 'inlineStr':
+                value = ''.join(node.text or '' for node in cell.iter() if _tag(node) == 't')
+            else:
+                value = next((node.text or '' for node in cell if _tag(node) == 'v'), '')
+                if kind == 's' and value:
+                    value = shared[int(value)]
+                elif kind == 'b':
+                    value = 'TRUE' if value == '1' else 'FALSE'
+            row.extend([''] * (index + 1 - len(row)))
+            row[index] = value
+        rows.append(row)
+        element.clear()
+    return rows
+
+
+# --- Column parsers: raw text -> value, or ValueError with a user-facing reason ---
+
+def _text(max_length):
+    def parse(raw):
+        if len(raw) > max_length:
+            raise ValueError(f"longer than {max_length} characters")
+        return raw
+    return parse
+
+
+def _number(raw):
+    try:
+        value = Decimal(raw.replace(',', '').replace('KES', '').replace('Ksh', '').strip())
+    except InvalidOperation:
+        value = None
+    if value is None or not value.is_finite():
+        raise ValueError(f"{raw!r} is not a number")
+    return value
+
+
+def _integer(low, high):
+    def parse(raw):
+        value = _number(raw)
+        if value != value.to_integral_value():
+            raise ValueError(f"{raw!r} is not a whole number")
+        if not low <= value <= high:
+            raise ValueError(f"must be between {low} and {high}")
+        return int(value)
+    return parse
+
+
+def _money(raw):
+    value = _number(raw)
+    if value <= 0 or value >= 10 ** 10:
+        raise ValueError(f"{raw!r} is not a valid amount")
+    return value.quantize(Decimal('0.01'))
+
+
+def _choice(choices):
+    # Accepts the stored value or the label, any case: 'FOREIGN', 'Foreign Used', 'foreign used'
+    lookup = {}
+    for value, label in choices:
+        lookup[value.lower()] = lookup[label.lower()] = value
+
+    def parse(raw):
+        try:
+            return lookup[raw.lower()]
+        except KeyError:
+            raise ValueError(f"{raw!r} is not one of: {', '.join(value for value, _ in choices)}")
+    return parse
+
+
+def _photos(raw):
+    # Separated by ; or | or new lines (file names may contain spaces)
+    return [ref.strip() for ref in re.split(r'[;|\n]+', raw) if ref.strip()]
+
+
+def _fields():
+    # (required, parser) per Car field, in the order errors are reported
+    return {
+        'registration_number': (False, _text(20)),
+        'make': (True, _text(50)),
+        'model': (True, _text(50)),
+        'year': (True, _integer(1950, timezone.now().year + 1)),
+        'price': (True, _money),
+        'mileage': (False, _integer(0, 3_000_000)),
+        'engine_cc': (False, _integer(50, 20_000)),
+        'color': (False, _text(50)),
+        'condition': (False, _choice(Car.CONDITION_CHOICES)),
+        'transmission': (False, _choice(Car.TRANSMISSION_CHOICES)),
+        'fuel_type': (False, _choice(Car.FUEL_CHOICES)),
+        'body_type': (False, _choice(Car.BODY_TYPE_CHOICES)),
+        'drive_type': (False, _choice(Car.DRIVE_TYPE_CHOICES)),
+        'city': (False, _choice(Car.CITY_CHOICES)),
+        'listing_type': (False, _choice(Car.LISTING_TYPE_CHOICES)),
+        'rent_price_per_day': (False, _money),
+        'min_hire_days': (False, _integer(1, 365)),
+        'description': (False, str),
+        'photos': (False, _photos),
+    }
+
+
+def _normalize_header(name):
+    key = re.sub(r'\(.*?\)', '', name).strip().lower()
+    key = re.sub(r'[\s/\-]+', '_', key)
+    return HEADER_ALIASES.get(key, key)
+
+
+def _compact_reg(value):
+    return ''.join(value.split()).upper()
+
+
+def validate(dealer, rows):
+    """
+    Checks every row column by column (one parser per column, then one query for
+    duplicate registrations) and returns ([(line, values)], [(line, reason)]).
+    """
+    if not rows:
+        raise SheetError("The file is empty.")
+    fields = _fields()
+    columns = {}
+    for index, name in enumerate(rows[0]):
+        key = _normalize_header(name)
+        if key in fields:
+            columns.setdefault(key, index)
+    missing = [name for name, (required, _) in fields.items() if required and name not in columns]
+    if missing:
+        raise SheetError(f"Missing column(s): {', '.join(missing)}. Download the template to see the expected layout.")
+
+    body = [(line, row) for line, row in enumerate(rows[1:], start=2) if any(cell.strip() for cell in row)]
+    if len(body) > settings.IMPORT_MAX_ROWS:
+        raise SheetError(f"{len(body)} rows is more than {settings.IMPORT_MAX_ROWS} per file. Split it and import each part.")
+
+    values = [{} for _ in body]
+    problems = [[] for _ in body]
+    for name, (required, parse) in fields.items():
+        index = columns.get(name)
+        label = name.replace('_', ' ')
+        for i, (_, row) in enumerate(body):
+            raw = row[index].strip() if index is not None and index < len(row) else ''
+            if not raw:
+                if required:
+                    problems[i].append(f"{label} is required")
+                continue
+            try:
+                values[i][name] = parse(raw)
+            except ValueError as e:
+                problems[i].append(f"{label}: {e}")
+
+    # Across rows and against the dealer's live listings (same rule as add_car)
+    regs = [_compact_reg(v['registration_number']) if v.get('registration_number') else None for v in values]
+    repeats = Counter(reg for reg in regs if reg)
+    taken = set(
+        Car.objects.filter(dealer=dealer, status='AVAILABLE', registration_number__isnull=False)
+        .annotate(compact=Upper(Replace('registration_number', Value(' '), Value(''))))
+        .filter(compact__in=list(repeats)).values_list('compact', flat=True)
+    ) if repeats else set()
+    for i, v in enumerate(values):
+        if regs[i] and regs[i] in taken:
+            problems[i].append(f"registration {v['registration_number']} is already listed")
+        elif regs[i] and repeats[regs[i]] > 1:
+            problems[i].append(f"registration {v['registration_number']} appears more than once in this file")
+        if v.get('listing_type') in ('RENT', 'BOTH') and not v.get('rent_price_per_day'):
+            problems[i].append("rent price is required for cars for hire")
+
+    valid = [(line, v) for (line, _), v, p in zip(body, values, problems) if not p]
+    errors = [(line, '; '.join(p)) for (line, _), p in zip(body, problems) if p]
+    return valid, errors
+
+
+# --- Photos ---
+
+class FetchError(Exception):
+    def __init__(self, message, transient=False):
+        super().__init__(message)
+        self.transient = transient  # Worth retrying later (timeouts, 5xx)
+
+
+def _check_public(host):
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror:
+        raise FetchError(f"{host} could not be found", transient=True)
+    for address in addresses:
+        ip = ipaddress.ip_address(address)
+        if not ip.is_global or ip.is_multicast:
+            raise FetchError(f"{host} is not a public address")
+
+
+def download(url):
+    """
+    GETs one photo URL into an in-memory upload, capped at IMAGE_MAX_UPLOAD_BYTES.
+    Only public http(s) hosts are fetched, checked again on every redirect.
+    """
+    for _ in range(4):
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            raise FetchError("not an http(s) link")
+        _check_public(parsed.hostname)
+        try:
+            response = requests.get(url, stream=True, allow_redirects=False, timeout=settings.IMPORT_FETCH_TIMEOUT,
+                                    headers={'User-Agent': 'BuyCars-Importer/1.0'})
+        except requests.RequestException as e:
+            raise FetchError(f"could not be downloaded ({type(e).__name__})", transient=True)
+        with response:
+            if response.is_redirect:
+                url = urljoin(url, response.headers.get('Location', ''))
+                continue
+            if response.status_code != 200:
+                raise FetchError(f"returned HTTP {response.status_code}", transient=response.status_code >= 500)
+            content = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                content += chunk
+                if len(content) > settings.IMAGE_MAX_UPLOAD_BYTES:
+                    raise FetchError(f"larger than {settings.IMAGE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+        name = os.path.basename(parsed.path) or 'photo.jpg'
+        return SimpleUploadedFile(name, bytes(content))
+    raise FetchError("too many redirects")
+
+
+def fetch_car_photos(car_id, urls, limit):
+    """
+    Job body for URL photos (cars.fetch_photos): downloads in parallel, then adds them
+    like a normal upload. Raises if any download failed transiently so the queue retries;
+    photos that already made it are recognised as repeats and skipped on the retry.
+    """
+    car = Car.objects.filter(pk=car_id).first()
+    if car is None:
+        return
+    pool = uploads.get_pool()
+    files, transient = [], []
+    for url, future in [(url, pool.submit(download, url)) for url in urls]:
+        try:
+            files.append(future.result())
+        except FetchError as e:
+            print(f"Import photo {url} for car #{car_id}: {e}")
+            if e.transient:
+                transient.append(url)
+    if files:
+        uploads.add_images(car, files, limit=max(limit - car.images.count(), 0))
+    if transient:
+        raise RuntimeError(f"{len(transient)} photo download(s) failed; will retry")
+
+
+def _zip_index(archive):
+    index = {}
+    for info in archive.infolist():
+        name = info.filename.replace('\\', '/')
+        if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('.'):
+            continue
+        index.setdefault(os.path.basename(name).lower(), info)
+    return index
+
+
+def _add_zip_photos(car, infos, archive, limit):
+    try:
+        files = [SimpleUploadedFile(os.path.basename(info.filename), archive.read(info)) for info in infos]
+        return uploads.add_images(car, files, limit=limit)
+    finally:
+        connections.close_all()  # This ran on an import thread with its own connection
+
+
+# --- The import ---
+
+def import_listings(dealer, sheet, photos_zip=None, car_limit=None, image_limit=None):
+    """
+    Creates a listing per valid row of `sheet` (CSV/XLSX upload) for `dealer`:
+      1. rows are parsed and validated column by column, duplicates in one query,
+      2. up to the plan's remaining car slots are inserted with bulk_create,
+      3. photos named in the zip are added for several cars at once; photo URLs
+         are queued for the job workers, so the request doesn't wait on other sites.
+    Raises SheetError for a file that can't be imported at all.
+    """
+    result = ImportResult()
+    valid, result.errors = validate(dealer, read_sheet(sheet))
+    try:
+        archive = zipfile.ZipFile(photos_zip) if photos_zip else None
+    except zipfile.BadZipFile:
+        raise SheetError("The photos file is not a valid .zip archive.")
+
+    if car_limit is not None:
+        # Only live listings count, as in check_expiry: SOLD, RESERVED and HIDDEN cars don't use a slot
+        remaining = max(car_limit - Car.objects.filter(dealer=dealer, status='AVAILABLE').count(), 0)
+        for line, _ in valid[remaining:]:
+            result.errors.append((line, f"plan limit reached ({car_limit} live cars); upgrade to import more"))
+        valid = valid[:remaining]
+        result.errors.sort()
+
+    cars = []
+    for line, values in valid:
+        values = dict(values)
+        values.pop('photos', None)
+        if values.get('registration_number'):
+            values['registration_number'] = ' '.join(values['registration_number'].upper().split())
+        car = Car(dealer=dealer, status='AVAILABLE', **values)
+        car.normalize_names()  # bulk_create skips Car.save()
+        cars.append(car)
+    with transaction.atomic():
+        Car.objects.bulk_create(cars, batch_size=settings.IMPORT_BATCH_SIZE)
+    result.created = [(line, car) for (line, _), car in zip(valid, cars)]
+
+    # Photos, once the cars are committed (threads and job workers use other connections)
+    index = _zip_index(archive) if archive else {}
+    from_zip = []
+    for (line, values), car in zip(valid, cars):
+        urls, infos = [], []
+        for ref in values.get('photos', []):
+            if ref.lower().startswith(('http://', 'https://')):
+                urls.append(ref)
+            elif ref.lower() not in index:
+                result.notes.append((line, f"{ref} is not in the photo zip"))
+            elif index[ref.lower()].file_size > settings.IMAGE_MAX_UPLOAD_BYTES:
+                result.notes.append((line, f"{ref} is larger than {settings.IMAGE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB"))
+            else:
+                infos.append(index[ref.lower()])
+        if urls:
+            enqueue('cars.fetch_photos', {'car_id': car.pk, 'urls': urls[:image_limit], 'limit': image_limit or len(urls)})
+            result.photos_queued += len(urls[:image_limit])
+        if infos:
+            from_zip.append((line, car, infos))
+
+    if from_zip:
+        with ThreadPoolExecutor(max_workers=settings.IMPORT_WORKERS, thread_name_prefix='car-import') as pool:
+            futures = [(line, pool.submit(_add_zip_photos, car, infos, archive, image_limit)) for line, car, infos in from_zip]
+            for line, future in futures:
+                try:
+                    added = future.result()
+                except Exception as e:
+                    print(f"Import photos for line {line} failed: {e}")
+                    result.notes.append((line, "photos could not be saved, please add them from Edit"))
+                    continue
+                result.photos_added += len(added.created)
+                result.notes += [(line, f"{name}: {reason}") for name, reason in added.failures]
+                if added.repeats:
+                    result.notes.append((line, f"skipped near-duplicate photo(s): {', '.join(added.repeats)}"))
+                if added.over_limit:
+                    result.notes.append((line, f"{added.over_limit} photo(s) over the plan's photo limit"))
+    return result
@@ -0,0 +1,111 @@
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+# dHash is 64 bits, split into 4 indexed 16-bit bands. Two hashes within
+# MAX_DISTANCE = 3 bits must agree on at least one whole band (pigeonhole), so a
+# band-equality query finds every candidate and the exact distance is checked in Python.
+BANDS = 4
+BAND_BITS = 16
+MAX_DISTANCE = 3
+
+
+def compute_dhash(source):
+    """
+    64-bit difference hash of a photo. Decodes at 1/8 scale via JPEG draft mode,
+    so hashing a 12 MP upload takes milliseconds. EXIF rotation is applied first,
+    so the same shot saved with a different orientation tag still matches.
+    """
+    img = Image.open(source)
+    if img.format == 'JPEG':
+        img.draft('L', (64, 64))
+    ImageOps.exif_transpose(img, in_place=True)
+    small = img.convert('L').resize((9, 8), Image.LANCZOS)
+    pixels = list(small.getdata())
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left, right = pixels[row * 9 + col], pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return value
+
+
+def to_signed(value):
+    """Postgres BIGINT is signed; store the unsigned 64-bit hash in two's complement."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def bands(value):
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (i * BAND_BITS)) & mask for i in range(BANDS)]
+
+
+def hash_fields(value):
+    """Field values to set on a CarImage for an unsigned hash (all None for None)."""
+    if value is None:
+        return {'phash': None, **{f'phash_band{i}': None for i in range(BANDS)}}
+    fields = {'phash': to_signed(value)}
+    for i, band in enumerate(bands(value)):
+        fields[f'phash_band{i}'] = band
+    return fields
+
+
+def hamming(a, b):
+    return bin(to_unsigned(a) ^ to_unsigned(b)).count('1')
+
+
+def find_similar(value, queryset=None, max_distance=MAX_DISTANCE):
+    """
+    CarImages whose hash is within `max_distance` bits of `value`, closest first,
+    as [(image, distance)]. One indexed query: OR of the four band equalities.
+    """
+    from .models import CarImage
+
+    qs = queryset if queryset is not None else CarImage.objects.all()
+    band_match = Q()
+    for i, band in enumerate(bands(value)):
+        band_match |= Q(**{f'phash_band{i}': band})
+
+    matches = []
+    for img in qs.filter(band_match).select_related('car'):
+        distance = hamming(img.phash, value)
+        if distance <= max_distance:
+            matches.append((img, distance))
+    matches.sort(key=lambda match: match[1])
+    return matches
+
+
+def hash_upload(upload):
+    """dHash of an uploaded file, or None if it can't be read as an image."""
+    try:
+        return compute_dhash(upload)
+    except Exception as e:
+        print(f"Could not hash {getattr(upload, 'name', upload)}: {e}")
+        if hasattr(upload, 'seek'):
+            upload.seek(0)
+        return None
+
+
+def match_fields(value, car, exclude_pk=None):
+    """
+    duplicate_of / is_recycled for a photo on `car`: the closest match on another
+    listing, and whether any match belongs to a different dealer (a fraud signal).
+    """
+    from .models import CarImage
+
+    if value is None:
+        return {'duplicate_of': None, 'is_recycled': False}
+    qs = CarImage.objects.exclude(car=car)
+    if exclude_pk:
+        qs = qs.exclude(pk=exclude_pk)
+    matches = find_similar(value, qs)
+    return {
+        'duplicate_of': matches[0][0] if matches else None,
+        'is_recycled': any(img.car.dealer_id != car.dealer_id for img, _ in matches),
+    }
@@ -0,0 +1,208 @@
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .models import Booking, Car, Lead
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+FLUSH_BYTES = 64 * 1024      # Response chunk size: fewer, larger writes to the socket
+XLSX_MAX_ROWS = 1_048_576    # Excel's per-sheet limit; longer exports continue on the next sheet
+XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def cell(value):
+    """Dates in local time, everything else as-is (numbers stay numbers for Excel)."""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+# --- CSV ---
+
+class Echo:
+    """File-like object for csv.writer that hands each line back instead of storing it."""
+    def write(self, value):
+        return value
+
+
+def csv_chunks(header, rows):
+    writer = csv.writer(Echo())
+    buffer = ['\ufeff', writer.writerow(header)]  # BOM so Excel opens it as UTF-8
+    size = 0
+    for row in rows:
+        line = writer.writerow([_defuse(cell(value)) for value in row])
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    yield ''.join(buffer)
+
+
+def _defuse(value):
+    # Text starting with = + - @ would run as a formula when the CSV is opened in Excel
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return '' if value is None else value
+
+
+# --- XLSX ---
+
+class _Pipe(io.RawIOBase):
+    """Unseekable sink for zipfile: whatever has been written so far is collected by drain()."""
+    def __init__(self):
+        self.parts, self.size = [], 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts, self.size = [], 0
+        return data
+
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        value = cell(value)
+        if value is None:
+            cells.append('<c/>')
+        elif isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            cells.append(f'<c><v>{value}</v></c>')
+        else:
+            text = escape(XML_ILLEGAL.sub('', str(value)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f"<row>{''.join(cells)}</row>"
+
+
+SHEET_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+              '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+SHEET_TAIL = '</sheetData></worksheet>'
+
+
+def xlsx_chunks(header, rows):
+    """
+    A minimal Office Open XML workbook (inline strings, no styles), zipped as it is
+    generated. zipfile writes entries with data descriptors when the output can't
+    seek, so nothing but the current chunk is ever held in memory.
+    """
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, 'w', zipfile.ZIP_DEFLATED) as book:
+        sheets, sheet, written = 0, None, 0
+
+        def next_sheet():
+            nonlocal sheets, sheet, written
+            if sheet is not None:
+                sheet.write(SHEET_TAIL.encode())
+                sheet.close()
+            sheets += 1
+            sheet = book.open(f'xl/worksheets/sheet{sheets}.xml', 'w', force_zip64=True)
+            sheet.write((SHEET_HEAD + _xlsx_row(header)).encode())  # Every sheet repeats the header
+            written = 1
+
+        next_sheet()
+        for row in rows:
+            if written == XLSX_MAX_ROWS:
+                next_sheet()
+            sheet.write(_xlsx_row(row).encode())
+            written += 1
+            if pipe.size >= FLUSH_BYTES:
+                yield pipe.drain()
+        sheet.write(SHEET_TAIL.encode())
+        sheet.close()
+
+        # The parts that list the sheets go last, once we know how many there are
+        numbers = range(1, sheets + 1)
+        book.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + ''.join(f'<Override PartName="/xl/worksheets/sheet{n}.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>' for n in numbers)
+            + '</Types>'
+        ))
+        book.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ))
+        book.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + ''.join(f'<sheet name="Sheet{n}" sheetId="{n}" r:id="rId{n}"/>' for n in numbers)
+            + '</sheets></workbook>'
+        ))
+        book.writestr('xl/_rels/workbook.xml.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + ''.join(f'<Relationship Id="rId{n}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet{n}.xml"/>' for n in numbers)
+            + '</Relationships>'
+        ))
+    yield pipe.drain()  # Central directory
+
+
+# --- Responses ---
+
+def stream(filename, fmt, header, rows):
+    """StreamingHttpResponse for `rows` (any iterable of tuples) as CSV or XLSX (default CSV)."""
+    fmt = fmt if fmt in FORMATS else 'csv'
+    chunks = xlsx_chunks(header, rows) if fmt == 'xlsx' else csv_chunks(header, rows)
+    response = StreamingHttpResponse(chunks, content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+def iterate(queryset, fields):
+    """Plain tuples straight off a DB cursor, a chunk at a time (server-side cursor on PostgreSQL)."""
+    return queryset.values_list(*fields).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+# --- Dealer exports: kind -> (header, fields, queryset for a dealer) ---
+
+DEALER_EXPORTS = {
+    'inventory': (
+        ['ID', 'Registration', 'Make', 'Model', 'Year', 'Price (KES)', 'Listing', 'Rent/Day (KES)', 'Mileage (km)',
+         'Engine (cc)', 'Color', 'Condition', 'Transmission', 'Fuel', 'Body', 'City', 'Status', 'Featured', 'Listed'],
+        ['id', 'registration_number', 'make', 'model', 'year', 'price', 'listing_type', 'rent_price_per_day', 'mileage',
+         'engine_cc', 'color', 'condition', 'transmission', 'fuel_type', 'body_type', 'city', 'status', 'is_featured', 'created_at'],
+        lambda dealer: Car.objects.filter(dealer=dealer).order_by('id'),
+    ),
+    'leads': (
+        ['Date', 'Car ID', 'Make', 'Model', 'Year', 'Registration', 'Action', 'User'],
+        ['timestamp', 'car_id', 'car__make', 'car__model', 'car__year', 'car__registration_number', 'action_type', 'user__username'],
+        lambda dealer: Lead.objects.filter(car__dealer=dealer).order_by('-id'),
+    ),
+    'bookings': (
+        ['Booking ID', 'Requested', 'Car ID', 'Make', 'Model', 'Registration', 'Renter', 'Renter Email',
+         'Start', 'End', 'Total (KES)', 'Status'],
+        ['id', 'created_at', 'car_id', 'car__make', 'car__model', 'car__registration_number', 'renter__username', 'renter__email',
+         'start_date', 'end_date', 'total_price', 'status'],
+        lambda dealer: Booking.objects.filter(car__dealer=dealer).order_by('-id'),
+    ),
+}
+
+
+def dealer_export(dealer, kind, fmt='csv'):
+    header, fields, queryset = DEALER_EXPORTS[kind]
+    filename = f"{kind}_{dealer.username}_{timezone.localdate():%Y-%m-%d}"
+    return stream(filename, fmt, header, iterate(queryset(dealer), fields))
@@ -0,0 +1,19 @@
+from jobs.queue import enqueue as enqueue_job
+
+
+def process_now(image_ids):
+    from .images import process_car_image
+    for image_id in image_ids:
+        process_car_image(image_id)
+
+
+def enqueue(image_ids):
+    """
+    Queues a cars.process_images job per photo; run_workers' processes do the
+    CPU-bound Pillow work, so nothing is lost when a web worker is recycled.
+    The job rows are written in the caller's transaction, so workers never look
+    for images the request hasn't committed. A photo already waiting in the
+    queue (the cars.sweep_images re-queue) isn't queued twice.
+    """
+    for image_id in image_ids:
+        enqueue_job('cars.process_images', {'image_id': image_id}, key=f"cars.process_images:{image_id}")
@@ -0,0 +1,211 @@
+import base64
+from io import BytesIO
+from PIL import Image, ImageOps, ExifTags
+from django.conf import settings
+from django.db import transaction
+from django.core.files.base import ContentFile
+from .storage import blob_storage
+
+# Widths we serve. 'full' replaces the original upload; the others feed srcset.
+RENDITION_SIZES = {
+    'thumb': 320,
+    'card': 640,
+    'full': 1200,
+}
+FORMATS = {
+    'jpeg': {'format': 'JPEG', 'ext': 'jpg', 'options': {'quality': 75, 'optimize': True, 'progressive': True}},
+    'webp': {'format': 'WEBP', 'ext': 'webp', 'options': {'quality': 70, 'method': 4}},
+}
+
+# Width of the inline blur-up placeholder (CarImage.placeholder)
+PLACEHOLDER_WIDTH = 16
+PLACEHOLDER_FIELDS = ('placeholder', 'dominant_color', 'width', 'height')
+
+# EXIF orientations that rotate the photo by 90/270 degrees (width and height swap on display)
+SWAPPED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def encode(img, fmt):
+    spec = FORMATS[fmt]
+    buffer = BytesIO()
+    img.save(buffer, format=spec['format'], **spec['options'])
+    return buffer.getvalue()
+
+
+def decode_for_width(source, target_width, reduced=True):
+    """
+    Opens an upload and decodes it straight to roughly `target_width` (as displayed).
+
+    Pixel count is checked from the header before anything is decoded. For JPEGs,
+    draft mode lets libjpeg decode at 1/2, 1/4 or 1/8 scale, so a 48 MP phone photo
+    never exists in memory at full size. EXIF orientation is honoured both when
+    picking the draft size and when rotating the result.
+    """
+    img = Image.open(source)
+    pixels = img.width * img.height
+    if pixels > settings.IMAGE_MAX_PIXELS:
+        raise ValueError(
+            f"Photo is {pixels / 1_000_000:.0f} MP; the limit is {settings.IMAGE_MAX_PIXELS / 1_000_000:.0f} MP."
+        )
+
+    if reduced and img.format == 'JPEG':
+        swapped = img.getexif().get(ExifTags.Base.Orientation, 1) in SWAPPED_ORIENTATIONS
+        shown_width, shown_height = (img.height, img.width) if swapped else img.size
+        if shown_width > target_width:
+            target_height = max(1, round(shown_height * target_width / shown_width))
+            request = (target_height, target_width) if swapped else (target_width, target_height)
+            img.draft('RGB', request)
+
+    ImageOps.exif_transpose(img, in_place=True)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
+
+
+def build_renditions(source, reduced=True):
+    """
+    Decodes an uploaded photo once and returns every size in every format:
+    {'full': {'width': .., 'height': .., 'jpeg': bytes, 'webp': bytes}, 'card': {...}, 'thumb': {...}}
+    Each smaller size is resized from the previous one rather than from the original.
+    """
+    sizes = sorted(RENDITION_SIZES.items(), key=lambda item: -item[1])
+    img = decode_for_width(source, sizes[0][1], reduced=reduced)
+
+    renditions = {}
+    for name, width in sizes:
+        if img.width > width:
+            img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+        renditions[name] = {
+            'width': img.width,
+            'height': img.height,
+            **{fmt: encode(img, fmt) for fmt in FORMATS},
+        }
+    return renditions
+
+
+def build_placeholder(renditions):
+    """
+    Low-quality placeholder for a processed photo, derived from its thumbnail:
+    a ~16px wide WebP as a data URI (a few hundred bytes, blurred by the browser
+    when scaled up), the dominant colour, and the full rendition's dimensions.
+    """
+    full = renditions['full']
+    with Image.open(BytesIO(renditions['thumb']['jpeg'])) as thumb:
+        thumb = thumb.convert('RGB')
+        tiny = thumb.resize((PLACEHOLDER_WIDTH, max(1, round(thumb.height * PLACEHOLDER_WIDTH / thumb.width))), Image.BOX)
+        buffer = BytesIO()
+        tiny.save(buffer, format='WEBP', quality=40, method=6)
+
+        # Most common colour of a 5-colour quantization, not the average (which turns muddy grey)
+        swatch = thumb.resize((64, max(1, round(thumb.height * 64 / thumb.width))), Image.BOX).quantize(colors=5)
+        palette = swatch.getpalette()
+        _, index = max(swatch.getcolors())
+        r, g, b = palette[index * 3:index * 3 + 3]
+
+    return {
+        'placeholder': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+        'dominant_color': f"#{r:02x}{g:02x}{b:02x}",
+        'width': full['width'],
+        'height': full['height'],
+    }
+
+
+def store_renditions(stem, renditions, skip=('full', 'jpeg')):
+    """
+    Saves rendition bytes to the blob storage (identical bytes are stored once).
+    Returns the JSON-safe map stored on CarImage.renditions (storage names, not bytes).
+    `skip` is the (size, format) pair that is kept as CarImage.image instead.
+    """
+    stored = {}
+    for name, data in renditions.items():
+        entry = {'width': data['width'], 'height': data['height']}
+        for fmt, spec in FORMATS.items():
+            if (name, fmt) == tuple(skip):
+                continue
+            path = f"car_images/renditions/{stem}_{RENDITION_SIZES[name]}.{spec['ext']}"
+            entry[fmt] = blob_storage.save(path, ContentFile(data[fmt]))
+        stored[name] = entry
+    return stored
+
+
+def media_names(image_name, renditions):
+    """Storage names held by one CarImage row: the main image plus every rendition."""
+    names = [image_name] if image_name else []
+    for entry in (renditions or {}).values():
+        names.extend(entry[fmt] for fmt in FORMATS if entry.get(fmt))
+    return names
+
+
+def _reuse_finished(img, digest):
+    """
+    If another photo was uploaded with the exact same bytes and is already processed,
+    point this row at its files (one more reference each) instead of decoding again.
+    Returns the field values for the final UPDATE, or None.
+    """
+    from .models import CarImage
+
+    donor = (CarImage.objects.filter(source_digest=digest, processing_status='READY')
+             .exclude(pk=img.pk).exclude(renditions={}).exclude(placeholder='').first())
+    if donor is None:
+        return None
+    names = donor.media_names()
+    with transaction.atomic():
+        if blob_storage.retain(names) != len(names):
+            transaction.set_rollback(True)  # Donor has legacy (untracked) files; can't share them
+            return None
+    fields = {'image': donor.image.name, 'renditions': donor.renditions,
+              **{field: getattr(donor, field) for field in PLACEHOLDER_FIELDS}}
+    if img.phash is None and donor.phash is not None:
+        fields.update(phash=donor.phash, **{f'phash_band{i}': getattr(donor, f'phash_band{i}') for i in range(4)})
+    return fields
+
+
+def process_car_image(image_id):
+    """
+    Turns a stored original into the full JPEG + renditions and marks the row READY.
+    Runs in a worker process; safe to call again for rows left PENDING or FAILED.
+    """
+    from .models import CarImage, MediaBlob
+    from . import duplicates
+
+    img = CarImage.objects.filter(pk=image_id).select_related('car').only(
+        'id', 'image', 'processing_status', 'phash', 'car__id', 'car__dealer_id'
+    ).first()
+    if img is None or not img.image:
+        return None
+
+    original_name = img.image.name
+    digest = MediaBlob.objects.filter(name=original_name).values_list('digest', flat=True).first() or ''
+    try:
+        fields = _reuse_finished(img, digest) if digest else None
+        if fields is None:
+            with img.image.open('rb') as source:
+                renditions = build_renditions(source)
+            stem = original_name.rsplit('/', 1)[-1].rsplit('.', 1)[0]
+            full_name = blob_storage.save(f"car_images/{stem}.jpg", ContentFile(renditions['full']['jpeg']))
+            fields = {'image': full_name, 'renditions': store_renditions(stem, renditions), **build_placeholder(renditions)}
+            # Rows that couldn't be hashed at upload (or legacy rows) get hashed from the thumbnail
+            if img.phash is None:
+                value = duplicates.compute_dhash(BytesIO(renditions['thumb']['jpeg']))
+                fields.update(duplicates.hash_fields(value))
+        if img.phash is None and fields.get('phash') is not None:
+            fields.update(duplicates.match_fields(fields['phash'], img.car, exclude_pk=img.pk))
+    except Exception as e:
+        CarImage.objects.filter(pk=image_id).update(processing_status='FAILED')
+        print(f"Image processing failed for #{image_id}: {e}")
+        return None
+
+    updated = CarImage.objects.filter(pk=image_id, image=original_name).update(
+        processing_status='READY', source_digest=digest, **fields
+    )
+    if not updated:
+        # Deleted or replaced while we were working: give back the references we took
+        blob_storage.release(media_names(fields['image'], fields['renditions']))
+        return None
+
+    # The full JPEG replaces the original; drop the original's reference (even if it's the same blob)
+    try:
+        blob_storage.delete(original_name)
+    except Exception as e:
+        print(f"Error deleting original {original_name}: {e}")
+    return fields['image']
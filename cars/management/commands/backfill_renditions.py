@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from cars.models import CarImage
+from cars.images import build_placeholder, build_renditions, store_renditions
+
+class Command(BaseCommand):
+    help = 'Generates responsive renditions and blur-up placeholders for car photos uploaded before those pipelines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Process at most this many images')
+
+    def handle(self, *args, **options):
+        pending = (CarImage.objects.filter(Q(renditions={}) | Q(placeholder=''), processing_status='READY')
+                   .exclude(image='').only('id', 'image', 'renditions').order_by('id'))
+        if options['limit']:
+            pending = pending[:options['limit']]
+
+        done = failed = 0
+        for img in pending.iterator(chunk_size=200):
+            try:
+                thumb = (img.renditions or {}).get('thumb', {}).get('jpeg')
+                if thumb and 'full' in img.renditions:
+                    # Renditions exist already; the placeholder only needs the stored thumbnail
+                    with img.image.storage.open(thumb, 'rb') as f:
+                        sources = {'thumb': {'jpeg': f.read()}, 'full': img.renditions['full']}
+                    CarImage.objects.filter(pk=img.pk).update(**build_placeholder(sources))
+                    done += 1
+                    continue
+
+                with img.image.open('rb') as source:
+                    renditions = build_renditions(source)
+                stem = img.image.name.rsplit('/', 1)[-1].rsplit('.', 1)[0]
+                # The stored original stays as-is; every rendition (incl. full JPEG) is added alongside
+                stored = store_renditions(stem, renditions, skip=())
+                CarImage.objects.filter(pk=img.pk).update(renditions=stored, **build_placeholder(renditions))
+                done += 1
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"❌ Image #{img.pk}: {e}"))
+
+        self.stdout.write(self.style.SUCCESS(f"Done. {done} image(s) processed, {failed} failed."))
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from io import BytesIO
+from django.core.management.base import BaseCommand
+from PIL import Image, ExifTags
+
+
+def _status_kib(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def _measure(path, reduced):
+    """
+    Runs in a fresh process. The kernel's peak-RSS mark is reset right before decoding
+    (it is otherwise inherited from the parent), so the delta is this one image only.
+    """
+    import django
+    django.setup()
+    from cars.images import build_renditions
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+    baseline = _status_kib('VmRSS')
+    started = time.perf_counter()
+    build_renditions(BytesIO(data), reduced=reduced)
+    elapsed = time.perf_counter() - started
+    return (_status_kib('VmHWM') - baseline) / 1024, elapsed
+
+
+def _synthetic_photo(megapixels, orientation, folder):
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    noise = Image.effect_noise((width // 8, height // 8), 60).resize((width, height))
+    img = Image.merge('RGB', (noise, noise.rotate(180), noise.transpose(Image.FLIP_LEFT_RIGHT)))
+    exif = Image.Exif()
+    exif[ExifTags.Base.Orientation] = orientation
+    path = os.path.join(folder, f"synthetic_{megapixels}mp_o{orientation}.jpg")
+    img.save(path, 'JPEG', quality=90, exif=exif)
+    return path
+
+
+class Command(BaseCommand):
+    help = 'Reports peak memory (Linux) and time per photo for full vs. draft-mode (reduced) decoding'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='JPEGs to measure (default: synthetic 12/24/48 MP photos)')
+        parser.add_argument('--megapixels', type=int, nargs='+', default=[12, 24, 48])
+
+    def handle(self, *args, **options):
+        ctx = multiprocessing.get_context('spawn')
+
+        with tempfile.TemporaryDirectory() as folder:
+            files = options['files']
+            if not files:
+                self.stdout.write("Generating synthetic phone photos...")
+                # Orientation 6 = portrait shot stored sideways, the common phone case
+                files = [_synthetic_photo(mp, 6, folder) for mp in options['megapixels']]
+
+            self.stdout.write(f"{'photo':<34}{'MP':>6}{'full MiB':>11}{'full s':>9}{'draft MiB':>12}{'draft s':>9}")
+            for path in files:
+                with Image.open(path) as img:
+                    megapixels = img.width * img.height / 1_000_000
+
+                results = {}
+                for reduced in (False, True):
+                    with ctx.Pool(1, maxtasksperchild=1) as pool:
+                        try:
+                            results[reduced] = pool.apply(_measure, (path, reduced))
+                        except Exception as e:
+                            results[reduced] = None
+                            self.stdout.write(self.style.ERROR(f"{os.path.basename(path)}: {e}"))
+
+                full, draft = results.get(False), results.get(True)
+                self.stdout.write(
+                    f"{os.path.basename(path)[:33]:<34}{megapixels:>6.1f}"
+                    f"{(f'{full[0]:.1f}' if full else '-'):>11}{(f'{full[1]:.2f}' if full else '-'):>9}"
+                    f"{(f'{draft[0]:.1f}' if draft else '-'):>12}{(f'{draft[1]:.2f}' if draft else '-'):>9}"
+                )
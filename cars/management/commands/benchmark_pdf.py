@@ -0,0 +1,94 @@
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils import timezone
+from cars import pdf
+
+TEMPLATE = 'dealer/monthly_report.html'
+
+
+def _contexts(count):
+    """Distinct monthly-report contexts, shaped like download_report's, without touching the DB."""
+    today = timezone.now()
+    return [
+        {
+            'dealer': SimpleNamespace(email=f"dealer{i}@example.com"),
+            'profile': SimpleNamespace(business_name=f"Bench Motors {i}"),
+            'date': today, 'month_name': today.strftime('%B %Y'),
+            'total_cars': 20 + i % 30, 'total_views': 1000 + i * 7, 'total_leads': 40 + i % 50,
+            'whatsapp_clicks': 25 + i % 20, 'calls': 15 + i % 30, 'cpl': 5000 // (40 + i % 50),
+            'inventory_value': 25_000_000 + i * 100_000, 'sold_count': i % 9,
+        }
+        for i in range(count)
+    ]
+
+
+class Probe(threading.Thread):
+    """Stands in for another request on the same web process: how long does a 1 ms tick really take?"""
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.samples, self.running = [], True
+
+    def run(self):
+        while self.running:
+            started = time.perf_counter()
+            sum(range(20_000))  # A little Python work, so the probe needs the GIL too
+            time.sleep(0.001)
+            self.samples.append((time.perf_counter() - started) * 1000)
+
+
+class Command(BaseCommand):
+    help = 'Renders a burst of distinct monthly-report PDFs inline (what a cars.build_report job does) vs. serving them from storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reports', type=int, default=100)
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent requests (gunicorn threads)')
+
+    def handle(self, *args, **options):
+        contexts = _contexts(options['reports'])
+        self.stdout.write(f"{options['reports']} reports, {options['clients']} concurrent clients")
+        self.stdout.write(f"{'path':<16}{'wall s':>9}{'p50 s':>8}{'p95 s':>8}{'tick p95 ms':>13}")
+
+        with tempfile.TemporaryDirectory() as folder, override_settings(
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'pdfs': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': folder}},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+        ):
+            month = timezone.now()
+            for dealer_id, context in enumerate(contexts):
+                context['name'] = pdf.report_name(dealer_id, month)
+
+            self.run_burst('inline', contexts, options['clients'], lambda c: pdf.render(TEMPLATE, c, name=c['name']))
+            self.run_burst('stored', contexts, options['clients'], lambda c: pdf.stored(c['name']).name and pdf.get_storage().open(c['name']).read())
+
+    def run_burst(self, label, contexts, clients, render):
+        timings = []
+
+        def one(context):
+            started = time.perf_counter()
+            if not render(context):
+                raise RuntimeError("PDF build failed")
+            timings.append(time.perf_counter() - started)
+
+        probe = Probe()
+        probe.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as threads:
+            list(threads.map(one, contexts))
+        wall = time.perf_counter() - started
+        probe.running = False
+        probe.join()
+
+        timings.sort()
+        ticks = sorted(probe.samples)
+        self.stdout.write(
+            f"{label:<16}{wall:>9.2f}{statistics.median(timings):>8.2f}"
+            f"{timings[int(len(timings) * 0.95) - 1]:>8.2f}{ticks[int(len(ticks) * 0.95) - 1]:>13.1f}"
+        )
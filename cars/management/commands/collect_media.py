@@ -0,0 +1,71 @@
+import time
+from django.core.management.base import BaseCommand
+from cars import media_gc
+
+class Command(BaseCommand):
+    help = 'Deletes tombstoned car photos from storage in rate-limited bulk batches, or audits storage for orphans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Files per bulk storage delete (Cloudinary max is 100)')
+        parser.add_argument('--rate', type=float, default=30, help='Max bulk delete calls per minute')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many tombstones')
+        parser.add_argument('--dry-run', action='store_true', help='List what would be deleted without touching storage')
+        parser.add_argument('--audit', action='store_true', help='Report refcount drift, orphaned blobs and stray files (read-only)')
+        parser.add_argument('--show', type=int, default=20, help='Names to print per audit/dry-run category')
+
+    def handle(self, *args, **options):
+        if options['audit']:
+            return self.audit(options['show'])
+
+        interval = 60 / options['rate'] if options['rate'] > 0 else 0
+        totals = {'deleted': 0, 'revived': 0, 'failed': 0}
+        shown, last_id, seen = 0, 0, 0
+
+        while options['limit'] is None or seen < options['limit']:
+            size = options['batch_size'] if options['limit'] is None else min(options['batch_size'], options['limit'] - seen)
+            started = time.monotonic()
+            summary, last_id = media_gc.sweep_batch(size, after_id=last_id, dry_run=options['dry_run'])
+            if summary is None:
+                break
+            seen += sum(len(summary[key]) for key in totals)
+            for key in totals:
+                totals[key] += len(summary[key])
+
+            if options['dry_run']:
+                for name in summary['deleted'][:max(0, options['show'] - shown)]:
+                    self.stdout.write(f"  would delete {name}")
+                shown += len(summary['deleted'])
+                continue
+
+            for name in summary['failed']:
+                self.stdout.write(self.style.ERROR(f"❌ Could not delete {name}"))
+            # Stay under the storage provider's API rate limit
+            pause = interval - (time.monotonic() - started)
+            if pause > 0:
+                time.sleep(pause)
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"✅ {verb} {totals['deleted']} file(s)."))
+        if totals['revived']:
+            self.stdout.write(f"♻️ {totals['revived']} tombstoned file(s) are referenced again and were kept.")
+        if totals['failed']:
+            self.stdout.write(self.style.WARNING(f"⚠️ {totals['failed']} delete(s) failed; they will be retried."))
+
+    def audit(self, show):
+        report = media_gc.audit()
+        labels = {
+            'drift': 'Blobs whose refcount disagrees with actual references',
+            'orphans': 'Unreferenced blobs with no tombstone',
+            'strays': 'Files in storage nothing knows about',
+            'stuck': f'Tombstones that failed {media_gc.MAX_ATTEMPTS}+ deletes',
+        }
+        for key, label in labels.items():
+            items = report[key]
+            style = self.style.WARNING if items else self.style.SUCCESS
+            self.stdout.write(style(f"{label}: {len(items)}"))
+            for item in items[:show]:
+                if key == 'drift':
+                    name, recorded, actual = item
+                    self.stdout.write(f"  {name}: recorded {recorded}, found {actual}")
+                else:
+                    self.stdout.write(f"  {item}")
@@ -0,0 +1,82 @@
+from django.core.files.base import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from cars.models import CarImage, MediaBlob, MediaTombstone
+from cars.storage import blob_storage, digest_of
+
+class Command(BaseCommand):
+    help = 'Moves car photos stored before content addressing into the blob store, merging identical files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        resolved = {}  # Legacy name -> blob name it now counts against
+        failed = 0
+        last_id = 0
+
+        while True:
+            batch = list(CarImage.objects.filter(id__gt=last_id).order_by('id')
+                         .only('id', 'image', 'renditions')[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            known = set(MediaBlob.objects.filter(
+                name__in=[n for img in batch for n in img.media_names()]
+            ).values_list('name', flat=True))
+
+            for img in batch:
+                renames = {}
+                for name in img.media_names():
+                    if name in resolved:
+                        # Legacy file shared by several rows: one more reference each
+                        blob_storage.retain([resolved[name]])
+                    elif name in known:
+                        continue  # Saved through the blob store; already counted
+                    else:
+                        try:
+                            resolved[name] = self.adopt(name)
+                        except Exception as e:
+                            failed += 1
+                            self.stdout.write(self.style.ERROR(f"❌ Photo #{img.id} {name}: {e}"))
+                            continue
+                    if resolved[name] != name:
+                        renames[name] = resolved[name]
+                if renames:
+                    self.point_at(img, renames)
+
+        # Legacy copies of content we already had are now unreferenced; collect_media deletes them
+        redundant = [name for name, target in resolved.items() if target != name]
+        MediaTombstone.objects.bulk_create([MediaTombstone(name=name) for name in redundant], ignore_conflicts=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Registered {len(resolved) - len(redundant)} file(s) as blobs, queued {len(redundant)} duplicate file(s) for collect_media."
+        ))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"⚠️ {failed} file(s) could not be read."))
+
+    def adopt(self, name):
+        """
+        Takes one reference for a legacy file. Returns the existing blob's name if the
+        same bytes are already stored (the legacy copy is then redundant), else `name`.
+        """
+        with blob_storage.open(name, 'rb') as f:
+            digest = digest_of(File(f))
+            size = f.size
+
+        with transaction.atomic():
+            existing = MediaBlob.objects.select_for_update().filter(digest=digest).first()
+            if existing is None:
+                MediaBlob.objects.create(digest=digest, name=name, size=size, refcount=1)
+                return name
+            MediaBlob.objects.filter(pk=existing.pk).update(refcount=F('refcount') + 1)
+            return existing.name
+
+    def point_at(self, img, renames):
+        renditions = {
+            size: {key: renames.get(value, value) if key in ('jpeg', 'webp') else value for key, value in entry.items()}
+            for size, entry in (img.renditions or {}).items()
+        }
+        image = renames.get(img.image.name, img.image.name)
+        CarImage.objects.filter(pk=img.pk).update(image=image, renditions=renditions)
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from cars.models import CarImage
+from cars import duplicates
+
+class Command(BaseCommand):
+    help = 'Hashes car photos that have no perceptual hash yet, then links duplicates and flags photos recycled across dealers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--rematch', action='store_true', help='Re-run matching for every hashed photo, not just newly hashed ones')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # 1. Hash legacy rows (thumbnail if we have one; it hashes the same and is far smaller)
+        hashed, unreadable, last_id = [], 0, 0
+        while True:
+            batch = list(CarImage.objects.filter(phash__isnull=True, processing_status='READY', id__gt=last_id)
+                         .order_by('id')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            done = []
+            for img in batch:
+                name = (img.renditions or {}).get('thumb', {}).get('jpeg') or img.image.name
+                try:
+                    with img.image.storage.open(name, 'rb') as source:
+                        value = duplicates.compute_dhash(source)
+                except Exception as e:
+                    unreadable += 1
+                    self.stdout.write(self.style.WARNING(f"⚠️ Photo #{img.id}: {e}"))
+                    continue
+                for field, band in duplicates.hash_fields(value).items():
+                    setattr(img, field, band)
+                done.append(img)
+            CarImage.objects.bulk_update(done, ['phash', 'phash_band0', 'phash_band1', 'phash_band2', 'phash_band3'])
+            hashed.extend(img.id for img in done)
+        self.stdout.write(f"Hashed {len(hashed)} photo(s), {unreadable} unreadable.")
+
+        # 2. Link duplicates (one indexed band query per photo)
+        to_match = CarImage.objects.filter(phash__isnull=False).select_related('car')
+        if not options['rematch']:
+            to_match = to_match.filter(id__in=hashed)
+
+        linked, recycled, pending = 0, 0, []
+        for img in to_match.order_by('id').iterator(chunk_size=batch_size):
+            match = duplicates.match_fields(img.phash, img.car, exclude_pk=img.pk)
+            img.duplicate_of, img.is_recycled = match['duplicate_of'], match['is_recycled']
+            linked += img.duplicate_of is not None
+            recycled += img.is_recycled
+            pending.append(img)
+            if len(pending) >= batch_size:
+                CarImage.objects.bulk_update(pending, ['duplicate_of', 'is_recycled'])
+                pending = []
+        CarImage.objects.bulk_update(pending, ['duplicate_of', 'is_recycled'])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {linked} photo(s) duplicate another listing's photo."))
+        if recycled:
+            self.stdout.write(self.style.WARNING(f"🚩 {recycled} photo(s) also appear under a different dealer."))
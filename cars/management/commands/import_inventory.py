@@ -0,0 +1,52 @@
+import csv
+import sys
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from cars import bulk_import
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Bulk-imports a dealer's listings from a CSV/XLSX (same pipeline as Dashboard > Bulk Import)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Dealer to import for')
+        parser.add_argument('sheet', help='CSV or XLSX file, one row per vehicle')
+        parser.add_argument('--photos', default=None, help='Zip with the photos named in the Photos column')
+        parser.add_argument('--report', default=None, help='Where to write the per-row report CSV (default: stdout)')
+
+    def handle(self, *args, **options):
+        dealer = User.objects.filter(username=options['username']).select_related('dealer_profile').first()
+        if dealer is None or not hasattr(dealer, 'dealer_profile'):
+            raise CommandError(f"No dealer called {options['username']!r}")
+        plan = dealer.dealer_profile.plan_limits
+
+        started = time.perf_counter()
+        photos = open(options['photos'], 'rb') if options['photos'] else None
+        try:
+            with open(options['sheet'], 'rb') as sheet:
+                result = bulk_import.import_listings(dealer, sheet, photos, car_limit=plan['cars'], image_limit=plan['images'])
+        except bulk_import.SheetError as e:
+            raise CommandError(e)
+        finally:
+            if photos:
+                photos.close()
+        elapsed = time.perf_counter() - started
+
+        out = open(options['report'], 'w', newline='') if options['report'] else sys.stdout
+        try:
+            writer = csv.writer(out)
+            writer.writerow(['line', 'result', 'details'])
+            writer.writerows(result.report)
+        finally:
+            if options['report']:
+                out.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {len(result.created)} vehicle(s) in {elapsed:.2f}s; "
+            f"{result.photos_added} photo(s) added, {result.photos_queued} link(s) queued for download."
+        ))
+        if result.errors:
+            self.stdout.write(self.style.WARNING(f"⚠️ {len(result.errors)} row(s) not imported (see report)."))
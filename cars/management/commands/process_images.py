@@ -0,0 +1,35 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from cars.models import CarImage
+from cars import image_queue
+
+class Command(BaseCommand):
+    help = 'Re-queues car photos left PENDING (e.g. a lost job) or FAILED for the image processing jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=10, help='Only pick up PENDING photos uploaded this many minutes ago')
+        parser.add_argument('--include-failed', action='store_true', help='Retry photos that failed before')
+        parser.add_argument('--now', action='store_true', help='Process them in this process instead of queueing jobs')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        query = Q(processing_status='PENDING') & (Q(uploaded_at__lt=cutoff) | Q(uploaded_at__isnull=True))
+        if options['include_failed']:
+            query |= Q(processing_status='FAILED')
+
+        image_ids = list(CarImage.objects.filter(query).values_list('id', flat=True))
+        if not image_ids:
+            self.stdout.write(self.style.SUCCESS('No photos waiting for processing.'))
+            return
+
+        if not options['now']:
+            image_queue.enqueue(image_ids)
+            self.stdout.write(self.style.SUCCESS(f"Queued {len(image_ids)} photo(s) for processing."))
+            return
+
+        self.stdout.write(f"Processing {len(image_ids)} photo(s)...")
+        image_queue.process_now(image_ids)
+        ready = CarImage.objects.filter(id__in=image_ids, processing_status='READY').count()
+        self.stdout.write(self.style.SUCCESS(f"Done. {ready}/{len(image_ids)} photo(s) ready."))
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from cars import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Times the key views and commands against the seed_benchmark dataset and compares with the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('cases', nargs='*', help=f"Subset to run (default all: {', '.join(benchmarks.CASES)})")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument('--label', default='', help='Appended to the results file name, e.g. a branch')
+        parser.add_argument('--compare', default=None, help='Results file to compare with (default: latest run on the same dataset)')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Slowdown that counts as a regression (0.2 = 20%%)')
+        parser.add_argument('--no-save', action='store_true', help="Don't store this run")
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit non-zero on a regression (for CI)')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1")
+        dataset = benchmarks.fingerprint()
+        self.stdout.write("Dataset: " + ', '.join(f"{key}={value:,}" if isinstance(value, int) else f"{key}={value}"
+                                                  for key, value in dataset.items()))
+
+        if options['compare']:
+            try:
+                baseline_path, baseline = options['compare'], benchmarks.load(options['compare'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Can't read {options['compare']}: {e}")
+            if baseline.get('dataset') != dataset:
+                self.stdout.write(self.style.WARNING("⚠️ The baseline was measured on a different dataset."))
+        else:
+            found = benchmarks.latest(dataset)
+            baseline_path, baseline = found if found else (None, None)
+
+        try:
+            results = benchmarks.run(
+                options['cases'], repeat=options['repeat'], warmup=options['warmup'],
+                log=lambda name, stats: self.stdout.write(f"   {name}: {stats['median_ms']:.1f} ms"),
+            )
+        except benchmarks.BenchmarkError as e:
+            raise CommandError(e)
+
+        rows = benchmarks.compare(results, baseline['cases'] if baseline else {}, options['threshold'])
+        self.stdout.write(f"\n{'case':<20}{'median ms':>11}{'p95 ms':>10}{'queries':>9}{'vs base':>10}")
+        for name, stats, change, regressed in rows:
+            line = (f"{name:<20}{stats['median_ms']:>11.1f}{stats['p95_ms']:>10.1f}{stats['queries']:>9}"
+                    f"{'' if change is None else f'{change:+.0%}':>10}")
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+
+        if not options['no_save']:
+            path = benchmarks.save(results, dataset, options['label'])
+            self.stdout.write(f"\nSaved {path}")
+        if baseline_path:
+            self.stdout.write(f"Compared with {baseline_path}")
+
+        regressions = [name for name, _, _, regressed in rows if regressed]
+        if regressions:
+            message = f"❌ Regressed: {', '.join(regressions)}"
+            if options['fail_on_regression']:
+                raise CommandError(message)
+            self.stdout.write(self.style.ERROR(message))
+        elif baseline:
+            self.stdout.write(self.style.SUCCESS("✅ No regressions"))
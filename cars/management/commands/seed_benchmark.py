@@ -0,0 +1,46 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from cars import seeding
+
+
+class Command(BaseCommand):
+    help = 'Generates a reproducible benchmark dataset offline (bulk writes, locally drawn photos); see run_benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(seeding.SCALES), default='small')
+        parser.add_argument('--dealers', type=int, help='Override the scale preset')
+        parser.add_argument('--cars', type=int)
+        parser.add_argument('--views', type=int)
+        parser.add_argument('--leads', type=int)
+        parser.add_argument('--photos', type=int, default=2, help='Photos per car')
+        parser.add_argument('--masters', type=int, default=36, help='Distinct photos to draw and share between cars')
+        parser.add_argument('--days', type=int, default=365, help='History to spread listings and traffic over')
+        parser.add_argument('--seed', type=int, default=1, help='Same seed + same sizes = same rows')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--reset', action='store_true', help='Delete a previously seeded dataset first')
+        parser.add_argument('--force', action='store_true', help='Allow running with DEBUG off')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("DEBUG is off; this writes millions of rows. Pass --force if this really is a benchmark database.")
+        sizes = {key: options[key] if options[key] is not None else value for key, value in seeding.SCALES[options['scale']].items()}
+        if sizes['dealers'] < 1 or sizes['cars'] < 0:
+            raise CommandError("Need at least one dealer.")
+
+        log = self.stdout.write
+        if seeding.existing_dealers().exists():
+            if not options['reset']:
+                raise CommandError("A benchmark dataset already exists. Pass --reset to replace it.")
+            self.stdout.write("🧹 Removing the previous dataset...")
+            seeding.wipe(log=log)
+
+        started = time.perf_counter()
+        counts = seeding.seed(
+            **sizes, photos=options['photos'], masters=options['masters'], days=options['days'],
+            seed=options['seed'], batch_size=options['batch_size'], log=log,
+        )
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f"{value:,} {key}" for key, value in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"✅ Seeded {summary} in {elapsed:.1f}s"))
+        self.stdout.write(f"Dealers log in as {seeding.PREFIX}00000... with password {seeding.PASSWORD}")
@@ -3,10 +3,10 @@ from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.utils import timezone
-from django.db.models import Count, Q
 from django.contrib.auth import get_user_model
-from cars.models import Car, Lead, CarView
-from users.models import DealerProfile
+from jobs.queue import enqueue
+from users import mailer
+from users.reports import DealerReport
 import datetime
 
 User = get_user_model()
@@ -17,9 +17,9 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         self.stdout.write("Starting Monthly Report Job...")
 
-        # 1. Calculate Date Range (Last Month)
+        # 1. Calculate Date Range (Last Month, as [first of last month, first of this month))
         today = timezone.now()
-        first_day_this_month = today.replace(day=1)
+        first_day_this_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         last_day_prev_month = first_day_this_month - datetime.timedelta(days=1)
         first_day_prev_month = last_day_prev_month.replace(day=1)
         
@@ -27,83 +27,57 @@ class Command(BaseCommand):
         month_name = first_day_prev_month.strftime("%B %Y")
         
         # 2. Get all dealers with an active profile
-        dealers = User.objects.filter(dealer_profile__isnull=False)
+        dealers = User.objects.filter(dealer_profile__isnull=False).select_related('dealer_profile')
+        messages = []
+
+        # --- AGGREGATE STATS (every dealer at once) ---
+        report = DealerReport.for_window(first_day_prev_month, first_day_this_month).compute()
 
         for dealer in dealers:
             profile = dealer.dealer_profile
-            
-            # --- AGGREGATE STATS ---
-            
-            # Get cars owned by dealer
-            dealer_cars = Car.objects.filter(dealer=dealer)
-            
-            # Count Leads in previous month
-            leads_count = Lead.objects.filter(
-                car__dealer=dealer,
-                timestamp__gte=first_day_prev_month,
-                timestamp__lte=last_day_prev_month
-            ).count()
-            
-            # Count Views in previous month
-            views_count = CarView.objects.filter(
-                car__dealer=dealer,
-                timestamp__gte=first_day_prev_month,
-                timestamp__lte=last_day_prev_month
-            ).count()
+            stats = report[dealer.id]
             
             # Skip sending if they have absolutely 0 activity (optional, but good to avoid "0" spam)
-            if leads_count == 0 and views_count == 0:
+            if stats.leads == 0 and stats.views == 0:
                 continue
 
-            # Identify Hot Car
-            hot_car_obj = dealer_cars.annotate(
-                month_views=Count('views', filter=Q(views__timestamp__gte=first_day_prev_month, views__timestamp__lte=last_day_prev_month))
-            ).order_by('-month_views').first()
-            
-            hot_car_name = f"{hot_car_obj.year} {hot_car_obj.make} {hot_car_obj.model}" if hot_car_obj else None
-            hot_car_views = hot_car_obj.month_views if hot_car_obj else 0
+            # Build the PDF now, while the stock figures are still the month-end ones
+            enqueue('cars.build_report', {'dealer_id': dealer.id, 'month': f"{first_day_prev_month:%Y-%m}"},
+                    key=f"cars.build_report:{dealer.id}:{first_day_prev_month:%Y-%m}")
 
-            # Calculate ROI
-            plan_cost = 0
-            if profile.plan_type == 'LITE': plan_cost = 5000
-            elif profile.plan_type == 'PRO': plan_cost = 12000
-            elif profile.plan_type == 'STARTER': plan_cost = 1500
-            
-            cpl = 0
-            roi_multiplier = 1
-            if leads_count > 0 and plan_cost > 0:
-                cpl = int(plan_cost / leads_count)
-                # Compare to avg FB lead cost (approx 400 KES)
-                roi_multiplier = round(400 / cpl, 1) if cpl < 400 else 1
+            hot_car = stats.hot_car
+            hot_car_name = f"{hot_car.year} {hot_car.make} {hot_car.model}" if hot_car else None
 
             # --- PREPARE EMAIL ---
             context = {
                 'dealer_name': profile.business_name or dealer.username,
                 'month_name': month_name,
-                'total_leads': leads_count,
-                'total_views': views_count,
-                'active_cars': dealer_cars.filter(status='AVAILABLE').count(),
+                'total_leads': stats.leads,
+                'total_views': stats.views,
+                'active_cars': stats.active_cars,
                 'hot_car': hot_car_name,
-                'hot_car_views': hot_car_views,
-                'cpl': cpl,
-                'roi_multiplier': roi_multiplier
+                'hot_car_views': stats.hot_car_views,
+                'cpl': stats.cpl,
+                'roi_multiplier': stats.roi_multiplier
             }
 
             html_content = render_to_string('emails/monthly_report.html', context)
             text_content = strip_tags(html_content)
 
-            # --- SEND EMAIL ---
-            try:
-                msg = EmailMultiAlternatives(
-                    subject=f"Your {month_name} Performance Report 📈",
-                    body=text_content,
-                    from_email='BuyCars Africa <noreply@buycars.africa>',
-                    to=[dealer.email]
-                )
-                msg.attach_alternative(html_content, "text/html")
-                msg.send()
-                self.stdout.write(self.style.SUCCESS(f"Sent report to {dealer.email}"))
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Failed to send to {dealer.email}: {e}"))
+            msg = EmailMultiAlternatives(
+                subject=f"Your {month_name} Performance Report 📈",
+                body=text_content,
+                from_email='BuyCars Africa <noreply@buycars.africa>',
+                to=[dealer.email]
+            )
+            msg.attach_alternative(html_content, "text/html")
+            messages.append(msg)
+
+        # --- SEND EMAILS (pooled connections, retried, logged per recipient) ---
+        result = mailer.dispatch(messages, kind='monthly_report')
+        for email in result.sent:
+            self.stdout.write(self.style.SUCCESS(f"Sent report to {email}"))
+        for email, error in result.failed:
+            self.stdout.write(self.style.ERROR(f"Failed to send to {email}: {error}"))
 
         self.stdout.write(self.style.SUCCESS("Monthly Report Job Completed!"))
\ No newline at end of file
@@ -0,0 +1,103 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import F, Q
+from .images import media_names
+from .models import CarImage, MediaBlob, MediaTombstone
+from .storage import blob_storage
+
+# Tombstones that failed this many deletes are left for a human (see admin / --audit)
+MAX_ATTEMPTS = 5
+
+
+def still_referenced(names):
+    """Tombstoned names that have been referenced again since (re-upload of the same bytes, etc.)."""
+    names = set(names)
+    live = set(MediaBlob.objects.filter(name__in=names, refcount__gt=0).values_list('name', flat=True))
+    untracked = names - set(MediaBlob.objects.filter(name__in=names).values_list('name', flat=True))
+    if untracked:
+        query = Q(image__in=untracked)
+        for name in untracked:
+            query |= Q(renditions__icontains=name)
+        for image, renditions in CarImage.objects.filter(query).values_list('image', 'renditions'):
+            live |= untracked.intersection(media_names(image, renditions))
+    return live
+
+
+def sweep_batch(batch_size=100, after_id=0, dry_run=False, max_attempts=MAX_ATTEMPTS, storage=None):
+    """
+    Deletes up to `batch_size` tombstoned files with one bulk storage call.
+
+    Tombstones are claimed with SKIP LOCKED so several collectors can run at once, and the
+    matching MediaBlob rows stay locked during the delete: an upload of the same bytes
+    waits, then stores a fresh copy. Returns (summary, last tombstone id) or (None, after_id).
+    """
+    storage = storage or blob_storage
+    with transaction.atomic():
+        claim = MediaTombstone.objects.filter(attempts__lt=max_attempts, id__gt=after_id).order_by('id')
+        if not dry_run:
+            claim = claim.select_for_update(skip_locked=True)
+        batch = list(claim[:batch_size])
+        if not batch:
+            return None, after_id
+
+        names = [t.name for t in batch]
+        if not dry_run:
+            list(MediaBlob.objects.select_for_update().filter(name__in=names).values_list('id', flat=True))
+        live = still_referenced(names)
+        doomed = [name for name in names if name not in live]
+        summary = {'deleted': doomed, 'revived': sorted(live), 'failed': []}
+        if dry_run:
+            return summary, batch[-1].id
+
+        try:
+            failed = set(storage.delete_many(doomed)) if doomed else set()
+            error = 'Storage delete failed'
+        except Exception as e:
+            failed, error = set(doomed), str(e)[:255]
+
+        done = [name for name in doomed if name not in failed]
+        MediaBlob.objects.filter(name__in=done, refcount__lte=0).delete()
+        MediaTombstone.objects.filter(name__in=done + sorted(live)).delete()
+        if failed:
+            MediaTombstone.objects.filter(name__in=failed).update(attempts=F('attempts') + 1, last_error=error)
+        summary.update(deleted=done, failed=sorted(failed))
+    return summary, batch[-1].id
+
+
+def walk(storage, path):
+    try:
+        dirs, files = storage.listdir(path)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for name in files:
+        yield f"{path}/{name}" if path else name
+    for sub in dirs:
+        yield from walk(storage, f"{path}/{sub}" if path else sub)
+
+
+def audit(prefixes=('blobs', 'car_images'), storage=None):
+    """
+    Read-only consistency check between CarImage rows, MediaBlob counts and storage:
+      drift     blobs whose refcount differs from the references actually found
+      orphans   blobs with no references and no tombstone (nothing will ever delete them)
+      strays    files in storage that no row, blob or tombstone knows about
+      stuck     tombstones that exhausted their delete attempts
+    """
+    storage = storage or blob_storage
+    refs = Counter()
+    for image, renditions in CarImage.objects.values_list('image', 'renditions').iterator(chunk_size=2000):
+        refs.update(media_names(image, renditions))
+
+    tombstoned = set(MediaTombstone.objects.values_list('name', flat=True))
+    blobs = dict(MediaBlob.objects.values_list('name', 'refcount'))
+
+    report = {
+        'drift': [(name, count, refs[name]) for name, count in blobs.items() if max(count, 0) != refs[name]],
+        'orphans': [name for name in blobs if refs[name] == 0 and name not in tombstoned],
+        'strays': [],
+        'stuck': list(MediaTombstone.objects.filter(attempts__gte=MAX_ATTEMPTS).values_list('name', flat=True)),
+    }
+    known = set(refs) | set(blobs) | tombstoned
+    for prefix in prefixes:
+        report['strays'].extend(name for name in walk(storage.backend, prefix) if name not in known)
+    return report
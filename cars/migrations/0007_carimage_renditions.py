@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0006_auction_bid_remove_carcomment_car_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
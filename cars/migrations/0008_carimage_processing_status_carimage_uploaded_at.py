@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0007_carimage_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carimage',
+            name='processing_status',
+            field=models.CharField(choices=[('PENDING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], db_index=True, default='READY', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='carimage',
+            name='uploaded_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0008_carimage_processing_status_carimage_uploaded_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carimage',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='cars.carimage'),
+        ),
+        migrations.AddField(
+            model_name='carimage',
+            name='is_recycled',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='carimage',
+            name='phash',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='carimage',
+            name='phash_band0',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='carimage',
+            name='phash_band1',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='carimage',
+            name='phash_band2',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='carimage',
+            name='phash_band3',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
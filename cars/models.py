@@ -1,11 +1,11 @@
 from django.db import models
 from django.conf import settings
-from PIL import Image  # Requires: pip install Pillow
-from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
-import sys
+from django.templatetags.static import static
 from django.utils import timezone
 from django.contrib.humanize.templatetags.humanize import intcomma
+from .images import RENDITION_SIZES, media_names
+from .storage import get_blob_storage
+from . import duplicates, image_queue
 
 class Car(models.Model):
     # --- GLOBAL DROPDOWN CHOICES (SIMPLIFIED FOR KENYA) ---
@@ -112,36 +112,142 @@ class Car(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
+        self.normalize_names()
+        super().save(*args, **kwargs)
+
+    def normalize_names(self):
+        """'  toyota ' -> 'Toyota', 'bmw' -> 'BMW'. Called by save(); bulk inserts call it themselves."""
         if self.make:
             self.make = self.make.strip().title()
             if self.make.lower() == 'bmw': self.make = 'BMW'
         if self.model:
             self.model = self.model.strip().title()
-        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.year} {self.make} {self.model} - {self.city}, {self.country}"
 
+class MediaBlob(models.Model):
+    """One stored file per unique content; see cars.storage.ContentAddressedStorage."""
+    digest = models.CharField(max_length=64, unique=True)  # sha256 hex
+    name = models.CharField(max_length=255, unique=True)  # Storage name
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.IntegerField(default=0, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} (x{self.refcount})"
+
+class MediaTombstone(models.Model):
+    """A stored file nothing references any more, waiting for collect_media to delete it."""
+    name = models.CharField(max_length=255, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['attempts', 'id'])]
+
+    def __str__(self):
+        return self.name
+
 class CarImage(models.Model):
+    PROCESSING_CHOICES = [
+        ('PENDING', 'Processing'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
+    ]
+
     car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to='car_images/')
+    image = models.ImageField(upload_to='car_images/', storage=get_blob_storage)
     is_main = models.BooleanField(default=False)
+    # {'thumb': {'width': 320, 'height': 240, 'jpeg': <name>, 'webp': <name>}, 'card': {...}, 'full': {...}}
+    renditions = models.JSONField(default=dict, blank=True)
+    processing_status = models.CharField(max_length=10, choices=PROCESSING_CHOICES, default='READY', db_index=True)
+    uploaded_at = models.DateTimeField(auto_now_add=True, null=True)
+    # 64-bit dHash (signed for BIGINT) plus its four 16-bit bands for indexed near-duplicate lookup
+    phash = models.BigIntegerField(null=True, blank=True)
+    phash_band0 = models.IntegerField(null=True, blank=True, db_index=True)
+    phash_band1 = models.IntegerField(null=True, blank=True, db_index=True)
+    phash_band2 = models.IntegerField(null=True, blank=True, db_index=True)
+    phash_band3 = models.IntegerField(null=True, blank=True, db_index=True)
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates')
+    # Same photo already listed by a different dealer
+    is_recycled = models.BooleanField(default=False, db_index=True)
+    # sha256 of the uploaded original; identical uploads reuse a finished image's renditions
+    source_digest = models.CharField(max_length=64, blank=True, db_index=True)
+    # Filled in by processing so pages can reserve space and paint a blur-up before the photo loads
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    dominant_color = models.CharField(max_length=7, blank=True)
+    placeholder = models.TextField(blank=True)  # data:image/webp;base64,... (~16px wide)
 
     def save(self, *args, **kwargs):
-        if self.image:
-            try:
-                img = Image.open(self.image)
-                if img.mode != 'RGB': img = img.convert('RGB')
-                if img.width > 1200:
-                    output_size = (1200, (1200 * img.height) // img.width)
-                    img.thumbnail(output_size)
-                output = BytesIO()
-                img.save(output, format='JPEG', quality=75, optimize=True)
-                output.seek(0)
-                new_name = f"{self.image.name.split('.')[0]}.jpg"
-                self.image = InMemoryUploadedFile(output, 'ImageField', new_name, 'image/jpeg', sys.getsizeof(output), None)
-            except Exception as e: print(f"Image compression failed: {e}")
+        # Fresh uploads are stored as-is and resized by a background job (cars.image_queue);
+        # re-saving an existing image (e.g. set_main_image) never re-encodes it
+        is_upload = bool(self.image) and not self.image._committed
+        if is_upload:
+            self.processing_status = 'PENDING'
+            self.renditions = {}
+            self.placeholder, self.dominant_color, self.width, self.height = '', '', None, None
+            # New rows may arrive with the hash already computed by the upload view
+            if self.phash is None or self.pk:
+                value = duplicates.hash_upload(self.image.file)
+                for field, band in duplicates.hash_fields(value).items():
+                    setattr(self, field, band)
+            for field, match in duplicates.match_fields(self.phash, self.car, exclude_pk=self.pk).items():
+                setattr(self, field, match)
         super().save(*args, **kwargs)
+        if is_upload:
+            image_queue.enqueue([self.pk])
+
+    def placeholder_style(self, fit='cover'):
+        """Inline CSS painting the dominant colour + blurred preview behind the real photo."""
+        if not self.is_ready or not (self.placeholder or self.dominant_color):
+            return ''
+        style = f"background-color: {self.dominant_color or '#e9ecef'};"
+        if self.placeholder:
+            style += f" background-image: url({self.placeholder}); background-size: {fit}; background-position: center; background-repeat: no-repeat;"
+        return style
+
+    def media_names(self):
+        """Every stored file this row holds a reference to."""
+        return media_names(self.image.name if self.image else '', self.renditions)
+
+    @property
+    def is_ready(self):
+        return self.processing_status == 'READY'
+
+    def rendition_url(self, size='full', fmt='jpeg'):
+        """URL of one rendition, falling back to the main image for legacy rows."""
+        if not self.is_ready:
+            return static('images/photo-processing.svg') if fmt == 'jpeg' else None
+        name = self.renditions.get(size, {}).get(fmt) if self.renditions else None
+        if name:
+            return self.image.storage.url(name)
+        if fmt == 'jpeg' and self.image:
+            return self.image.url
+        return None
+
+    def srcset(self, fmt='jpeg'):
+        """'url 320w, url 640w, url 1200w' for <img srcset> / <source srcset>."""
+        if not self.renditions or not self.is_ready:
+            return ''
+        parts = []
+        for size in sorted(RENDITION_SIZES, key=RENDITION_SIZES.get):
+            url = self.rendition_url(size, fmt)
+            entry = self.renditions.get(size)
+            if url and entry:
+                parts.append(f"{url} {entry['width']}w")
+        return ', '.join(parts)
+
+    @property
+    def thumb_url(self): return self.rendition_url('thumb')
+
+    @property
+    def card_url(self): return self.rendition_url('card')
+
+    @property
+    def full_url(self): return self.rendition_url('full')
 
 # --- ANALYTICS, BOOKING, & MESSAGING (KEEPING EXISTING) ---
 class Booking(models.Model):
@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.http import FileResponse, HttpResponse
+from django.template.loader import get_template
+from django.utils import timezone
+from buycars_project.instrumentation import note_cache
+from .utils import html_to_pdf
+
+PDF_PREFIX = 'pdfs'
+REPORTS = f'{PDF_PREFIX}/reports'
+
+
+@dataclass
+class RenderedPDF:
+    name: str = None        # Name in the 'pdfs' storage (None when not stored)
+    content: bytes = None   # Set when built by this call; None when served from storage
+
+
+def get_storage():
+    return storages['pdfs']
+
+
+def report_name(dealer_id, month):
+    """
+    A dealer's monthly report for `month` (any date in it). Reports only cover
+    months that have ended, so their figures never change and (dealer, month)
+    is the whole cache key. Months are folders, so pruning is one listdir per month.
+    """
+    return f"{REPORTS}/{month:%Y-%m}/{dealer_id}.pdf"
+
+
+def stored(name):
+    """The already-built PDF under `name`, or None."""
+    found = get_storage().exists(name)
+    note_cache('pdf', hit=found)
+    return RenderedPDF(name) if found else None
+
+
+def render(template_src, context, name=None):
+    """
+    Builds the PDF in this process and returns a RenderedPDF, or None if xhtml2pdf
+    failed. xhtml2pdf holds the GIL for seconds, so anything slow belongs in a job
+    (see cars.build_report). With `name` the result is also saved to storage;
+    without it nothing is kept (one-off documents with personal data).
+    """
+    content = html_to_pdf(get_template(template_src).render(context))
+    if content is None:
+        return None
+    if name is None:
+        return RenderedPDF(content=content)
+
+    storage = get_storage()
+    saved = storage.save(name, ContentFile(content))
+    if saved != name:
+        storage.delete(saved)  # Another job built the same report first; keep theirs
+    return RenderedPDF(name, content)
+
+
+def prune(keep_months=None, today=None):
+    """
+    Deletes stored monthly reports more than PDF_KEEP_MONTHS months old (they are
+    rebuilt if asked for again), plus anything else under pdfs/, which only the old
+    content-hash cache wrote. Returns the number of files removed.
+    """
+    keep_months = settings.PDF_KEEP_MONTHS if keep_months is None else keep_months
+    today = today or timezone.now()
+    index = today.year * 12 + today.month - 1 - keep_months
+    oldest = f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+    storage = get_storage()
+    doomed = []
+    try:
+        folders, files = storage.listdir(PDF_PREFIX)
+    except FileNotFoundError:  # Nothing built yet (local storage)
+        return 0
+
+    def walk(folder):
+        folders, files = storage.listdir(folder)
+        doomed.extend(f"{folder}/{name}" for name in files)
+        for sub in folders:
+            walk(f"{folder}/{sub}")
+
+    doomed.extend(f"{PDF_PREFIX}/{name}" for name in files)
+    for folder in folders:
+        if folder != 'reports':
+            walk(f"{PDF_PREFIX}/{folder}")
+    if 'reports' in folders:
+        for month in storage.listdir(REPORTS)[0]:
+            if month < oldest:
+                walk(f"{REPORTS}/{month}")
+
+    for name in doomed:
+        storage.delete(name)
+    return len(doomed)
+
+
+def response(pdf, filename, attachment=True):
+    """Small fresh PDFs go out from memory; stored or large ones stream from storage."""
+    disposition = 'attachment' if attachment else 'inline'
+    if pdf.name is None or (pdf.content is not None and len(pdf.content) <= settings.PDF_INLINE_MAX_BYTES):
+        resp = HttpResponse(pdf.content, content_type='application/pdf')
+        resp['Content-Disposition'] = f'{disposition}; filename="{filename}"'
+        return resp
+    return FileResponse(get_storage().open(pdf.name, 'rb'), as_attachment=attachment,
+                        filename=filename, content_type='application/pdf')
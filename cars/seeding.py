@@ -0,0 +1,321 @@
+import io
+import json
+import random
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from PIL import Image, ImageDraw
+from users.models import DealerProfile
+from . import duplicates
+from .images import build_placeholder, build_renditions, media_names, store_renditions
+from .models import Car, CarImage, CarView, Lead, MediaBlob, SearchTerm
+from .signals import batched_release
+from .storage import blob_storage
+
+User = get_user_model()
+
+PREFIX = 'bench_dealer_'  # Every seeded dealer's username starts with this
+PASSWORD = 'Bench@123'
+
+# Named sizes; seed_benchmark options override any of these
+SCALES = {
+    'small':  {'dealers': 100,    'cars': 10_000,    'views': 200_000,    'leads': 20_000},
+    'medium': {'dealers': 1_000,  'cars': 100_000,   'views': 5_000_000,  'leads': 200_000},
+    'large':  {'dealers': 10_000, 'cars': 1_000_000, 'views': 50_000_000, 'leads': 2_000_000},
+}
+
+# (make, model, body type, base price KES, engine cc)
+CATALOG = [
+    ('Toyota', 'Vitz', 'Hatchback', 950_000, 1000), ('Toyota', 'Fielder', 'Wagon', 1_600_000, 1500),
+    ('Toyota', 'Axio', 'Sedan', 1_450_000, 1500), ('Toyota', 'Prado', 'SUV', 6_500_000, 2800),
+    ('Toyota', 'Hilux', 'Pickup', 4_500_000, 2400), ('Toyota', 'Hiace', 'Bus', 3_800_000, 3000),
+    ('Mazda', 'Demio', 'Hatchback', 850_000, 1300), ('Mazda', 'CX-5', 'SUV', 2_900_000, 2200),
+    ('Honda', 'Fit', 'Hatchback', 900_000, 1300), ('Honda', 'CR-V', 'SUV', 3_500_000, 2000),
+    ('Nissan', 'Note', 'Hatchback', 800_000, 1200), ('Nissan', 'X-Trail', 'SUV', 2_400_000, 2000),
+    ('Subaru', 'Forester', 'SUV', 2_600_000, 2000), ('Subaru', 'Impreza', 'Hatchback', 1_600_000, 1600),
+    ('Isuzu', 'D-Max', 'Pickup', 4_200_000, 3000), ('Isuzu', 'FRR', 'Truck', 6_000_000, 5200),
+    ('Mercedes-Benz', 'C200', 'Sedan', 3_400_000, 1800), ('Mercedes-Benz', 'E250', 'Sedan', 5_500_000, 2000),
+    ('BMW', '320i', 'Sedan', 3_100_000, 2000), ('BMW', 'Z4', 'Convertible', 4_800_000, 2500),
+    ('Volkswagen', 'Golf', 'Hatchback', 1_400_000, 1400), ('Mitsubishi', 'Outlander', 'SUV', 2_800_000, 2400),
+]
+COLORS = ['White', 'Pearl White', 'Black', 'Silver', 'Grey', 'Blue', 'Wine Red']
+PAINT = {'White': (236, 236, 236), 'Pearl White': (245, 240, 228), 'Black': (30, 30, 34), 'Silver': (180, 184, 190),
+         'Grey': (110, 114, 120), 'Blue': (36, 80, 160), 'Wine Red': (110, 20, 36)}
+STATUSES = (['AVAILABLE'] * 14) + (['SOLD'] * 4) + ['RESERVED', 'HIDDEN']
+PLANS = ['FREE', 'STARTER', 'STARTER', 'LITE', 'LITE', 'PRO']
+ADAPTED_TYPES = {'DateTimeField', 'DecimalField', 'JSONField'}
+
+
+class Writer:
+    """
+    Appends rows to a model's table without going through model instances: COPY on
+    PostgreSQL, executemany() elsewhere. Values are written as given, so auto_now_add
+    columns keep the historical timestamps the generator picked.
+    """
+    def __init__(self, model, fields, batch_size):
+        self.model, self.batch_size = model, batch_size
+        self.fields = [model._meta.get_field(name) for name in fields]
+        self.columns = ', '.join(connection.ops.quote_name(f.column) for f in self.fields)
+        self.table = connection.ops.quote_name(model._meta.db_table)
+        self.rows, self.written = [], 0
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        # One transaction per batch (in autocommit SQLite would commit every row)
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.copy_expert(f"COPY {self.table} ({self.columns}) FROM STDIN", self._copy_text())
+            else:
+                placeholders = ', '.join(['%s'] * len(self.fields))
+                cursor.executemany(f"INSERT INTO {self.table} ({self.columns}) VALUES ({placeholders})", self._prepared())
+        self.written += len(self.rows)
+        self.rows = []
+
+    def _prepared(self):
+        # Only the types the driver can't take as-is go through the (slow) field adaptation
+        db = connections[DEFAULT_DB_ALIAS]
+        adapt = [(i, f) for i, f in enumerate(self.fields) if f.get_internal_type() in ADAPTED_TYPES]
+        for row in self.rows:
+            row = list(row)
+            for i, field in adapt:
+                row[i] = field.get_db_prep_save(row[i], db)
+            yield row
+
+    def _copy_text(self):
+        buffer = io.StringIO()
+        for row in self.rows:
+            buffer.write('\t'.join(_copy_value(v) for v in row))
+            buffer.write('\n')
+        buffer.seek(0)
+        return buffer
+
+
+def _copy_value(value):
+    """One value in COPY's text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif isinstance(value, bool):
+        value = 't' if value else 'f'
+    else:
+        value = str(value)
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def existing_dealers():
+    return User.objects.filter(username__startswith=PREFIX)
+
+
+def wipe(chunk=50, log=print):
+    """Deletes a previously seeded dataset, a few dealers at a time, releasing photos in one go per chunk."""
+    ids = list(existing_dealers().order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), chunk):
+        with transaction.atomic(), batched_release():
+            User.objects.filter(pk__in=ids[start:start + chunk]).delete()
+        log(f"   Removed {min(start + chunk, len(ids))}/{len(ids)} dealers")
+
+
+def draw_photo(index, body, color):
+    """A 1600x1200 'stock photo' drawn locally: sky, road, a car-shaped block in the listing's colour."""
+    img = Image.new('RGB', (1600, 1200))
+    draw = ImageDraw.Draw(img)
+    for y in range(720):
+        shade = 150 + y * 90 // 720
+        draw.line([(0, y), (1600, y)], fill=(shade - 60, shade - 20, shade + (index * 7) % 20))
+    draw.rectangle([0, 720, 1600, 1200], fill=(70 + index % 30, 70, 74))
+    paint = PAINT[color]
+    roof = 360 if body in ('SUV', 'Bus', 'Truck') else 430
+    draw.rounded_rectangle([260, 560, 1340, 860], radius=60, fill=paint)
+    draw.rounded_rectangle([420, roof, 1120, 600], radius=70, fill=paint)
+    draw.rectangle([480, roof + 40, 1060, 580], fill=(120, 160, 190))
+    for x in (450, 1150):
+        draw.ellipse([x - 110, 760, x + 110, 980], fill=(20, 20, 20))
+        draw.ellipse([x - 50, 820, x + 50, 920], fill=(160, 160, 160))
+    draw.text((60, 60), f"{body} #{index}", fill=(255, 255, 255))
+    buffer = BytesIO()
+    img.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def build_masters(count):
+    """
+    Renders `count` photos and stores them with their renditions like a processed
+    upload. Returns [(body_type, CarImage field values)]; each stored file holds one
+    reference until finish_masters() sets the real counts.
+    """
+    bodies = sorted({body for _, _, body, _, _ in CATALOG})
+    masters = []
+    for index in range(count):
+        body, color = bodies[index % len(bodies)], COLORS[index % len(COLORS)]
+        renditions = build_renditions(BytesIO(draw_photo(index, body, color)))
+        stem = f"bench_{index:03d}"
+        fields = {
+            'image': blob_storage.save(f"car_images/{stem}.jpg", ContentFile(renditions['full']['jpeg'])),
+            'renditions': store_renditions(stem, renditions),
+            **build_placeholder(renditions),
+            **duplicates.hash_fields(duplicates.compute_dhash(BytesIO(renditions['thumb']['jpeg']))),
+        }
+        masters.append((body, fields))
+    return masters
+
+
+def finish_masters(masters, uses):
+    """Sets each stored file's reference count to the number of CarImage rows using it."""
+    counts = Counter()
+    for index, (_, fields) in enumerate(masters):
+        for name in media_names(fields['image'], fields['renditions']):
+            counts[name] += uses[index]
+    # build_masters() already handed out one reference per save
+    used = {name: n for name, n in counts.items() if n}
+    if used:
+        MediaBlob.objects.filter(name__in=used).update(refcount=F('refcount') + Case(
+            *[When(name=name, then=Value(n - 1)) for name, n in used.items()], default=Value(0)
+        ))
+    blob_storage.release([name for name, n in counts.items() if not n])
+
+
+def seed(dealers, cars, views, leads, photos=2, masters=36, days=365, seed=1, batch_size=10_000, log=print):
+    """
+    Generates a reproducible dataset: the same arguments always produce the same rows,
+    with timestamps relative to today (so "last 7 days" queries see the same data).
+    Returns the row counts written per table.
+    """
+    rng = random.Random(seed)
+    catalog = []
+    for make, model, body, base, cc in CATALOG:
+        names = Car(make=make, model=model)
+        names.normalize_names()  # Same spelling the site stores ('Cx-5'), so searches behave alike
+        catalog.append((names.make, names.model, body, base, cc))
+    anchor = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    span = days * 86400
+
+    # --- Dealers ---
+    log(f"👤 {dealers} dealers")
+    password = make_password(PASSWORD)
+    User.objects.bulk_create([
+        User(username=f"{PREFIX}{i:05d}", email=f"dealer{i}@bench.example", role='DEALER', password=password)
+        for i in range(dealers)
+    ], batch_size=batch_size)
+    dealer_ids = list(existing_dealers().order_by('username').values_list('id', flat=True))
+    cities = [code for code, _ in DealerProfile.CITY_CHOICES]
+    profiles = []
+    for i, user_id in enumerate(dealer_ids):
+        plan = rng.choice(PLANS)
+        expiry = anchor + timedelta(days=rng.randint(-20, 60)) if plan != 'FREE' else None
+        profiles.append(DealerProfile(
+            user_id=user_id, business_name=f"Bench Motors {i}", city=rng.choice(cities),
+            plan_type=plan, subscription_expiry=expiry, is_verified=rng.random() < 0.3,
+        ))
+    DealerProfile.objects.bulk_create(profiles, batch_size=batch_size)
+
+    # --- Cars --- (a long tail: a few big yards, many small ones)
+    log(f"🚗 {cars} cars")
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(dealer_ids))]
+    owners = rng.choices(dealer_ids, weights=weights, k=cars)
+    fields = ['dealer', 'registration_number', 'make', 'model', 'year', 'price', 'country', 'city', 'listing_currency',
+              'drive_side', 'location', 'listing_type', 'rent_price_per_day', 'min_hire_days', 'is_available_for_rent',
+              'mileage', 'engine_cc', 'color', 'condition', 'transmission', 'fuel_type', 'body_type', 'drive_type',
+              'description', 'status', 'is_featured', 'created_at']
+    writer = Writer(Car, fields, batch_size)
+    car_cities = [code for code, _ in Car.CITY_CHOICES]
+    born, bodies = [], []
+    for i in range(cars):
+        make, model, body, base, cc = rng.choice(catalog)
+        year = rng.randint(2010, 2025)
+        price = Decimal(max(300_000, round(base * (0.75 + (year - 2010) * 0.03) * rng.uniform(0.85, 1.15), -3)))
+        listing = rng.choices(['SALE', 'RENT', 'BOTH'], weights=[90, 5, 5])[0]
+        rent = Decimal(round(float(price) / 400, -2)) if listing != 'SALE' else None
+        created = anchor - timedelta(seconds=rng.randrange(span))
+        city = rng.choice(car_cities)
+        color = rng.choice(COLORS)
+        writer.add((
+            owners[i], f"K{chr(65 + i % 26)}{chr(65 + i // 26 % 26)} {i % 1000:03d}{chr(65 + i // 676 % 26)}",
+            make, model, year, price, 'KE', city, 'KES', 'RHD', city, listing, rent, 1, True,
+            rng.randint(0, 180_000), cc, color, rng.choice(['FOREIGN', 'FOREIGN', 'LOCAL', 'NEW']),
+            rng.choice(['Automatic', 'Automatic', 'Manual', 'CVT']), rng.choice(['Petrol', 'Petrol', 'Diesel', 'Hybrid']),
+            body, rng.choice(['2WD', '2WD', '4WD', 'AWD']),
+            f"{year} {make} {model}, {color.lower()}, {city}. Clean unit, full service history.",
+            rng.choice(STATUSES), rng.random() < 0.03, created,
+        ))
+        born.append(created)
+        bodies.append(body)
+    writer.flush()
+    car_ids = list(Car.objects.filter(dealer_id__in=dealer_ids).order_by('id').values_list('id', flat=True))
+
+    # --- Photos --- (a few locally drawn masters shared by every listing, as after dedupe)
+    log(f"🖼️ {len(car_ids) * photos} photos from {masters} locally drawn masters")
+    made = build_masters(masters) if photos else []
+    by_body = {}
+    for index, (body, _) in enumerate(made):
+        by_body.setdefault(body, []).append(index)
+    uses = Counter()
+    image_fields = ['car', 'image', 'is_main', 'renditions', 'processing_status', 'uploaded_at', 'phash',
+                    'phash_band0', 'phash_band1', 'phash_band2', 'phash_band3', 'is_recycled', 'source_digest',
+                    'width', 'height', 'dominant_color', 'placeholder']
+    writer = Writer(CarImage, image_fields, batch_size)
+    for car_id, created, body in zip(car_ids, born, bodies) if made else ():
+        choices = by_body.get(body) or range(len(made))
+        for n in range(photos):
+            index = rng.choice(choices)
+            uses[index] += 1
+            m = made[index][1]
+            writer.add((
+                car_id, m['image'], n == 0, m['renditions'], 'READY', created, m['phash'],
+                m['phash_band0'], m['phash_band1'], m['phash_band2'], m['phash_band3'], False, '',
+                m['width'], m['height'], m['dominant_color'], m['placeholder'],
+            ))
+    writer.flush()
+    if made:
+        finish_masters(made, uses)
+
+    # --- Views and leads --- (popular cars get most of the traffic, always after the listing went up)
+    popular = list(range(len(car_ids)))
+    rng.shuffle(popular)
+
+    def pick():
+        index = popular[int(len(popular) * rng.random() ** 3)]
+        created = born[index]
+        return car_ids[index], created + (anchor - created) * rng.random()
+
+    def ip():
+        bits = rng.getrandbits(24)
+        return f"10.{bits >> 16}.{bits >> 8 & 255}.{bits & 255}"
+
+    log(f"👀 {views} views")
+    writer = Writer(CarView, ['car', 'ip_address', 'timestamp'], batch_size)
+    for n in range(views if car_ids else 0):
+        car_id, when = pick()
+        writer.add((car_id, ip(), when))
+        if n and n % 1_000_000 == 0:
+            log(f"   {n:,} views")
+    writer.flush()
+
+    log(f"📞 {leads} leads")
+    writer = Writer(Lead, ['car', 'action_type', 'timestamp', 'user', 'ip_address'], batch_size)
+    for _ in range(leads if car_ids else 0):
+        car_id, when = pick()
+        writer.add((car_id, rng.choice(['CALL', 'WHATSAPP', 'WHATSAPP']), when, None, ip()))
+    writer.flush()
+
+    terms = Counter(rng.choice(catalog)[rng.choice([0, 1])].lower() for _ in range(min(views // 20, 100_000)))
+    SearchTerm.objects.bulk_create([SearchTerm(term=t, count=c) for t, c in terms.items()], ignore_conflicts=True)
+
+    # Fresh planner statistics, so the first benchmark doesn't run on empty estimates
+    if connection.vendor in ('postgresql', 'sqlite'):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    return {'dealers': len(dealer_ids), 'cars': len(car_ids), 'photos': sum(uses.values()), 'views': views, 'leads': leads}
@@ -1,37 +1,64 @@
-from django.db.models.signals import post_delete, pre_save
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from .models import CarImage
 
+# CarImage files live in the content-addressed blob storage (cars.storage). Releasing
+# only updates reference counts and writes tombstones; the files themselves are
+# deleted in bulk by the collect_media command, never inside the request.
+
+def release_media(names):
+    try:
+        CarImage._meta.get_field('image').storage.release(names)
+    except Exception as e:
+        # Log error but don't crash the deletion process
+        print(f"Error releasing media {names}: {e}")
+
+# Set by batched_release(): deleted images add their names here instead of releasing one by one
+_pending_release = ContextVar('pending_media_release', default=None)
+
+@contextmanager
+def batched_release():
+    """
+    Collects the media of every CarImage deleted inside the block and releases it
+    all with one refcount UPDATE at the end (bulk deletes of many cars).
+    Nothing is released if the block raises.
+    """
+    names = []
+    token = _pending_release.set(names)
+    try:
+        yield names
+    finally:
+        _pending_release.reset(token)
+    release_media(names)
+
 @receiver(post_delete, sender=CarImage)
 def cleanup_car_image(sender, instance, **kwargs):
     """
-    Deletes the file from Cloudinary/Storage when the image object is deleted.
+    Releases the photo and its renditions when the image object is deleted
+    (one bulk refcount UPDATE per image, no storage calls).
     """
-    if instance.image:
-        try:
-            # save=False prevents Django from trying to save the model again
-            instance.image.delete(save=False)
-        except Exception as e:
-            # Log error but don't crash the deletion process
-            print(f"Error deleting image file: {e}")
+    pending = _pending_release.get()
+    if pending is not None:
+        pending.extend(instance.media_names())
+        return
+    release_media(instance.media_names())
 
 @receiver(pre_save, sender=CarImage)
-def cleanup_pre_update(sender, instance, **kwargs):
+def remember_replaced_media(sender, instance, **kwargs):
     """
-    If the image is being updated (replaced with a new one), 
-    delete the old file from storage to prevent orphans.
+    Only a fresh upload onto an existing row can orphan files, so plain re-saves
+    (set_main_image etc.) skip the lookup entirely.
     """
-    if not instance.pk:
-        return # It's a new object, nothing to replace
-
-    try:
-        old_instance = CarImage.objects.get(pk=instance.pk)
-        old_image = old_instance.image
-        new_image = instance.image
+    if not instance.pk or not instance.image or instance.image._committed:
+        return
+    old = CarImage.objects.filter(pk=instance.pk).only('image', 'renditions').first()
+    instance._replaced_media = old.media_names() if old else []
 
-        # If there was an image, and it's different from the new one
-        if old_image and old_image != new_image:
-            old_image.delete(save=False)
-            
-    except CarImage.DoesNotExist:
-        pass # Object not found, nothing to do
\ No newline at end of file
+@receiver(post_save, sender=CarImage)
+def release_replaced_media(sender, instance, **kwargs):
+    names = getattr(instance, '_replaced_media', None)
+    if names:
+        del instance._replaced_media
+        release_media(names)
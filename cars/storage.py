@@ -0,0 +1,146 @@
+import hashlib
+import os
+from collections import Counter
+from django.core.files.storage import Storage, default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+
+BLOB_PREFIX = 'blobs'
+# Most public IDs Cloudinary's Admin API deletes per call
+CLOUDINARY_BULK_LIMIT = 100
+
+
+def digest_of(content):
+    """sha256 of a django File, read in chunks and rewound for the upload that follows."""
+    sha = hashlib.sha256()
+    for chunk in content.chunks():
+        sha.update(chunk)
+    content.seek(0)
+    return sha.hexdigest()
+
+
+class ContentAddressedStorage(Storage):
+    """
+    Stores each unique file once, under blobs/<ab>/<sha256><ext>, on top of the default
+    storage (local disk in DEBUG, Cloudinary in production). A MediaBlob row tracks how
+    many references point at each file.
+
+    Reference rules: every save() hands the caller one reference, and every delete()
+    drops one. A file whose count reaches zero is tombstoned and removed later by the
+    collect_media command, never inside the request.
+    """
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend or default_storage
+
+    # --- Writing ---
+    def get_available_name(self, name, max_length=None):
+        return name  # Same content, same name: never suffix
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        digest = digest_of(content)
+        if self.retain_digest(digest):
+            return MediaBlob.objects.values_list('name', flat=True).get(digest=digest)
+
+        ext = os.path.splitext(name)[1].lower()
+        stored = self.backend.save(f"{BLOB_PREFIX}/{digest[:2]}/{digest}{ext}", content)
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(digest=digest, name=stored, size=content.size, refcount=1)
+        except IntegrityError:
+            # Another request stored the same content at the same moment: keep theirs
+            if stored != MediaBlob.objects.values_list('name', flat=True).get(digest=digest):
+                self.backend.delete(stored)
+            self.retain_digest(digest)
+            return MediaBlob.objects.values_list('name', flat=True).get(digest=digest)
+        return stored
+
+    def retain_digest(self, digest):
+        from .models import MediaBlob
+        return MediaBlob.objects.filter(digest=digest).update(refcount=F('refcount') + 1) > 0
+
+    def retain(self, names):
+        """Adds one reference to each name. Returns how many were tracked blobs."""
+        from .models import MediaBlob
+        names = [n for n in names if n]
+        return MediaBlob.objects.filter(name__in=names).update(refcount=F('refcount') + 1) if names else 0
+
+    # --- Releasing ---
+    def delete(self, name):
+        self.release([name])
+
+    def release(self, names):
+        """
+        Drops one reference per name (a name may repeat). Files that end up unreferenced
+        are not touched here: they get a MediaTombstone, and the collect_media command
+        deletes them later in bulk. Names that predate this storage (no MediaBlob row)
+        were owned by a single row, so they are tombstoned straight away.
+        """
+        from .models import MediaBlob, MediaTombstone
+
+        counts = Counter(name for name in names if name)
+        if not counts:
+            return
+        with transaction.atomic():
+            tracked = set(MediaBlob.objects.filter(name__in=counts).values_list('name', flat=True))
+            if tracked:
+                MediaBlob.objects.filter(name__in=tracked).update(refcount=F('refcount') - Case(
+                    *[When(name=name, then=Value(counts[name])) for name in tracked], default=Value(0)
+                ))
+            dead = set(MediaBlob.objects.filter(name__in=tracked, refcount__lte=0).values_list('name', flat=True))
+            dead |= set(counts) - tracked
+            MediaTombstone.objects.bulk_create([MediaTombstone(name=name) for name in dead], ignore_conflicts=True)
+
+    def delete_many(self, names):
+        """
+        Deletes files from the backend, using Cloudinary's bulk API (100 per call) when
+        that's where they live. Returns the names that could not be deleted.
+        """
+        names = list(names)
+        if getattr(self.backend, 'RESOURCE_TYPE', None) and self.backend.__module__.startswith('cloudinary_storage'):
+            import cloudinary.api
+            failed = []
+            for i in range(0, len(names), CLOUDINARY_BULK_LIMIT):
+                chunk = names[i:i + CLOUDINARY_BULK_LIMIT]
+                response = cloudinary.api.delete_resources(chunk, resource_type=self.backend.RESOURCE_TYPE, invalidate=True)
+                deleted = response.get('deleted', {})
+                failed += [name for name in chunk if deleted.get(name) not in ('deleted', 'not_found')]
+            return failed
+
+        failed = []
+        for name in names:
+            try:
+                self.backend.delete(name)
+            except Exception as e:
+                print(f"Error deleting {name}: {e}")
+                failed.append(name)
+        return failed
+
+    # --- Reading (delegated) ---
+    def _open(self, name, mode='rb'):
+        return self.backend.open(name, mode)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+
+blob_storage = ContentAddressedStorage()
+
+
+def get_blob_storage():
+    # Callable so migrations reference this function instead of serializing the instance
+    return blob_storage
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from jobs.queue import task
+from users.reports import DealerReport
+from . import pdf
+from .bulk_import import fetch_car_photos
+from .images import process_car_image
+
+
+@task('cars.collect_media')
+def collect_media(limit=5000):
+    call_command('collect_media', limit=limit)
+
+
+@task('cars.fetch_photos')
+def fetch_photos(car_id, urls, limit):
+    """Photo URLs from a bulk inventory import (cars.bulk_import)."""
+    fetch_car_photos(car_id, urls, limit)
+
+
+@task('cars.process_images', priority=5)
+def process_images(image_id):
+    """Resizes one uploaded photo into its renditions (queued on upload by cars.image_queue)."""
+    process_car_image(image_id)
+
+
+@task('cars.sweep_images')
+def sweep_images():
+    """Re-queues photos still PENDING long after upload, e.g. if their job was pruned or lost."""
+    call_command('process_images')
+
+
+@task('cars.build_report', priority=5, max_attempts=2)
+def build_report(dealer_id, month):
+    """
+    Stores a dealer's monthly report PDF for an ended month ('YYYY-MM') for download_report.
+    Queued for every emailed dealer by send_monthly_report, so the stock figures are the
+    month-end ones, and on demand for older months.
+    """
+    dealer = get_user_model().objects.select_related('dealer_profile').get(pk=dealer_id)
+    start = datetime.strptime(month, '%Y-%m').replace(tzinfo=dt_timezone.utc)
+    end = (start + timedelta(days=32)).replace(day=1)
+    stats = DealerReport.for_window(start, end)[dealer_id]
+    context = {
+        'dealer': dealer, 'profile': dealer.dealer_profile, 'date': end - timedelta(days=1),
+        'month_name': start.strftime('%B %Y'),
+        'total_cars': stats.total_cars, 'total_views': stats.views, 'total_leads': stats.leads,
+        'whatsapp_clicks': stats.whatsapp_clicks, 'calls': stats.calls,
+        'cpl': stats.cpl, 'inventory_value': stats.inventory_value,
+        'sold_count': stats.sold_cars,
+    }
+    if pdf.render('dealer/monthly_report.html', context, name=pdf.report_name(dealer_id, start)) is None:
+        raise RuntimeError(f"Could not build the {month} report for dealer #{dealer_id}")
+
+
+@task('cars.prune_pdfs')
+def prune_pdfs():
+    """Deletes monthly report PDFs older than PDF_KEEP_MONTHS (scheduled in JOB_SCHEDULE)."""
+    print(f"Pruned {pdf.prune()} stored PDF(s).")
@@ -0,0 +1,35 @@
+from django import template
+
+register = template.Library()
+
+# Rough rendered widths for each layout, so the browser picks the smallest rendition that fits
+SIZES = {
+    'thumb': '120px',
+    'card': '(max-width: 576px) 100vw, (max-width: 992px) 50vw, 320px',
+    'full': '(max-width: 992px) 100vw, 800px',
+}
+
+@register.inclusion_tag('cars/includes/picture.html')
+def car_picture(car_image, size='card', css_class='', style='', alt='', img_id='', car=None):
+    """
+    Renders a <picture> with WebP + JPEG srcsets for a CarImage. Processed photos also get
+    width/height (no layout shift) and their inline blur-up placeholder as a background.
+    Pass the car (already loaded by the caller) for the usual "Make Model" alt text.
+    Usage: {% car_picture car.images.first 'card' css_class='w-100 h-100' car=car %}
+    """
+    fit = 'contain' if 'contain' in f"{css_class} {style}" else 'cover'
+    placeholder = car_image.placeholder_style(fit) if car_image else ''
+    return {
+        'img': car_image,
+        'width': car_image.width if car_image and car_image.is_ready else None,
+        'height': car_image.height if car_image and car_image.is_ready else None,
+        'src': car_image.rendition_url(size) if car_image else None,
+        'webp_srcset': car_image.srcset('webp') if car_image else '',
+        'jpeg_srcset': car_image.srcset('jpeg') if car_image else '',
+        'sizes': SIZES.get(size, SIZES['card']),
+        'css_class': css_class,
+        'style': f"{style} {placeholder}".strip(),
+        'alt': alt or (f"{car.make} {car.model}" if car else ''),
+        'img_id': img_id,
+        'lazy': size != 'full',
+    }
@@ -1,3 +1,238 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from buycars_project.testing import QueryBudgetMixin
+from jobs.models import Job
+from jobs.queue import REGISTRY, claim, run
+from users.models import DealerProfile
+from . import bulk_actions, bulk_import, pdf
+from .models import Car, CarImage
+from .seeding import existing_dealers, seed
 
-# Create your tests here.
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp(prefix='buycars-tests-')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, ALLOWED_HOSTS=['*'])
+class HotPageQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    The busiest pages on a small seed_benchmark dataset (~40 cars per dealer).
+    Budgets sit well below the car count, so a per-car query (N+1) fails them.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        seed(dealers=3, cars=120, views=600, leads=60, masters=4, log=lambda message: None)
+        cls.dealer = existing_dealers().annotate(n=Count('cars')).order_by('-n', 'id').first()
+        cls.car = Car.objects.filter(status='AVAILABLE').order_by('id').first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_home(self):
+        self.assertQueryBudget('home', queries=5)
+
+    def test_search(self):
+        self.assertQueryBudget('home', queries=8, data={'q': 'toyota'})
+
+    def test_car_detail(self):
+        self.assertQueryBudget('car_detail', queries=18, args=[self.car.id])
+
+    def test_dealer_showroom(self):
+        self.assertQueryBudget('dealer_showroom', queries=8, args=[self.dealer.username])
+
+    def test_dealer_dashboard(self):
+        self.client.force_login(self.dealer)
+        self.assertQueryBudget('dealer_dashboard', queries=35)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageProcessingJobTests(TestCase):
+    """Uploads are resized by cars.process_images jobs in run_workers, not in the web process."""
+    @classmethod
+    def setUpTestData(cls):
+        seed(dealers=1, cars=2, views=0, leads=0, masters=1, log=lambda message: None)
+        cls.car = Car.objects.order_by('id').first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def upload(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1600, 1200), (200, 30, 30)).save(buffer, format='JPEG')
+        return CarImage.objects.create(car=self.car, image=SimpleUploadedFile('photo.jpg', buffer.getvalue(), 'image/jpeg'))
+
+    def run_jobs(self):
+        while (job := claim('test')) is not None:
+            run(job)
+
+    def test_upload_is_processed_by_a_job(self):
+        image = self.upload()
+        self.assertEqual(image.processing_status, 'PENDING')
+        self.assertEqual(list(Job.objects.values_list('name', 'kwargs')), [('cars.process_images', {'image_id': image.pk})])
+
+        self.run_jobs()
+        image.refresh_from_db()
+        self.assertEqual(image.processing_status, 'READY')
+        self.assertEqual(image.width, 1200)
+
+    def test_sweep_requeues_lost_photos_once(self):
+        image = self.upload()
+        Job.objects.all().delete()  # The job was lost
+        CarImage.objects.filter(pk=image.pk).update(uploaded_at=timezone.now() - timedelta(hours=1))
+
+        REGISTRY['cars.sweep_images']()
+        REGISTRY['cars.sweep_images']()  # Still queued: not queued again
+        self.assertEqual(Job.objects.filter(name='cars.process_images', status='QUEUED').count(), 1)
+
+        self.run_jobs()
+        self.assertEqual(CarImage.objects.get(pk=image.pk).processing_status, 'READY')
+
+
+PDF_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'pdfs': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': MEDIA_ROOT}},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, STORAGES=PDF_STORAGES)
+class MonthlyReportPdfTests(TestCase):
+    """download_report serves (dealer, month) PDFs from storage and has a job build missing ones."""
+    @classmethod
+    def setUpTestData(cls):
+        seed(dealers=1, cars=3, views=10, leads=2, masters=1, log=lambda message: None)
+        cls.dealer = existing_dealers().first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(os.path.join(MEDIA_ROOT, pdf.PDF_PREFIX), ignore_errors=True)
+        self.client.force_login(self.dealer)
+
+    def test_missing_report_is_built_by_a_job_then_served(self):
+        url = reverse('download_report') + '?month=2026-01'
+        for _ in range(2):  # The pending page refreshes itself: still one job
+            response = self.client.get(url)
+            self.assertContains(response, 'January 2026')
+        self.assertEqual(list(Job.objects.values_list('name', 'kwargs')),
+                         [('cars.build_report', {'dealer_id': self.dealer.id, 'month': '2026-01'})])
+
+        self.assertEqual(run(claim('test')), 'done')
+        self.assertTrue(pdf.get_storage().exists(pdf.report_name(self.dealer.id, date(2026, 1, 1))))
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_only_ended_months_have_reports(self):
+        response = self.client.get(reverse('download_report') + f"?month={timezone.now():%Y-%m}")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Job.objects.exists())
+
+    def test_prune_keeps_recent_months(self):
+        storage = pdf.get_storage()
+        names = {
+            'old': pdf.report_name(self.dealer.id, date(2026, 5, 1)),
+            'kept': pdf.report_name(self.dealer.id, date(2026, 7, 1)),
+            'legacy': 'pdfs/ab/abcdef.pdf',  # Content-hash cache from before reports were keyed by month
+        }
+        for name in names.values():
+            storage.save(name, ContentFile(b'%PDF-1.4'))
+
+        self.assertEqual(pdf.prune(keep_months=3, today=date(2026, 10, 19)), 2)
+        self.assertEqual({key for key, name in names.items() if storage.exists(name)}, {'kept'})
+
+
+class PlanLimitTests(TestCase):
+    """Plan limits (DealerProfile.plan_limits) count live AVAILABLE cars only, as check_expiry does."""
+    @classmethod
+    def setUpTestData(cls):
+        cls.dealer = User.objects.create(username='limited')
+        DealerProfile.objects.create(user=cls.dealer, business_name='Limited Motors', plan_type='STARTER',
+                                     subscription_expiry=timezone.now() + timedelta(days=10))
+
+    def setUp(self):
+        self.client.force_login(self.dealer)
+
+    def cars(self, count, status='AVAILABLE'):
+        return [Car.objects.create(dealer=self.dealer, make='Toyota', model='Vitz', year=2015, price=800_000,
+                                   description='-', status=status) for _ in range(count)]
+
+    def live(self):
+        return Car.objects.filter(dealer=self.dealer, status='AVAILABLE').count()
+
+    def test_import_counts_only_live_cars(self):
+        self.cars(3)
+        self.cars(4, status='SOLD')
+        self.cars(2, status='HIDDEN')
+        rows = [','.join(bulk_import.TEMPLATE_HEADER)] + [
+            f"KDA 10{n}X,Toyota,Axio,2016,1500000,90000,1500,Silver,Foreign Used,Automatic,Petrol,Sedan,2WD,Nairobi,For Sale,,,Clean,"
+            for n in range(4)
+        ]
+        sheet = SimpleUploadedFile('stock.csv', '\n'.join(rows).encode(), 'text/csv')
+        response = self.client.post(reverse('import_inventory'), {'sheet': sheet})
+        result = response.context['result']
+        self.assertEqual((len(result.created), len(result.errors)), (2, 2))
+        self.assertIn('plan limit reached (5 live cars)', result.errors[0][1])
+        self.assertEqual(self.live(), 5)
+
+    def bulk(self, action, cars, value=None):
+        return self.client.post(reverse('bulk_car_action'), {'action': action, 'ids': [car.pk for car in cars], 'value': value or ''})
+
+    def statuses(self, cars):
+        return [Car.objects.get(pk=car.pk).status for car in cars]
+
+    def test_add_car_counts_only_live_cars(self):
+        self.cars(4)
+        self.cars(6, status='SOLD')
+        self.assertEqual(self.client.get(reverse('add_car')).status_code, 200)
+        self.cars(1)
+        self.assertRedirects(self.client.get(reverse('add_car')), reverse('dealer_dashboard'), fetch_redirect_response=False)
+
+    def test_expired_plan_has_no_slots(self):
+        DealerProfile.objects.filter(user=self.dealer).update(subscription_expiry=timezone.now() - timedelta(minutes=1))
+        self.assertRedirects(self.client.get(reverse('add_car')), reverse('dealer_dashboard'), fetch_redirect_response=False)
+
+    def test_relisting_hidden_cars_past_the_limit_is_rejected(self):
+        self.cars(4)
+        hidden = self.cars(2, status='HIDDEN')
+        response = self.bulk('status', hidden, 'AVAILABLE')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('2 hidden when your plan ran out', response.json()['message'])
+        self.assertEqual(self.bulk('status', hidden[:1], 'AVAILABLE').json()['updated'], 1)
+        self.assertEqual(self.live(), 5)
+
+    def test_hidden_cars_only_leave_hidden_as_available(self):
+        self.cars(5)
+        hidden = self.cars(2, status='HIDDEN')
+        for value in ('RESERVED', 'SOLD'):
+            self.assertEqual(self.bulk('status', hidden, value).json()['skipped'], 2)
+        self.client.get(reverse('mark_as_sold', args=[hidden[0].pk]))
+        self.assertEqual(self.statuses(hidden), ['HIDDEN', 'HIDDEN'])
+        # The edit form keeps it hidden instead of defaulting to Available
+        self.assertContains(self.client.get(reverse('edit_car', args=[hidden[0].pk])), '<option value="HIDDEN" selected>')
+
+    def test_live_auctions_are_left_alone(self):
+        auction, available = self.cars(1, status='AUCTION') + self.cars(1)
+        self.assertEqual(self.bulk('status', [auction, available], 'SOLD').json()['updated'], 1)
+        self.assertEqual(self.bulk('delete', [auction]).json()['skipped'], 1)
+        self.client.get(reverse('mark_as_sold', args=[auction.pk]))
+        self.assertEqual(self.statuses([auction, available]), ['AUCTION', 'SOLD'])
+        with self.assertRaisesMessage(bulk_actions.BulkActionError, 'live auction'):
+            bulk_actions.set_status(self.dealer, auction, 'AVAILABLE', car_limit=5)
@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from django.conf import settings
+from django.db import connections, transaction
+from PIL import Image
+from . import duplicates, image_queue
+from .models import CarImage
+from .storage import blob_storage
+
+ALLOWED_FORMATS = {'JPEG', 'MPO', 'PNG', 'WEBP'}
+
+# Shared by all requests in this process, so a burst of uploads can't spawn unbounded threads.
+# Threads (not processes) because the work is storage I/O plus Pillow decoding, which releases the GIL.
+_pool = None
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=settings.UPLOAD_WORKERS, thread_name_prefix='car-upload')
+    return _pool
+
+
+@dataclass
+class UploadResult:
+    created: list = field(default_factory=list)
+    repeats: list = field(default_factory=list)   # File names skipped as near-duplicates
+    failures: list = field(default_factory=list)  # (file name, reason)
+    over_limit: int = 0                           # Valid files dropped by the plan's photo limit
+
+
+def _in_thread(func, *args):
+    # Worker threads get their own DB connections (the blob store writes MediaBlob rows);
+    # close them so they aren't left idle per thread
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+def inspect(upload):
+    """Validates one upload from its header and returns its dHash. Raises ValueError with a user-facing reason."""
+    if upload.size > settings.IMAGE_MAX_UPLOAD_BYTES:
+        raise ValueError(f"larger than {settings.IMAGE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+    try:
+        with Image.open(upload) as img:
+            if img.format not in ALLOWED_FORMATS:
+                raise ValueError(f"{img.format or 'unknown'} images are not supported")
+            if img.width * img.height > settings.IMAGE_MAX_PIXELS:
+                raise ValueError(f"{img.width * img.height / 1_000_000:.0f} MP is over the limit")
+            img.verify()
+        upload.seek(0)
+        value = duplicates.compute_dhash(upload)
+    except ValueError:
+        raise
+    except Exception:
+        raise ValueError("not a readable image")
+    finally:
+        upload.seek(0)
+    return value
+
+
+def store(upload):
+    name = CarImage._meta.get_field('image').generate_filename(None, upload.name)
+    return blob_storage.save(name, upload)
+
+
+def add_images(car, uploads, limit=None):
+    """
+    Adds uploaded photos to `car`:
+      1. every file is validated and hashed concurrently,
+      2. near-duplicates (of this car's photos or each other) are dropped,
+      3. the rest are written to storage concurrently,
+      4. all rows go in with one bulk_create; the main photo is decided once,
+      5. the worker pool is queued to build renditions after commit.
+    Wall time is roughly the slowest file per phase, not the sum over files.
+    """
+    result = UploadResult()
+    uploads = list(uploads)
+    pool = get_pool()
+
+    checked = []
+    for upload, future in [(u, pool.submit(_in_thread, inspect, u)) for u in uploads]:
+        try:
+            checked.append((upload, future.result()))
+        except ValueError as e:
+            result.failures.append((upload.name, str(e)))
+
+    existing = list(car.images.exclude(phash=None).values_list('phash', flat=True))
+    has_main = car.images.filter(is_main=True).exists()
+    accepted = []
+    for upload, value in checked:
+        if any(duplicates.hamming(value, other) <= duplicates.MAX_DISTANCE for other in existing):
+            result.repeats.append(upload.name)
+            continue
+        if limit is not None and len(accepted) >= limit:
+            result.over_limit += 1
+            continue
+        existing.append(value)
+        accepted.append((upload, value))
+
+    rows = []
+    for (upload, value), future in [(a, pool.submit(_in_thread, store, a[0])) for a in accepted]:
+        try:
+            name = future.result()
+        except Exception as e:
+            print(f"Upload of {upload.name} failed: {e}")
+            result.failures.append((upload.name, "could not be saved, please try again"))
+            continue
+        rows.append(CarImage(
+            car=car, image=name, is_main=not (has_main or rows), processing_status='PENDING',
+            **duplicates.hash_fields(value), **duplicates.match_fields(value, car),
+        ))
+
+    try:
+        with transaction.atomic():
+            result.created = CarImage.objects.bulk_create(rows)
+            image_queue.enqueue([img.pk for img in result.created])
+    except Exception:
+        blob_storage.release([row.image.name for row in rows])  # Give back the references we took
+        raise
+    return result
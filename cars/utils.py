@@ -5,18 +5,26 @@ from xhtml2pdf import pisa
 from decimal import Decimal
 
 # --- 1. PDF GENERATION LOGIC ---
-def render_to_pdf(template_src, context_dict={}):
+def html_to_pdf(html):
     """
-    Helper function to generate PDF from a template.
+    Turns rendered HTML into PDF bytes (None on error). CPU-bound for seconds on
+    big documents, so cars.pdf runs the stored reports in a job.
     """
-    template = get_template(template_src)
-    html  = template.render(context_dict)
     result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("ISO-8859-1")), result)
+    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result, encoding="UTF-8")
     if not pdf.err:
         return result.getvalue()
     return None
 
+def render_to_pdf(template_src, context_dict={}):
+    """
+    Helper function to generate PDF from a template (synchronously, uncached).
+    Views should use cars.pdf.render instead.
+    """
+    template = get_template(template_src)
+    html  = template.render(context_dict)
+    return html_to_pdf(html)
+
 # --- 2. CURRENCY CONVERSION LOGIC ---
 
 # Exchange Rates (Base is KES)
@@ -1,36 +1,40 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponseRedirect, HttpResponse, JsonResponse
+from django.http import HttpResponseRedirect, HttpResponse, JsonResponse, Http404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.admin.views.decorators import staff_member_required
 from django.views.decorators.http import require_POST 
 from django.contrib import messages
-from django.db.models import Q, Count, F, Sum
+from django.db.models import Q, Count, F, Prefetch, Sum
 from django.db.models.functions import TruncDate
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.contrib.auth import get_user_model 
 import re 
+import json
 
 from django.core.management import call_command
-from django.db import connection, connections
+from django.db import connection, connections, transaction
 from django.db.utils import OperationalError, ProgrammingError
-from django.core.mail import send_mail
 from django.conf import settings
 from decimal import Decimal
 
 from users.models import DealerProfile
+from users.reports import DealerReport
+from jobs.models import Job
+from jobs.queue import enqueue
 # Added Auction and Bid to imports
 from .models import Car, CarImage, CarView, Lead, SearchTerm, Booking, Conversation, Message, CarLike, DealerFollow, Auction, Bid
 from .forms import CarForm, CarBookingForm, SaleAgreementForm, MessageForm 
-from .utils import render_to_pdf 
+from . import bulk_actions, bulk_import, exports, pdf, uploads
 
 User = get_user_model() 
 
-PLAN_LIMITS = {
-    'STARTER': {'cars': 10, 'images': 8},
-    'LITE':    {'cars': 40, 'images': 15},
-    'PRO':     {'cars': 150, 'images': 30}
-}
+def with_photos(cars):
+    """
+    Loads every car's photos in one query. The prefetch is ordered like
+    `car.images.first`, so templates read it from the cache instead of querying per car.
+    """
+    return cars.prefetch_related(Prefetch('images', queryset=CarImage.objects.order_by('id')))
 
 def sanitize_phone(phone):
     if not phone: return None
@@ -63,7 +67,7 @@ def public_homepage(request):
     if region:
         base_qs = base_qs.filter(dealer__dealer_profile__city=region)
 
-    cars = base_qs.order_by('-created_at')[:24]
+    cars = with_photos(base_qs.order_by('-created_at'))[:24]
 
     all_makes = Car.objects.values_list('make', flat=True).distinct().order_by('make')
     all_body_types = Car.objects.values_list('body_type', flat=True).distinct().order_by('body_type')
@@ -97,7 +101,7 @@ def car_detail(request, car_id):
         car.views.create(ip_address=request.META.get('REMOTE_ADDR'))
         request.session[session_key] = True
 
-    similar_cars = Car.objects.filter(body_type=car.body_type, status='AVAILABLE').exclude(id=car.id).order_by('-created_at')[:4]
+    similar_cars = with_photos(Car.objects.filter(body_type=car.body_type, status='AVAILABLE').exclude(id=car.id).order_by('-created_at'))[:4]
     
     context = {
         'car': car, 
@@ -146,9 +150,9 @@ def book_car(request, car_id):
                 if dealer_email:
                     subject = f"New Booking Request: {car.make} {car.model}"
                     message = f"New booking from {request.user.username}. Dates: {booking.start_date} to {booking.end_date}. Value: {booking.total_cost}"
-                    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [dealer_email], fail_silently=True)
+                    enqueue('users.send_email', {'subject': subject, 'message': message, 'recipient_list': [dealer_email]})
             except Exception as e:
-                print(f"Error sending email: {e}")
+                print(f"Error queueing email: {e}")
 
             return redirect('checkout', booking_id=booking.id)
     else:
@@ -198,7 +202,7 @@ def dealer_showroom(request, username):
     cars = Car.objects.filter(dealer=dealer, status__in=['AVAILABLE', 'RESERVED', 'SOLD']).order_by('status', '-created_at')
     q = request.GET.get('q')
     if q: cars = cars.filter(Q(make__icontains=q) | Q(model__icontains=q))
-    return render(request, 'dealer/showroom.html', {'dealer': dealer, 'profile': profile, 'cars': cars})
+    return render(request, 'dealer/showroom.html', {'dealer': dealer, 'profile': profile, 'cars': with_photos(cars)})
 
 def diaspora_landing(request):
     featured_cars = Car.objects.filter(status='AVAILABLE', price__gte=3000000).order_by('-created_at')[:4]
@@ -208,16 +212,14 @@ def diaspora_landing(request):
 
 @login_required
 def dealer_dashboard(request):
-    my_cars = Car.objects.filter(dealer=request.user).order_by('-created_at')
-    car_count = my_cars.count()
-    total_value = sum(car.price for car in my_cars if car.price) 
+    my_cars = with_photos(Car.objects.filter(dealer=request.user).annotate(view_count=Count('views')).order_by('-created_at'))
     profile, created = DealerProfile.objects.get_or_create(user=request.user)
-    user_plan = PLAN_LIMITS.get(profile.plan_type, PLAN_LIMITS['STARTER'])
-    limit = user_plan['cars']
+    stats = DealerReport()[request.user.id]  # All-time numbers, same engine as the emails and PDF
+    car_count = stats.active_cars  # Live listings: the only ones the plan limit counts
+    limit = profile.plan_limits['cars']
     can_add = car_count < limit
 
-    recent_leads = Lead.objects.filter(car__dealer=request.user).order_by('-timestamp')[:10]
-    total_leads_count = Lead.objects.filter(car__dealer=request.user).count()
+    recent_leads = Lead.objects.filter(car__dealer=request.user).select_related('car').order_by('-timestamp')[:10]
     rental_bookings = Booking.objects.filter(car__dealer=request.user).order_by('-created_at')
     pending_bookings = rental_bookings.filter(status='PENDING').count()
 
@@ -233,53 +235,59 @@ def dealer_dashboard(request):
         chart_labels.append(d.strftime('%d %b'))
         chart_values.append(leads_dict.get(d_str, 0))
 
-    hot_car = my_cars.filter(status='AVAILABLE').annotate(view_count=Count('views')).order_by('-view_count').first()
-    
     context = {
         'profile': profile, 'cars': my_cars, 'rental_bookings': rental_bookings, 'recent_leads': recent_leads,
-        'total_cars': car_count, 'limit': limit, 'can_add': can_add, 'total_value': total_value,
-        'total_leads': total_leads_count, 'pending_bookings': pending_bookings,
-        'chart_labels': chart_labels, 'chart_values': chart_values, 'hot_car': hot_car,
+        'total_cars': car_count, 'limit': limit, 'can_add': can_add, 'total_value': stats.inventory_value,
+        'total_leads': stats.leads, 'pending_bookings': pending_bookings,
+        'chart_labels': chart_labels, 'chart_values': chart_values,
+        'hot_car': stats.hot_car, 'hot_car_views': stats.hot_car_views,
     }
     return render(request, 'dealer/dashboard.html', context)
 
 @login_required
 def download_report(request):
+    """
+    The monthly report PDF for last month (or ?month=YYYY-MM). Served from storage; if it
+    isn't built yet a cars.build_report job makes it while this page refreshes itself.
+    """
     dealer = request.user
     profile = request.user.dealer_profile
-    today = timezone.now()
-    start_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    cars = Car.objects.filter(dealer=dealer)
-    leads = Lead.objects.filter(car__dealer=dealer, timestamp__gte=start_of_month)
-    total_views = CarView.objects.filter(car__dealer=dealer, timestamp__gte=start_of_month).count()
-    
-    plan_cost = 5000 if profile.plan_type == 'LITE' else (12000 if profile.plan_type == 'PRO' else 1500)
-    cpl = int(plan_cost / leads.count()) if leads.count() > 0 else 0
-        
-    context = {
-        'dealer': dealer, 'profile': profile, 'date': today, 'month_name': today.strftime('%B %Y'),
-        'total_cars': cars.count(), 'total_views': total_views, 'total_leads': leads.count(),
-        'whatsapp_clicks': leads.filter(action_type='WHATSAPP').count(), 'calls': leads.filter(action_type='CALL').count(),
-        'cpl': cpl, 'inventory_value': cars.filter(status='AVAILABLE').aggregate(Sum('price'))['price__sum'] or 0,
-        'sold_count': cars.filter(status='SOLD').count(),
-    }
-    
-    pdf = render_to_pdf('dealer/monthly_report.html', context)
-    if pdf:
-        response = HttpResponse(pdf, content_type='application/pdf')
-        filename = f"Monthly_Report_{profile.business_name}_{today.strftime('%b_%Y')}.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
-    return HttpResponse("Error Generating PDF", status=400)
+    this_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    month = (this_month - timedelta(days=1)).replace(day=1)
+    if request.GET.get('month'):
+        try:
+            month = datetime.strptime(request.GET['month'], '%Y-%m').replace(tzinfo=dt_timezone.utc)
+        except ValueError:
+            raise Http404("Unknown month")
+    if month >= this_month:
+        raise Http404("Reports cover months that have ended")
+
+    name = pdf.report_name(dealer.id, month)
+    report = pdf.stored(name)
+    if report:
+        filename = f"Monthly_Report_{profile.business_name}_{month.strftime('%b_%Y')}.pdf"
+        return pdf.response(report, filename)
+
+    key = f"cars.build_report:{dealer.id}:{month:%Y-%m}"
+    if Job.objects.filter(key=key, status='FAILED', finished_at__gte=timezone.now() - timedelta(minutes=10)).exists():
+        return HttpResponse("Error Generating PDF", status=400)
+    enqueue('cars.build_report', {'dealer_id': dealer.id, 'month': f"{month:%Y-%m}"}, key=key)
+    return render(request, 'dealer/report_pending.html', {'month_name': month.strftime('%B %Y')})
+
+@login_required
+def export_data(request, kind):
+    # Streams straight from the DB cursor: memory stays flat however many rows the dealer has
+    if kind not in exports.DEALER_EXPORTS:
+        raise Http404("Unknown export")
+    return exports.dealer_export(request.user, kind, request.GET.get('format', 'csv'))
 
 @login_required
 def add_car(request):
     profile = request.user.dealer_profile
-    car_count = Car.objects.filter(dealer=request.user).count()
-    user_plan = PLAN_LIMITS.get(profile.plan_type, PLAN_LIMITS['STARTER'])
-    
-    if car_count >= user_plan['cars']:
-        messages.warning(request, f"Plan limit reached ({user_plan['cars']} cars). Upgrade to add more.")
+    limits = profile.plan_limits
+
+    if not profile.can_add_car():
+        messages.warning(request, f"Plan limit reached ({limits['cars']} live cars). Upgrade to add more.")
         return redirect('dealer_dashboard')
 
     if request.method == 'POST':
@@ -292,15 +300,19 @@ def add_car(request):
                     messages.error(request, f"Duplicate registration found.")
                     return render(request, 'dealer/add_car.html', {'form': form})
 
-            car = form.save(commit=False)
-            car.dealer = request.user 
-            car.status = 'AVAILABLE'
-            car.save()
+            with transaction.atomic():
+                # Serialized with bulk relisting, so two requests can't both take the last slot
+                DealerProfile.objects.select_for_update().filter(pk=profile.pk).first()
+                if not profile.can_add_car():
+                    messages.warning(request, f"Plan limit reached ({limits['cars']} live cars). Upgrade to add more.")
+                    return redirect('dealer_dashboard')
+                car = form.save(commit=False)
+                car.dealer = request.user 
+                car.status = 'AVAILABLE'
+                car.save()
             
-            image_limit = user_plan['images']
             raw_images = request.FILES.getlist('image') 
-            for index, img in enumerate(raw_images[:image_limit]):
-                CarImage.objects.create(car=car, image=img, is_main=(index == 0))
+            _report_uploads(request, uploads.add_images(car, raw_images, limit=limits['images']))
 
             messages.success(request, "Your vehicle has been published successfully!")
             return redirect('dealer_dashboard')
@@ -308,29 +320,70 @@ def add_car(request):
         form = CarForm()
     return render(request, 'dealer/add_car.html', {'form': form})
 
+@login_required
+def import_inventory(request):
+    # Same limits check_expiry and bulk relisting enforce: live (AVAILABLE) cars only
+    limits = request.user.dealer_profile.plan_limits
+    context = {'limit': limits['cars'], 'max_rows': settings.IMPORT_MAX_ROWS}
+
+    if request.method == 'POST':
+        sheet = request.FILES.get('sheet')
+        if not sheet:
+            messages.error(request, "Choose a CSV or Excel file to import.")
+            return render(request, 'dealer/import_inventory.html', context)
+        try:
+            result = bulk_import.import_listings(
+                request.user, sheet, request.FILES.get('photos'),
+                car_limit=limits['cars'], image_limit=limits['images'],
+            )
+        except bulk_import.SheetError as e:
+            messages.error(request, str(e))
+            return render(request, 'dealer/import_inventory.html', context)
+
+        if result.created:
+            messages.success(request, f"Imported {len(result.created)} vehicle(s).")
+        if result.errors:
+            messages.warning(request, f"{len(result.errors)} row(s) were not imported. See the report below.")
+        context['result'] = result
+    return render(request, 'dealer/import_inventory.html', context)
+
+@login_required
+def import_template(request):
+    return exports.stream('inventory_import_template', 'csv', bulk_import.TEMPLATE_HEADER, [bulk_import.TEMPLATE_EXAMPLE])
+
+def _report_uploads(request, result):
+    """One message per rejected file so the dealer knows exactly which photos to redo."""
+    for name, reason in result.failures:
+        messages.error(request, f"{name}: {reason}")
+    if result.repeats:
+        messages.warning(request, f"Skipped {len(result.repeats)} photo(s) already on this listing.")
+    if result.over_limit:
+        messages.warning(request, f"Image limit reached: {result.over_limit} photo(s) not added. Upgrade to add more.")
+
 @login_required
 def edit_car(request, car_id):
     car = get_object_or_404(Car, pk=car_id, dealer=request.user)
-    profile = request.user.dealer_profile
+    limits = request.user.dealer_profile.plan_limits
     
     if request.method == 'POST':
         form = CarForm(request.POST, request.FILES, instance=car)
         if form.is_valid():
-            car = form.save(commit=False)
+            car = form.save()
             new_status = request.POST.get('status')
-            if new_status in ['AVAILABLE', 'RESERVED', 'SOLD']: car.status = new_status
-            car.save()
+            if new_status in bulk_actions.DEALER_STATUSES and new_status != car.status:
+                # Same rules as the dashboard's bulk action: the plan limit, auctions, hidden cars
+                try:
+                    bulk_actions.set_status(request.user, car, new_status, car_limit=limits['cars'])
+                except bulk_actions.BulkActionError as e:
+                    messages.error(request, str(e))
             
-            user_plan = PLAN_LIMITS.get(profile.plan_type, PLAN_LIMITS['STARTER'])
-            image_limit = user_plan['images']
+            image_limit = limits['images']
             current_count = car.images.count()
             slots_left = image_limit - current_count
             new_images = request.FILES.getlist('image')
             
             if new_images and slots_left > 0:
-                for img in new_images[:slots_left]:
-                    has_main = car.images.filter(is_main=True).exists()
-                    CarImage.objects.create(car=car, image=img, is_main=(not has_main))
+                _report_uploads(request, uploads.add_images(car, new_images, limit=slots_left))
                 messages.success(request, "Changes saved!")
             elif new_images:
                 messages.error(request, "Image limit reached.")
@@ -352,11 +405,42 @@ def delete_car(request, car_id):
 @login_required
 def mark_as_sold(request, car_id):
     car = get_object_or_404(Car, pk=car_id, dealer=request.user)
-    car.status = 'SOLD'
-    car.save()
-    messages.success(request, "Car marked as SOLD!")
+    try:
+        bulk_actions.set_status(request.user, car, 'SOLD')
+    except bulk_actions.BulkActionError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, "Car marked as SOLD!")
     return redirect('dealer_dashboard')
 
+@login_required
+@require_POST
+def bulk_car_action(request):
+    """One status/price/feature/delete action over many of the dealer's cars (JSON body or form post)."""
+    if request.content_type == 'application/json':
+        try:
+            payload = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'Invalid JSON.'}, status=400)
+        ids = payload.get('ids') or []
+    else:
+        payload = request.POST
+        ids = request.POST.getlist('ids')
+
+    # Same limits check_expiry enforces, so FREE/expired dealers can't relist what it hid
+    limits = request.user.dealer_profile.plan_limits
+    try:
+        result = bulk_actions.apply(
+            request.user, payload.get('action'), ids, payload.get('value'),
+            car_limit=limits['cars'], featured_limit=limits['featured'],
+        )
+    except bulk_actions.BulkActionError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse({
+        'status': 'success', 'message': result.message,
+        'updated': result.updated, 'skipped': result.skipped,
+    })
+
 @login_required
 def set_main_image(request, car_id, image_id):
     car = get_object_or_404(Car, pk=car_id, dealer=request.user)
@@ -457,7 +541,7 @@ def financing_page(request):
 
         try:
             if settings.EMAIL_HOST:
-                send_mail(subject, email_body, settings.DEFAULT_FROM_EMAIL, [settings.SERVER_EMAIL], fail_silently=False)
+                enqueue('users.send_email', {'subject': subject, 'message': email_body, 'recipient_list': [settings.SERVER_EMAIL]})
         except Exception as e:
             print(f"❌ Email Error: {e}")
 
@@ -502,11 +586,9 @@ def create_agreement(request):
         if form.is_valid():
             data = form.cleaned_data
             data['date'] = timezone.now()
-            pdf = render_to_pdf('dealer/tools/agreement_pdf.html', data)
-            if pdf:
-                response = HttpResponse(pdf, content_type='application/pdf')
-                response['Content-Disposition'] = f'inline; filename="Sale_Agreement_{data["reg_number"]}.pdf"'
-                return response
+            agreement = pdf.render('dealer/tools/agreement_pdf.html', data)  # Holds ID numbers: never stored
+            if agreement:
+                return pdf.response(agreement, f'Sale_Agreement_{data["reg_number"]}.pdf', attachment=False)
             return HttpResponse("Error Generating PDF", status=400)
     else:
         initial_data = {'seller_name': request.user.dealer_profile.business_name or request.user.username, 'seller_phone': request.user.dealer_profile.phone}
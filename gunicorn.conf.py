@@ -0,0 +1,19 @@
+# Picked up automatically by `gunicorn buycars_project.wsgi` when run from this folder.
+# With PROMETHEUS_MULTIPROC_DIR set, every worker writes its metrics to files there
+# and /metrics adds them up (buycars_project.metrics).
+import os
+import shutil
+
+
+def on_starting(server):
+    # Samples left by a previous run would be added to this one's
+    folder = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if folder:
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
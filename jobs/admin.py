@@ -0,0 +1,44 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job, ScheduledTask
+from .scheduler import run_now
+
+
+@admin.action(description='🔁 Run selected jobs again now')
+def retry_now(modeladmin, request, queryset):
+    now = timezone.now()
+    waiting = queryset.filter(status='QUEUED').update(run_at=now)
+    revived = queryset.filter(status__in=('DONE', 'FAILED')).update(
+        status='QUEUED', run_at=now, attempts=0, finished_at=None, last_error='', locked_by='',
+        key=None,
+    )
+    modeladmin.message_user(request, f"{waiting + revived} job(s) queued to run now.")
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'priority', 'attempts', 'max_attempts', 'run_at', 'finished_at', 'locked_by')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key', 'last_error')
+    readonly_fields = ('locked_by', 'lease_expires_at', 'last_error', 'created_at', 'started_at', 'finished_at')
+    ordering = ('-id',)
+    actions = [retry_now]
+
+
+@admin.action(description='▶️ Queue selected tasks now')
+def queue_now(modeladmin, request, queryset):
+    for entry in queryset:
+        run_now(entry.name)
+    modeladmin.message_user(request, f"{queryset.count()} scheduled task(s) queued.")
+
+
+@admin.register(ScheduledTask)
+class ScheduledTaskAdmin(admin.ModelAdmin):
+    # The schedule itself lives in settings.JOB_SCHEDULE; this is its run history
+    list_display = ('name', 'cron', 'next_run_at', 'last_run_at', 'last_status', 'last_duration', 'skipped')
+    readonly_fields = ('name', 'cron', 'next_run_at', 'last_run_at', 'last_job', 'last_status',
+                       'last_finished_at', 'last_duration', 'skipped')
+    actions = [queue_now]
+
+    def has_add_permission(self, request):
+        return False
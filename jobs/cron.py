@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from django.utils import timezone
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *',
+}
+NAMES = {
+    'month': {name: i for i, name in enumerate(
+        ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)},
+    'weekday': {name: i for i, name in enumerate(['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'])},
+}
+# (field, lowest, highest) in crontab order
+FIELDS = [('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7)]
+
+
+class CronExpression:
+    """
+    Standard 5-field crontab schedule ("minute hour day month weekday"), evaluated
+    in the project TIME_ZONE. Supports *, lists, ranges, steps, jan-dec/sun-sat
+    names and the @hourly/@daily/@weekly/@monthly/@yearly aliases.
+
+        CronExpression('0 8 * * mon').next_after(timezone.now())  # Next Monday, 08:00
+    """
+    def __init__(self, text):
+        self.text = text
+        fields = ALIASES.get(text.strip().lower(), text).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression {text!r} needs 5 fields, got {len(fields)}")
+        parsed = {name: self._parse(value, name, low, high) for value, (name, low, high) in zip(fields, FIELDS)}
+        self.minutes, self.hours, self.days, self.months = (
+            parsed['minute'], parsed['hour'], parsed['day'], parsed['month'])
+        self.weekdays = {day % 7 for day in parsed['weekday']}  # 7 is Sunday too
+        # Like cron: when both day fields are restricted, a date matching either one runs
+        self.any_day, self.any_weekday = fields[2] == '*', fields[4] == '*'
+
+    def __str__(self):
+        return self.text
+
+    @staticmethod
+    def _parse(value, name, low, high):
+        names = NAMES.get(name, {})
+
+        def number(part):
+            part = part.lower()
+            if part in names:
+                return names[part]
+            if not part.isdigit() or not low <= int(part) <= high:
+                raise ValueError(f"Invalid {name} {part!r} (allowed {low}-{high})")
+            return int(part)
+
+        values = set()
+        for item in value.split(','):
+            span, _, step = item.partition('/')
+            if span == '*':
+                start, end = low, high
+            elif '-' in span:
+                start, end = (number(part) for part in span.split('-', 1))
+            else:
+                start = end = number(span)
+                if step:
+                    end = high  # "5/15" means from 5 onwards, every 15
+            if step and (not step.isdigit() or int(step) == 0):
+                raise ValueError(f"Invalid step {step!r} in {name}")
+            if start > end:
+                raise ValueError(f"Empty {name} range {span!r}")
+            values.update(range(start, end + 1, int(step or 1)))
+        return values
+
+    def _day_matches(self, moment):
+        in_month = moment.day in self.days
+        in_week = (moment.weekday() + 1) % 7 in self.weekdays  # Python: Monday=0, cron: Sunday=0
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, moment):
+        """First matching minute strictly after `moment` (aware), as an aware datetime."""
+        local = timezone.localtime(moment).replace(second=0, microsecond=0, tzinfo=None)
+        candidate = local + timedelta(minutes=1)
+        horizon = candidate + timedelta(days=366 * 5)
+        # Skip whole months/days/hours that can't match, so even yearly schedules take a few hundred steps
+        while candidate < horizon:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = datetime(candidate.year + year, month + 1, 1)
+            elif not self._day_matches(candidate):
+                candidate = datetime.combine(candidate.date() + timedelta(days=1), datetime.min.time())
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return timezone.make_aware(candidate)
+        raise ValueError(f"Cron expression {self.text!r} never matches")
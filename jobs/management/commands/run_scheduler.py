@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from jobs.models import ScheduledTask
+from jobs.scheduler import Scheduler
+
+
+class Command(BaseCommand):
+    help = 'Queues the JOB_SCHEDULE cron tasks for run_workers (one leader at a time, via a PostgreSQL advisory lock)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Fire whatever is due now and exit (for an external cron)')
+        parser.add_argument('--list', action='store_true', help='Show the schedule and the last run of each task, then exit')
+
+    def handle(self, *args, **options):
+        try:
+            scheduler = Scheduler(log=self.stdout.write)
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+
+        if options['list']:
+            self.show()
+            return
+
+        if not scheduler.leader.supported:
+            self.stdout.write(self.style.WARNING("⚠️ No advisory locks on this database: run only one scheduler."))
+        scheduler.install_signals()
+        self.stdout.write(self.style.SUCCESS(f"⏰ Scheduler {scheduler.id} started"))
+        scheduler.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS("Scheduler stopped."))
+
+    def show(self):
+        self.stdout.write(f"{'task':<24}{'cron':<16}{'next run':<18}{'last run':<18}{'status':<9}{'took':>8}{'skipped':>9}")
+        for entry in ScheduledTask.objects.all():
+            took = f"{entry.last_duration:.1f}s" if entry.last_duration is not None else '-'
+            last = f"{timezone.localtime(entry.last_run_at):%Y-%m-%d %H:%M}" if entry.last_run_at else '-'
+            self.stdout.write(
+                f"{entry.name:<24}{entry.cron:<16}{timezone.localtime(entry.next_run_at):%Y-%m-%d %H:%M}  "
+                f"{last:<18}{entry.last_status or '-':<9}{took:>8}{entry.skipped:>9}"
+            )
@@ -0,0 +1,81 @@
+import multiprocessing
+import signal
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from buycars_project.metrics import mark_process_dead
+from jobs.scheduler import load_schedule, scheduler_main
+from jobs.worker import Worker, worker_main
+
+
+class Command(BaseCommand):
+    help = 'Runs background job workers against the database queue (no broker needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Worker processes (default JOB_WORKERS; 0 = run one worker in this process)')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue has nothing ready')
+        parser.add_argument('--no-scheduler', action='store_true',
+                            help="Don't start a JOB_SCHEDULE scheduler next to the workers (see run_scheduler)")
+
+    def handle(self, *args, **options):
+        processes = settings.JOB_WORKERS if options['processes'] is None else options['processes']
+        with_scheduler = processes > 0 and not (options['no_scheduler'] or options['burst'])
+        if with_scheduler:
+            try:
+                load_schedule()  # Fail here, not in a child that keeps getting restarted
+            except (LookupError, ValueError) as e:
+                raise CommandError(e)
+
+        if processes <= 0:
+            worker = Worker(burst=options['burst'], log=self.stdout.write)
+            worker.install_signals()
+            self.stdout.write(self.style.SUCCESS(f"👷 Worker {worker.id} started"))
+            worker.run()
+            return
+
+        ctx = multiprocessing.get_context('spawn')
+        stopping = False
+
+        def stop(*args):
+            nonlocal stopping
+            stopping = True
+            for child in children:
+                if child.is_alive():
+                    child.terminate()  # SIGTERM: finish the current job, then exit
+
+        def spawn(target, kwargs):
+            child = ctx.Process(target=target, kwargs=kwargs, daemon=False)
+            child.start()
+            started[child.pid] = (time.monotonic(), target, kwargs)
+            return child
+
+        started = {}
+
+        children = [spawn(worker_main, {'burst': options['burst']}) for _ in range(processes)]
+        self.stdout.write(self.style.SUCCESS(f"👷 Started {processes} worker process(es): {', '.join(str(c.pid) for c in children)}"))
+        if with_scheduler:
+            # One per node is safe: only the advisory-lock holder fires anything
+            children.append(spawn(scheduler_main, {}))
+            self.stdout.write(self.style.SUCCESS(f"⏰ Started scheduler process {children[-1].pid}"))
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        # Supervise: replace workers that crash (a clean exit only happens in --burst mode or on shutdown)
+        while children:
+            time.sleep(1)
+            for child in list(children):
+                if child.is_alive():
+                    continue
+                child.join()
+                mark_process_dead(child.pid)  # Its live gauges no longer count in /metrics
+                if stopping or (options['burst'] and child.exitcode == 0):
+                    children.remove(child)
+                    continue
+                self.stdout.write(self.style.ERROR(f"❌ Process {child.pid} died (exit {child.exitcode}); restarting"))
+                born, target, kwargs = started.pop(child.pid)
+                if time.monotonic() - born < 10:
+                    time.sleep(5)  # Crashing on start-up (bad deploy?): don't spin
+                children[children.index(child)] = spawn(target, kwargs)
+
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
@@ -0,0 +1,78 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+
+
+class Job(models.Model):
+    """
+    One unit of background work, run by `manage.py run_workers` (see jobs.queue).
+    The table is the queue: no broker needed.
+    """
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+    ACTIVE = ('QUEUED', 'RUNNING')
+
+    name = models.CharField(max_length=100)  # Registered task, e.g. 'payments.send_sms'
+    kwargs = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    priority = models.SmallIntegerField(default=0)  # Higher runs first
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    run_at = models.DateTimeField()  # Not picked up before this (scheduled jobs, retry backoff)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # Only one QUEUED/RUNNING job may hold a key (de-duplication)
+    key = models.CharField(max_length=150, null=True, blank=True)
+
+    locked_by = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)  # Worker heartbeat; expired = worker died
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The claim query: ready jobs by priority, then age
+            models.Index(fields=['-priority', 'run_at', 'id'], condition=Q(status='QUEUED'), name='jobs_ready_idx'),
+            models.Index(fields=['lease_expires_at'], condition=Q(status='RUNNING'), name='jobs_running_idx'),
+            models.Index(fields=['status', 'finished_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=Q(status__in=('QUEUED', 'RUNNING')), name='jobs_active_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.name} ({self.status})"
+
+    @property
+    def duration(self):
+        """Seconds the last attempt ran, once finished."""
+        if self.started_at and self.finished_at:
+            return (self.finished_at - self.started_at).total_seconds()
+        return None
+
+
+class ScheduledTask(models.Model):
+    """
+    One JOB_SCHEDULE entry, kept in the database so whichever node holds the
+    scheduler lock knows when each task is next due and how its last run went.
+    Rows are created and updated from settings by `manage.py run_scheduler`.
+    """
+    name = models.CharField(max_length=100, unique=True)  # Registered task, e.g. 'users.weekly_report'
+    cron = models.CharField(max_length=100)
+    next_run_at = models.DateTimeField()
+    last_run_at = models.DateTimeField(null=True, blank=True)  # When it was last queued
+    last_job = models.ForeignKey(Job, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    last_status = models.CharField(max_length=10, choices=Job.STATUS_CHOICES, blank=True)
+    last_finished_at = models.DateTimeField(null=True, blank=True)
+    last_duration = models.FloatField(null=True, blank=True)  # Seconds the last finished run took
+    skipped = models.PositiveIntegerField(default=0)  # Firings dropped because the previous run was still going
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.cron})"
@@ -0,0 +1,151 @@
+import random
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Job
+
+# name -> function, filled by @task as each app's tasks.py is imported (JobsConfig.ready)
+REGISTRY = {}
+
+
+def task(name=None, priority=0, max_attempts=None):
+    """
+    Registers a function as a background job. It is called with the JSON kwargs
+    it was enqueued with, and should raise to get retried.
+
+        @task('payments.send_sms', priority=10)
+        def send_sms(phone_number, message): ...
+
+        enqueue('payments.send_sms', {'phone_number': ..., 'message': ...})
+    """
+    def register(func):
+        job_name = name or f"{func.__module__.split('.')[0]}.{func.__name__}"
+        func.job_name = job_name
+        func.job_options = {'priority': priority, 'max_attempts': max_attempts or settings.JOB_MAX_ATTEMPTS}
+        REGISTRY[job_name] = func
+        return func
+    return register
+
+
+def enqueue(task, kwargs=None, priority=None, run_at=None, delay=None, max_attempts=None, key=None):
+    """
+    Queues a job and returns its row. Runs inside the caller's transaction, so a
+    rolled-back request never leaves a job behind.
+      - run_at / delay: schedule it for later
+      - key: if a QUEUED/RUNNING job already holds this key, that job is returned instead
+    Recurring work goes in JOB_SCHEDULE (jobs.scheduler), not here.
+    """
+    name = getattr(task, 'job_name', task)
+    if name not in REGISTRY:
+        raise LookupError(f"No job registered as {name!r}")
+    options = REGISTRY[name].job_options
+
+    job = Job(
+        name=name, kwargs=kwargs or {},
+        priority=options['priority'] if priority is None else priority,
+        run_at=run_at or timezone.now() + (delay or timedelta(0)),
+        max_attempts=max_attempts or options['max_attempts'],
+        key=key,
+    )
+    if key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+        return job
+    except IntegrityError:
+        return Job.objects.get(key=key, status__in=Job.ACTIVE)
+
+
+# --- Worker side ---
+
+def claim(worker_id):
+    """
+    Takes the next ready job (highest priority, then oldest) and marks it RUNNING
+    under a lease. Returns None when nothing is ready.
+    """
+    now = timezone.now()
+    ready = Job.objects.filter(status='QUEUED', run_at__lte=now).order_by('-priority', 'run_at', 'id')
+    claimed = dict(
+        status='RUNNING', attempts=F('attempts') + 1, locked_by=worker_id, started_at=now,
+        lease_expires_at=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+    )
+
+    if connection.features.has_select_for_update_skip_locked:
+        # PostgreSQL: rows other workers are claiming are skipped, not waited on
+        with transaction.atomic():
+            job_id = ready.select_for_update(skip_locked=True).values_list('id', flat=True).first()
+            if job_id is None:
+                return None
+            Job.objects.filter(pk=job_id).update(**claimed)
+    else:
+        # SQLite has no row locks (writes are serialized anyway): claim optimistically and
+        # let the status check in the UPDATE decide which worker won
+        for job_id in ready.values_list('id', flat=True)[:10]:
+            if Job.objects.filter(pk=job_id, status='QUEUED').update(**claimed):
+                break
+        else:
+            return None
+    return Job.objects.get(pk=job_id)
+
+
+def renew_lease(job, worker_id):
+    """Heartbeat for long jobs; returns False if the job was taken away from this worker."""
+    lease = timezone.now() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    return bool(Job.objects.filter(pk=job.pk, status='RUNNING', locked_by=worker_id).update(lease_expires_at=lease))
+
+
+def backoff(attempts):
+    """Seconds before retry n: JOB_RETRY_DELAY doubled per attempt, capped at an hour, with jitter."""
+    base = min(settings.JOB_RETRY_DELAY * 2 ** (attempts - 1), 3600)
+    return base * random.uniform(0.8, 1.2)
+
+
+def _finish(job, status, error=''):
+    now = timezone.now()
+    Job.objects.filter(pk=job.pk).update(
+        status=status, finished_at=now, lease_expires_at=None, last_error=error,
+    )
+
+
+def _retry_or_fail(job, error):
+    if job.attempts < job.max_attempts:
+        Job.objects.filter(pk=job.pk).update(
+            status='QUEUED', run_at=timezone.now() + timedelta(seconds=backoff(job.attempts)),
+            lease_expires_at=None, locked_by='', last_error=error,
+        )
+        return 'retry'
+    _finish(job, 'FAILED', error)
+    return 'failed'
+
+
+def run(job):
+    """Runs a claimed job and records the outcome: 'done', 'retry' or 'failed'."""
+    func = REGISTRY.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f"No job registered as {job.name!r}")
+        func(**job.kwargs)
+    except Exception:
+        return _retry_or_fail(job, traceback.format_exc(limit=20)[-4000:])
+    _finish(job, 'DONE')
+    return 'done'
+
+
+def reap_expired():
+    """Jobs whose worker died mid-run (lease ran out) are retried or failed. Returns how many."""
+    lost = list(Job.objects.filter(status='RUNNING', lease_expires_at__lt=timezone.now()))
+    for job in lost:
+        _retry_or_fail(job, f"Worker {job.locked_by} stopped responding (lease expired)")
+    return len(lost)
+
+
+def prune(days=None):
+    """Deletes finished jobs older than JOB_KEEP_DAYS. Returns the number removed."""
+    cutoff = timezone.now() - timedelta(days=settings.JOB_KEEP_DAYS if days is None else days)
+    deleted, _ = Job.objects.filter(status__in=('DONE', 'FAILED'), finished_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,221 @@
+import os
+import signal
+import socket
+import threading
+import zlib
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Models and the queue are imported inside functions: the spawned scheduler child imports
+# this module before django.setup() (same as jobs.worker)
+
+# Session-level advisory lock id shared by every run_scheduler process on every node
+LOCK_KEY = zlib.crc32(b'buycars.jobs.scheduler')
+
+
+def cron_key(name):
+    """Queue key of a scheduled task: a new firing is skipped while the last one is still queued/running."""
+    return f"cron:{name}"
+
+
+class Leader:
+    """
+    Only the process holding the PostgreSQL advisory lock fires scheduled tasks;
+    the others wait on standby and take over if its connection goes away. Other
+    databases (SQLite in development) have no advisory locks, so every scheduler
+    there considers itself the leader: run a single one.
+    """
+    def __init__(self):
+        self.held = False
+
+    @property
+    def supported(self):
+        return connection.vendor == 'postgresql'
+
+    def acquire(self):
+        """True while this process is the leader; cheap to call on every tick."""
+        if not self.supported:
+            self.held = True
+            return True
+        with connection.cursor() as cursor:
+            if self.held:
+                # Still ours? A dropped and reopened connection silently loses the lock
+                cursor.execute(
+                    "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND granted"
+                    " AND pid = pg_backend_pid() AND classid = 0 AND objid = %s AND objsubid = 1)",
+                    [LOCK_KEY],
+                )
+                if cursor.fetchone()[0]:
+                    return True
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [LOCK_KEY])
+            self.held = cursor.fetchone()[0]
+        return self.held
+
+    def release(self):
+        if self.held and self.supported:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", [LOCK_KEY])
+            except DatabaseError:
+                pass  # Connection already gone, and the lock with it
+        self.held = False
+
+
+def load_schedule(schedule=None):
+    """Validates JOB_SCHEDULE ({task name: cron}) and returns {name: CronExpression}."""
+    from .cron import CronExpression
+    from .queue import REGISTRY
+    schedule = settings.JOB_SCHEDULE if schedule is None else schedule
+    parsed = {}
+    for name, text in schedule.items():
+        if name not in REGISTRY:
+            raise LookupError(f"JOB_SCHEDULE: no job registered as {name!r}")
+        parsed[name] = CronExpression(text)
+    return parsed
+
+
+def sync(schedule):
+    """
+    Makes the ScheduledTask table match the schedule. A changed cron expression is
+    due again from now; entries removed from settings are deleted.
+    """
+    from .models import ScheduledTask
+    now = timezone.now()
+    with transaction.atomic():
+        ScheduledTask.objects.exclude(name__in=schedule).delete()
+        existing = {entry.name: entry for entry in ScheduledTask.objects.select_for_update()}
+        for name, cron in schedule.items():
+            entry = existing.get(name)
+            if entry is None:
+                ScheduledTask.objects.create(name=name, cron=cron.text, next_run_at=cron.next_after(now))
+            elif entry.cron != cron.text:
+                entry.cron, entry.next_run_at = cron.text, cron.next_after(now)
+                entry.save(update_fields=['cron', 'next_run_at'])
+
+
+def run_now(name):
+    """
+    Queues a scheduled task outside its schedule (admin buttons), under the same key,
+    so it never overlaps a scheduled run. Returns the job (the running one if busy).
+    """
+    from .models import ScheduledTask
+    from .queue import enqueue
+    with transaction.atomic():
+        job = enqueue(name, key=cron_key(name))
+        ScheduledTask.objects.filter(name=name).update(
+            last_run_at=timezone.now(), last_job=job, last_status=job.status,
+        )
+    return job
+
+
+class Scheduler:
+    """
+    Fires JOB_SCHEDULE entries by putting them on the job queue; the work itself
+    always happens in run_workers processes, never here or in a web request.
+    A run that is missed while no scheduler is up fires once when one comes back
+    (no backlog of missed runs).
+    """
+    STANDBY_SECONDS = 15  # How often a standby scheduler tries to become leader
+    MAX_SLEEP = 30        # Leadership and finished runs are checked at least this often
+
+    def __init__(self, schedule=None, log=print):
+        self.schedule = load_schedule(schedule)
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self.leader = Leader()
+        self.log = log
+        self.wake = threading.Event()
+
+    def stop(self, *args):
+        self.wake.set()
+
+    def install_signals(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    def run(self, once=False):
+        leading = False
+        while not self.wake.is_set():
+            try:
+                if self.leader.acquire():
+                    if not leading:
+                        leading = True
+                        self.log(f"👑 Scheduler {self.id} is the leader; firing {len(self.schedule)} task(s)")
+                        sync(self.schedule)
+                    pause = self.tick()
+                else:
+                    if leading:
+                        self.log(f"⚠️ Scheduler {self.id} lost the leader lock; standing by")
+                    leading = False
+                    pause = self.STANDBY_SECONDS
+            except DatabaseError as e:
+                self.log(f"❌ Scheduler database error: {e}")
+                connection.close()  # Reconnect (and re-contend for the lock) on the next pass
+                self.leader.held = leading = False
+                pause = self.STANDBY_SECONDS
+            if once:
+                break
+            self.wake.wait(pause)
+        self.leader.release()
+        connection.close()
+
+    def tick(self):
+        """Fires everything due, records finished runs; returns seconds until the next check."""
+        from .models import ScheduledTask
+        now = timezone.now()
+        for entry in ScheduledTask.objects.filter(next_run_at__lte=now):
+            self.fire(entry, now)
+        self.record_finished()
+
+        upcoming = ScheduledTask.objects.order_by('next_run_at').values_list('next_run_at', flat=True).first()
+        if upcoming is None:
+            return self.MAX_SLEEP
+        return min(max((upcoming - timezone.now()).total_seconds(), 0.5), self.MAX_SLEEP)
+
+    def fire(self, entry, now):
+        from .models import Job, ScheduledTask
+        from .queue import enqueue
+        key = cron_key(entry.name)
+        next_at = self.schedule[entry.name].next_after(now)
+        with transaction.atomic():
+            # Conditional on the due time we read: a second scheduler (SQLite, or a stale
+            # leader) loses here instead of queuing the same run twice
+            claimed = ScheduledTask.objects.filter(pk=entry.pk, next_run_at=entry.next_run_at)
+            busy = Job.objects.filter(key=key, status__in=Job.ACTIVE).first()
+            if busy is not None:
+                if claimed.update(next_run_at=next_at, skipped=F('skipped') + 1):
+                    self.log(f"⏭️ {entry.name}: previous run #{busy.pk} is still {busy.status.lower()}; skipped")
+                return
+            if not claimed.update(next_run_at=next_at):
+                return
+            job = enqueue(entry.name, key=key)
+            ScheduledTask.objects.filter(pk=entry.pk).update(last_run_at=now, last_job=job, last_status=job.status)
+        self.log(f"⏰ {entry.name} queued as job #{job.pk}; next at {timezone.localtime(next_at):%Y-%m-%d %H:%M}")
+
+    def record_finished(self):
+        """Copies the outcome and duration of runs that finished since the last tick."""
+        from .models import ScheduledTask
+        waiting = ScheduledTask.objects.filter(last_status__in=('QUEUED', 'RUNNING'), last_job__isnull=False).select_related('last_job')
+        for entry in waiting:
+            job = entry.last_job
+            if job.status == entry.last_status:
+                continue
+            if job.status in ('DONE', 'FAILED'):
+                duration = job.duration
+                ScheduledTask.objects.filter(pk=entry.pk).update(
+                    last_status=job.status, last_finished_at=job.finished_at, last_duration=duration,
+                )
+                icon = '✅' if job.status == 'DONE' else '❌'
+                self.log(f"{icon} {entry.name} (job #{job.pk}) {job.status.lower()} in {duration or 0:.1f}s")
+            else:
+                ScheduledTask.objects.filter(pk=entry.pk).update(last_status=job.status)
+
+
+def scheduler_main():
+    """Entry point of the scheduler child run_workers starts (spawned, so Django is set up here)."""
+    import django
+    django.setup()
+    scheduler = Scheduler(log=lambda line: print(f"[{os.getpid()}] {line}", flush=True))
+    scheduler.install_signals()
+    scheduler.run()
@@ -0,0 +1,7 @@
+from .queue import prune, task
+
+
+@task('jobs.prune')
+def prune_finished():
+    """Housekeeping for the queue table itself (scheduled in JOB_SCHEDULE)."""
+    print(f"Pruned {prune()} finished job(s).")
@@ -0,0 +1,193 @@
+import threading
+from datetime import datetime, timedelta
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest import skipUnless
+from .cron import CronExpression
+from .models import Job, ScheduledTask
+from .queue import REGISTRY, claim, enqueue, prune, reap_expired, run, task
+from .scheduler import Leader, Scheduler, cron_key
+
+calls = []
+
+
+@task('tests.record', max_attempts=2)
+def record(value=None):
+    calls.append(value)
+
+
+@task('tests.fail', max_attempts=2)
+def fail():
+    raise RuntimeError('boom')
+
+
+def local(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+@override_settings(JOB_RETRY_DELAY=10, JOB_LEASE_SECONDS=60, JOB_KEEP_DAYS=7)
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_unknown_task_is_refused(self):
+        with self.assertRaises(LookupError):
+            enqueue('tests.missing')
+
+    def test_claims_by_priority_then_age_and_not_before_run_at(self):
+        later = enqueue(record, {'value': 'later'}, delay=timedelta(minutes=5))
+        old = enqueue(record, {'value': 'old'})
+        urgent = enqueue(record, {'value': 'urgent'}, priority=10)
+        new = enqueue(record, {'value': 'new'})
+
+        claimed = [claim('w1') for _ in range(4)]
+        self.assertEqual([job.pk if job else None for job in claimed], [urgent.pk, old.pk, new.pk, None])
+        self.assertEqual((claimed[0].status, claimed[0].attempts, claimed[0].locked_by), ('RUNNING', 1, 'w1'))
+        self.assertEqual(Job.objects.get(pk=later.pk).status, 'QUEUED')
+
+    def test_a_claimed_job_is_not_claimed_again(self):
+        enqueue(record)
+        self.assertIsNotNone(claim('w1'))
+        self.assertIsNone(claim('w2'))
+
+    def test_key_deduplicates_only_active_jobs(self):
+        first = enqueue(record, key='report:1')
+        self.assertEqual(enqueue(record, key='report:1').pk, first.pk)
+        self.assertEqual(run(claim('w1')), 'done')
+        self.assertNotEqual(enqueue(record, key='report:1').pk, first.pk)
+
+    def test_success_runs_with_kwargs(self):
+        job = enqueue(record, {'value': 42})
+        self.assertEqual(run(claim('w1')), 'done')
+        job.refresh_from_db()
+        self.assertEqual((job.status, calls), ('DONE', [42]))
+        self.assertIsNone(job.lease_expires_at)
+
+    def test_failure_is_retried_with_backoff_then_failed(self):
+        job = enqueue(fail)
+        self.assertEqual(run(claim('w1')), 'retry')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('QUEUED', 1, ''))
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=7))  # 10s, minus jitter
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertIsNone(claim('w1'))  # Not before the backoff
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertEqual(run(claim('w1')), 'failed')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 2))
+
+    def test_expired_lease_is_recovered(self):
+        job = enqueue(record)
+        claim('dead-worker')
+        Job.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(reap_expired(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'QUEUED')
+        self.assertIn('dead-worker', job.last_error)
+
+    def test_prune_keeps_recent_and_unfinished_jobs(self):
+        old, recent, queued = enqueue(record), enqueue(record), enqueue(record)
+        Job.objects.filter(pk=old.pk).update(status='DONE', finished_at=timezone.now() - timedelta(days=8))
+        Job.objects.filter(pk=recent.pk).update(status='FAILED', finished_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(prune(), 1)
+        self.assertEqual(set(Job.objects.values_list('pk', flat=True)), {recent.pk, queued.pk})
+
+
+@override_settings(TIME_ZONE='Africa/Nairobi')
+class CronTests(TestCase):
+    def next_runs(self, text, moment, count=3):
+        cron, runs = CronExpression(text), []
+        for _ in range(count):
+            moment = cron.next_after(moment)
+            runs.append(timezone.localtime(moment).strftime('%a %Y-%m-%d %H:%M'))
+        return runs
+
+    def test_steps_ranges_and_names(self):
+        self.assertEqual(self.next_runs('*/20 9-17 * * mon-fri', local(2026, 10, 16, 17, 45)),  # A Friday
+                         ['Mon 2026-10-19 09:00', 'Mon 2026-10-19 09:20', 'Mon 2026-10-19 09:40'])
+
+    def test_strictly_after(self):
+        self.assertEqual(self.next_runs('30 3 * * *', local(2026, 10, 19, 3, 30), count=1), ['Tue 2026-10-20 03:30'])
+
+    def test_restricted_day_and_weekday_match_either(self):
+        self.assertEqual(self.next_runs('0 8 13 * fri', local(2026, 10, 1)),
+                         ['Fri 2026-10-02 08:00', 'Fri 2026-10-09 08:00', 'Tue 2026-10-13 08:00'])
+
+    def test_aliases_and_sunday_as_seven(self):
+        self.assertEqual(self.next_runs('@monthly', local(2026, 11, 15), count=2), ['Tue 2026-12-01 00:00', 'Fri 2027-01-01 00:00'])
+        self.assertEqual(self.next_runs('0 0 * * 7', local(2026, 10, 19), count=1), ['Sun 2026-10-25 00:00'])
+
+    def test_invalid_expressions(self):
+        for text in ('* * * *', '60 * * * *', '*/0 * * * *', '5-1 * * * *', '* * * * funday'):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                CronExpression(text)
+        with self.assertRaises(ValueError):
+            CronExpression('0 0 31 2 *').next_after(timezone.now())  # 31 February never comes
+
+
+class SchedulerTests(TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler(schedule={'tests.record': '* * * * *'}, log=lambda line: None)
+        self.scheduler.run(once=True)  # Leader on SQLite, syncs the table, nothing due yet
+        self.entry = ScheduledTask.objects.get(name='tests.record')
+
+    def make_due(self):
+        ScheduledTask.objects.filter(pk=self.entry.pk).update(next_run_at=timezone.now() - timedelta(seconds=1))
+
+    def test_unknown_task_in_schedule(self):
+        with self.assertRaises(LookupError):
+            Scheduler(schedule={'tests.missing': '@daily'})
+
+    def test_fires_once_and_skips_while_the_last_run_is_busy(self):
+        self.make_due()
+        self.scheduler.tick()
+        self.make_due()
+        self.scheduler.tick()
+
+        job = Job.objects.get()
+        self.assertEqual(job.key, cron_key('tests.record'))
+        self.entry.refresh_from_db()
+        self.assertEqual((self.entry.last_job_id, self.entry.last_status, self.entry.skipped), (job.pk, 'QUEUED', 1))
+        self.assertGreater(self.entry.next_run_at, timezone.now())
+
+    def test_records_how_the_run_went(self):
+        self.make_due()
+        self.scheduler.tick()
+        run(claim('w1'))
+        self.scheduler.tick()
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.last_status, 'DONE')
+        self.assertIsNotNone(self.entry.last_duration)
+
+    def test_stale_due_time_is_not_fired_twice(self):
+        self.make_due()
+        stale = ScheduledTask.objects.get(pk=self.entry.pk)
+        self.scheduler.tick()
+        Job.objects.update(status='DONE')
+        self.scheduler.fire(stale, timezone.now())  # A second scheduler that read the same due time
+        self.assertEqual(Job.objects.count(), 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Advisory locks need PostgreSQL')
+    def test_only_one_leader(self):
+        leader = Leader()
+        self.assertTrue(leader.acquire())
+        results, tried, leader_released = [], threading.Event(), threading.Event()
+
+        def contender():  # Its own thread, so its own connection
+            other = Leader()
+            results.append(other.acquire())
+            tried.set()
+            leader_released.wait()
+            results.append(other.acquire())
+            other.release()
+            connection.close()
+
+        thread = threading.Thread(target=contender)
+        thread.start()
+        tried.wait()
+        leader.release()
+        leader_released.set()
+        thread.join()
+        self.assertEqual(results, [False, True])
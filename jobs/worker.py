@@ -0,0 +1,80 @@
+import os
+import signal
+import socket
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+
+class Worker:
+    """
+    Claims and runs jobs one at a time until stopped. SIGTERM/SIGINT finish the
+    current job first; a job that outlives its process is recovered by another
+    worker once its lease runs out.
+    """
+    def __init__(self, burst=False, log=print):
+        from . import queue  # Not at import time: spawned children import this module before django.setup()
+        self.queue = queue
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self.burst = burst  # Exit once nothing is ready instead of polling
+        self.log = log
+        self.stopping = False
+        self._last_reap = 0.0
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def install_signals(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    def run(self):
+        idle = settings.JOB_POLL_SECONDS
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - self._last_reap > settings.JOB_LEASE_SECONDS / 4:
+                self._last_reap = time.monotonic()
+                reaped = self.queue.reap_expired()
+                if reaped:
+                    self.log(f"♻️ Recovered {reaped} job(s) from dead workers")
+
+            job = self.queue.claim(self.id)
+            if job is None:
+                if self.burst:
+                    break
+                # Back off while the queue is empty, up to 5x the poll interval
+                time.sleep(idle)
+                idle = min(idle * 1.5, settings.JOB_POLL_SECONDS * 5)
+                continue
+            idle = settings.JOB_POLL_SECONDS
+            self.execute(job)
+        connections.close_all()
+
+    def execute(self, job):
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(settings.JOB_LEASE_SECONDS / 3):
+                self.queue.renew_lease(job, self.id)
+            connections.close_all()
+
+        beat = threading.Thread(target=heartbeat, name=f"job-{job.pk}-lease", daemon=True)
+        beat.start()
+        started = time.monotonic()
+        try:
+            outcome = self.queue.run(job)
+        finally:
+            done.set()
+            beat.join()
+        icon = {'done': '✅', 'retry': '🔁', 'failed': '❌'}[outcome]
+        self.log(f"{icon} #{job.pk} {job.name} {outcome} in {time.monotonic() - started:.2f}s (attempt {job.attempts}/{job.max_attempts})")
+
+
+def worker_main(burst=False):
+    """Entry point of each run_workers child process (spawned, so Django is set up here)."""
+    import django
+    django.setup()
+    worker = Worker(burst=burst, log=lambda line: print(f"[{os.getpid()}] {line}", flush=True))
+    worker.install_signals()
+    worker.run()
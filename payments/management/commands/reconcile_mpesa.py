@@ -0,0 +1,57 @@
+import sys
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from payments.reconciliation import Reconciler
+from payments.views import process_successful_payment
+
+class Command(BaseCommand):
+    help = 'Reconciles PENDING payments against an M-Pesa statement CSV and writes a discrepancy report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('statement', help='Path to the M-Pesa statement CSV export')
+        parser.add_argument('--report', default=None, help='Where to write the discrepancy CSV (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Statement rows matched per batch')
+        parser.add_argument('--stale-hours', type=int, default=24, help='Fail unmatched PENDING payments older than this')
+        parser.add_argument('--no-fail-stale', action='store_true', help='Only settle; leave unmatched PENDING rows alone')
+        parser.add_argument('--receipt-col', default=None, help='Override the receipt column name')
+        parser.add_argument('--amount-col', default=None, help='Override the amount column name')
+        parser.add_argument('--party-col', default=None, help='Override the phone/party column name')
+        parser.add_argument('--checkout-col', default=None, help='Override the checkout request ID column name')
+
+    def handle(self, *args, **options):
+        columns = {
+            key: options[f'{key}_col']
+            for key in ('receipt', 'amount', 'party', 'checkout')
+            if options[f'{key}_col']
+        }
+        started = timezone.now()
+
+        report_file = open(options['report'], 'w', newline='') if options['report'] else sys.stdout
+        try:
+            try:
+                statement = open(options['statement'], newline='', encoding='utf-8-sig')
+            except OSError as e:
+                raise CommandError(f"Cannot open statement: {e}")
+
+            with statement:
+                # Settled payments go through the same activation path as the STK callback
+                reconciler = Reconciler(report_file, columns=columns, chunk_size=options['chunk_size'],
+                                        on_settled=process_successful_payment)
+                reconciler.run(statement)
+
+            if not options['no_fail_stale']:
+                reconciler.fail_stale(timedelta(hours=options['stale_hours']))
+        finally:
+            if report_file is not sys.stdout:
+                report_file.close()
+
+        stats = reconciler.stats
+        elapsed = (timezone.now() - started).total_seconds()
+        self.stderr.write(f"Statement rows: {stats['rows']} ({elapsed:.1f}s)")
+        self.stderr.write(self.style.SUCCESS(f"✅ Settled: {stats['settled']}"))
+        self.stderr.write(self.style.WARNING(f"⏳ Stale PENDING marked FAILED: {stats['failed']}"))
+        self.stderr.write(self.style.ERROR(
+            f"❌ Unmatched receipts: {stats['unmatched_receipt']} | Amount mismatches: {stats['amount_mismatch']} | "
+            f"Duplicate receipts: {stats['duplicate_receipt']} | Settled by callback meanwhile: {stats['settled_elsewhere']}"
+        ))
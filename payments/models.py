@@ -51,4 +51,10 @@ class Payment(models.Model):
         return f"Payment: {self.user} - {self.amount}"
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            # Reconciliation: PENDING lookups by phone and stale sweeps by age
+            models.Index(fields=['status', 'phone_number']),
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['mpesa_receipt_number']),
+        ]
\ No newline at end of file
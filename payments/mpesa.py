@@ -4,6 +4,7 @@ import base64
 from datetime import datetime
 from django.conf import settings
 from requests.auth import HTTPBasicAuth
+from buycars_project.metrics import track_call
 
 class MpesaClient:
     def __init__(self):
@@ -28,11 +29,12 @@ class MpesaClient:
         Authenticates with Safaricom and returns an Access Token.
         """
         try:
-            response = requests.get(
-                self.access_token_url, 
-                auth=HTTPBasicAuth(self.consumer_key, self.consumer_secret)
-            )
-            response.raise_for_status()
+            with track_call('mpesa', 'token'):
+                response = requests.get(
+                    self.access_token_url, 
+                    auth=HTTPBasicAuth(self.consumer_key, self.consumer_secret)
+                )
+                response.raise_for_status()
             json_response = response.json()
             return json_response['access_token']
         except Exception as e:
@@ -87,8 +89,9 @@ class MpesaClient:
         }
 
         try:
-            response = requests.post(self.stk_push_url, json=payload, headers=headers)
-            response.raise_for_status()
+            with track_call('mpesa', 'stk_push'):
+                response = requests.post(self.stk_push_url, json=payload, headers=headers)
+                response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"STK Push Error: {e}")
@@ -3,6 +3,7 @@ import base64
 from datetime import datetime
 from django.conf import settings
 from requests.auth import HTTPBasicAuth
+from buycars_project.metrics import track_call
 
 def get_access_token():
     """
@@ -13,8 +14,9 @@ def get_access_token():
     api_URL = settings.MPESA_ACCESS_TOKEN_URL
 
     try:
-        r = requests.get(api_URL, auth=HTTPBasicAuth(consumer_key, consumer_secret))
-        r.raise_for_status() # Raise error for bad status codes
+        with track_call('mpesa', 'token'):
+            r = requests.get(api_URL, auth=HTTPBasicAuth(consumer_key, consumer_secret))
+            r.raise_for_status() # Raise error for bad status codes
         json_response = r.json()
         return json_response['access_token']
     except Exception as e:
@@ -82,7 +84,8 @@ def initiate_stk_push(phone_number, amount, account_reference, transaction_desc)
     }
 
     try:
-        response = requests.post(settings.MPESA_EXPRESS_URL, json=payload, headers=headers)
+        with track_call('mpesa', 'stk_push'):
+            response = requests.post(settings.MPESA_EXPRESS_URL, json=payload, headers=headers)
         return response.json()
     except Exception as e:
         return {"error": str(e)}
\ No newline at end of file
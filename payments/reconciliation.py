@@ -0,0 +1,226 @@
+import csv
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from django.db import transaction
+from django.utils import timezone
+from .models import Payment
+
+# Column names in the M-Pesa org portal statement export. Override per file if needed.
+DEFAULT_COLUMNS = {
+    'receipt': 'Receipt No.',
+    'completed': 'Completion Time',
+    'status': 'Transaction Status',
+    'amount': 'Paid In',
+    'party': 'Other Party Info',
+    'checkout': 'Checkout Request ID',  # Only present in API-based exports
+}
+
+TIME_FORMATS = ('%d-%m-%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M')
+# How long after an STK push the customer can still complete it
+STK_GRACE = timedelta(minutes=5)
+REPORT_FIELDS = ['issue', 'receipt', 'completed', 'amount', 'phone', 'payment_id', 'detail']
+
+
+def msisdn(raw):
+    """'0712 345 678', '+254712345678', '254712345678 - JOHN DOE' -> '254712345678'."""
+    digits = re.sub(r'\D', '', str(raw or '').split('-')[0])
+    if digits.startswith('0'):
+        digits = '254' + digits[1:]
+    elif len(digits) == 9:
+        digits = '254' + digits
+    return digits if len(digits) == 12 else None
+
+
+def phone_variants(phone):
+    """The formats a phone_number can be stored in, so the DB lookup can use an IN clause."""
+    return [phone, '0' + phone[3:], '+' + phone]
+
+
+def parse_amount(raw):
+    try:
+        return Decimal(str(raw).replace(',', '').strip()).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def parse_time(raw):
+    raw = (raw or '').strip()
+    for fmt in TIME_FORMATS:
+        try:
+            return timezone.make_aware(datetime.strptime(raw, fmt))
+        except ValueError:
+            continue
+    return None
+
+
+def iter_chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Reconciler:
+    """
+    Streams an M-Pesa statement and settles PENDING Payments against it.
+
+    Each chunk of statement rows is matched with two hash indexes built from one
+    query each: checkout_request_id -> Payment, and (phone, amount) -> [Payments, oldest first].
+    Only one chunk and its candidate payments are ever held in memory.
+    """
+    def __init__(self, report_file, columns=None, chunk_size=5000, on_settled=None):
+        self.columns = {**DEFAULT_COLUMNS, **(columns or {})}
+        self.chunk_size = chunk_size
+        self.on_settled = on_settled
+        self.report = csv.DictWriter(report_file, fieldnames=REPORT_FIELDS)
+        self.report.writeheader()
+        self.stats = defaultdict(int)
+        self.window_start = None
+        self.window_end = None
+        self.mismatched = set()  # Payment ids whose receipt came in with a different amount: left for an operator
+
+    def flag(self, issue, row=None, payment=None, detail=''):
+        self.stats[issue] += 1
+        self.report.writerow({
+            'issue': issue,
+            'receipt': row['receipt'] if row else '',
+            'completed': row['completed'].isoformat() if row and row['completed'] else '',
+            'amount': row['amount'] if row else (payment.amount if payment else ''),
+            'phone': row['phone'] if row else (payment.phone_number if payment else ''),
+            'payment_id': payment.id if payment else '',
+            'detail': detail,
+        })
+
+    def _normalize(self, raw):
+        col = self.columns
+        status = (raw.get(col['status']) or 'Completed').strip().lower()
+        return {
+            'receipt': (raw.get(col['receipt']) or '').strip(),
+            'completed': parse_time(raw.get(col['completed'])),
+            'amount': parse_amount(raw.get(col['amount']) or 0),
+            'phone': msisdn(raw.get(col['party'])),
+            'checkout': (raw.get(col['checkout']) or '').strip(),
+            'ok': status == 'completed',
+        }
+
+    def run(self, statement_file):
+        reader = csv.DictReader(statement_file)
+        for chunk in iter_chunks(reader, self.chunk_size):
+            self.process_chunk([self._normalize(raw) for raw in chunk])
+        return dict(self.stats)
+
+    def process_chunk(self, rows):
+        rows = [r for r in rows if r['ok'] and r['receipt'] and r['amount']]
+        self.stats['rows'] += len(rows)
+        if not rows:
+            return
+
+        times = [r['completed'] for r in rows if r['completed']]
+        if times:
+            self.window_start = min(times + ([self.window_start] if self.window_start else []))
+            self.window_end = max(times + ([self.window_end] if self.window_end else []))
+
+        # Receipts we've already recorded (earlier run or callback) are skipped, not double-settled
+        seen = set(Payment.objects.filter(
+            mpesa_receipt_number__in=[r['receipt'] for r in rows]
+        ).values_list('mpesa_receipt_number', flat=True))
+
+        checkout_ids = [r['checkout'] for r in rows if r['checkout']]
+        phones = {r['phone'] for r in rows if r['phone']}
+
+        # One shared instance per payment, so a match through either index is seen by both
+        instances = {}
+        by_checkout = {}
+        if checkout_ids:
+            for p in Payment.objects.filter(status='PENDING', checkout_request_id__in=checkout_ids):
+                by_checkout[p.checkout_request_id] = instances.setdefault(p.id, p)
+
+        by_phone_amount = defaultdict(list)
+        if phones:
+            candidates = Payment.objects.filter(
+                status='PENDING',
+                phone_number__in=[v for phone in phones for v in phone_variants(phone)],
+            ).order_by('created_at')
+            for p in candidates:
+                p = instances.setdefault(p.id, p)
+                by_phone_amount[(msisdn(p.phone_number), p.amount.quantize(Decimal('0.01')))].append(p)
+
+        settled = []
+        now = timezone.now()
+        for r in rows:
+            if r['receipt'] in seen:
+                self.flag('duplicate_receipt', r, detail='Receipt already recorded')
+                continue
+
+            payment = by_checkout.pop(r['checkout'], None) if r['checkout'] else None
+            if payment and payment.status != 'PENDING':
+                payment = None  # Already settled by an earlier row in this chunk
+            if payment and payment.amount.quantize(Decimal('0.01')) != r['amount']:
+                self.flag('amount_mismatch', r, payment, detail=f"Expected KES {payment.amount}")
+                self.mismatched.add(payment.id)
+                continue
+
+            if payment is None:
+                payment = self._take_by_phone(by_phone_amount.get((r['phone'], r['amount']), []), r['completed'])
+
+            if payment is None:
+                self.flag('unmatched_receipt', r, detail='No PENDING payment for this receipt')
+                continue
+
+            payment.status = 'SUCCESS'
+            payment.mpesa_receipt_number = r['receipt']
+            payment.updated_at = now
+            seen.add(r['receipt'])
+            settled.append(payment)
+
+        # Candidates were read without a lock: lock the chunk's matches once and settle only
+        # those still PENDING, so a payment the STK callback settled in the meantime isn't
+        # settled (and credited) a second time. The callback's own conditional UPDATE waits
+        # on these row locks and then finds them SUCCESS.
+        with transaction.atomic():
+            still_pending = set(Payment.objects.select_for_update().filter(
+                pk__in=[p.pk for p in settled], status='PENDING',
+            ).values_list('pk', flat=True))
+            won = [p for p in settled if p.pk in still_pending]
+            Payment.objects.bulk_update(won, ['status', 'mpesa_receipt_number', 'updated_at'], batch_size=1000)
+        for payment in settled:
+            if payment.pk not in still_pending:
+                self.flag('settled_elsewhere', payment=payment, detail='Settled by the callback during reconciliation')
+        self.stats['settled'] += len(won)
+
+        if self.on_settled:
+            for payment in won:
+                self.on_settled(payment)
+
+    @staticmethod
+    def _take_by_phone(queue, completed):
+        """Oldest still-PENDING payment for this phone/amount started before the money landed."""
+        for i, candidate in enumerate(queue):
+            if candidate.status != 'PENDING':
+                continue
+            if not completed or candidate.created_at <= completed + STK_GRACE:
+                return queue.pop(i)
+        return None
+
+    def fail_stale(self, older_than):
+        """
+        Marks PENDING payments FAILED when they were started inside the statement's window,
+        are older than `older_than`, and no receipt matched them. Payments with an
+        amount_mismatch receipt stay PENDING for an operator to resolve. One UPDATE.
+        """
+        if not self.window_start:
+            return 0
+        cutoff = min(timezone.now() - older_than, self.window_end)
+        stale = Payment.objects.filter(
+            status='PENDING', created_at__gte=self.window_start - STK_GRACE, created_at__lt=cutoff
+        ).exclude(id__in=self.mismatched)
+        for payment in stale.only('id', 'amount', 'phone_number').iterator(chunk_size=2000):
+            self.flag('stale_pending', payment=payment, detail='No receipt in statement; marked FAILED')
+        count = stale.update(status='FAILED', updated_at=timezone.now())
+        self.stats['failed'] += count
+        return count
@@ -0,0 +1,14 @@
+import africastalking
+from django.conf import settings
+from buycars_project.metrics import track_call
+from jobs.queue import task
+
+
+@task('payments.send_sms', priority=10)
+def send_sms(phone_number, message):
+    """Delivers one SMS via Africa's Talking; errors propagate so the queue retries."""
+    africastalking.initialize(settings.AFRICASTALKING_USERNAME, settings.AFRICASTALKING_API_KEY)
+    if phone_number.startswith('0'): phone_number = '+254' + phone_number[1:]
+    elif phone_number.startswith('254'): phone_number = '+' + phone_number
+    with track_call('africastalking', 'sms'):
+        africastalking.SMS.send(message, [phone_number])
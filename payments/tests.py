@@ -1,3 +1,143 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from .models import Payment
+from .reconciliation import Reconciler
 
-# Create your tests here.
+STATEMENT_HEADER = 'Receipt No.,Completion Time,Transaction Status,Paid In,Other Party Info,Checkout Request ID\n'
+
+
+def statement(*rows):
+    """rows: (receipt, minutes ago, amount, phone, checkout id)"""
+    lines = [STATEMENT_HEADER]
+    for receipt, minutes_ago, amount, phone, checkout in rows:
+        completed = timezone.localtime(timezone.now() - timedelta(minutes=minutes_ago)).strftime('%d-%m-%Y %H:%M:%S')
+        lines.append(f"{receipt},{completed},Completed,{amount},{phone} - JOHN DOE,{checkout}\n")
+    return io.StringIO(''.join(lines))
+
+
+def callback(checkout, result_code=0, receipt='CB123'):
+    return {'Body': {'stkCallback': {
+        'CheckoutRequestID': checkout, 'ResultCode': result_code,
+        'CallbackMetadata': {'Item': [{'Name': 'MpesaReceiptNumber', 'Value': receipt}]},
+    }}}
+
+
+class ReconcilerTests(TestCase):
+    def payment(self, checkout, amount=1500, phone='0712345678', minutes_ago=60):
+        payment = Payment.objects.create(phone_number=phone, amount=Decimal(amount), checkout_request_id=checkout)
+        Payment.objects.filter(pk=payment.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+        return payment
+
+    def reconcile(self, *rows, settled=None):
+        report = io.StringIO()
+        reconciler = Reconciler(report, on_settled=settled.append if settled is not None else None)
+        reconciler.run(statement(*rows))
+        return reconciler, report.getvalue()
+
+    def status(self, payment):
+        return Payment.objects.get(pk=payment.pk).status
+
+    def test_matches_by_checkout_id_and_by_phone_and_amount(self):
+        by_checkout = self.payment('ws_CO_1')
+        by_phone = self.payment('ws_CO_2', amount=5000, phone='254722000111')
+        settled = []
+        reconciler, _ = self.reconcile(
+            ('RCP1', 50, '"1,500.00"', '254712345678', 'ws_CO_1'),
+            ('RCP2', 50, '5000', '0722000111', ''),
+            settled=settled,
+        )
+        self.assertEqual(reconciler.stats['settled'], 2)
+        self.assertEqual(Payment.objects.get(pk=by_checkout.pk).mpesa_receipt_number, 'RCP1')
+        self.assertEqual(Payment.objects.get(pk=by_phone.pk).mpesa_receipt_number, 'RCP2')
+        self.assertEqual(sorted(p.pk for p in settled), sorted([by_checkout.pk, by_phone.pk]))
+
+    def test_phone_match_takes_the_oldest_payment_started_before_the_money(self):
+        older = self.payment('ws_CO_1', minutes_ago=120)
+        newer = self.payment('ws_CO_2', minutes_ago=90)
+        after = self.payment('ws_CO_3', minutes_ago=10)  # Started after the money landed
+        self.reconcile(('RCP1', 60, '1500', '254712345678', ''), ('RCP2', 30, '1500', '254712345678', ''))
+        self.assertEqual([self.status(p) for p in (older, newer, after)], ['SUCCESS', 'SUCCESS', 'PENDING'])
+
+    def test_duplicate_unmatched_and_mismatched_receipts_are_reported(self):
+        done = self.payment('ws_CO_1')
+        Payment.objects.filter(pk=done.pk).update(status='SUCCESS', mpesa_receipt_number='RCP1')
+        short = self.payment('ws_CO_2')
+        reconciler, report = self.reconcile(
+            ('RCP1', 50, '1500', '254712345678', 'ws_CO_1'),
+            ('RCP9', 50, '999', '254700000000', ''),
+            ('RCP3', 50, '1000', '254712345678', 'ws_CO_2'),
+        )
+        self.assertEqual(
+            (reconciler.stats['duplicate_receipt'], reconciler.stats['unmatched_receipt'], reconciler.stats['amount_mismatch']),
+            (1, 1, 1),
+        )
+        self.assertIn('amount_mismatch', report)
+        self.assertEqual(self.status(short), 'PENDING')
+
+    def test_fail_stale_skips_amount_mismatches(self):
+        mismatched = self.payment('ws_CO_1', minutes_ago=150)
+        abandoned = self.payment('ws_CO_2', amount=2000, phone='254799999999', minutes_ago=150)
+        recent = self.payment('ws_CO_3', amount=2000, phone='254799999999', minutes_ago=5)
+        reconciler, _ = self.reconcile(
+            ('RCP1', 180, '1000', '254712345678', 'ws_CO_1'),
+            ('RCP2', 10, '1', '254700000000', ''),  # Stretches the statement window to now
+        )
+        self.assertEqual(reconciler.fail_stale(timedelta(minutes=30)), 1)
+        self.assertEqual(self.status(mismatched), 'PENDING')
+        self.assertEqual(self.status(abandoned), 'FAILED')
+        self.assertEqual(self.status(recent), 'PENDING')  # The customer may still be typing their PIN
+
+    def test_payment_settled_by_the_callback_mid_run_is_not_settled_again(self):
+        payment = self.payment('ws_CO_1')
+        settled = []
+        reconciler = Reconciler(io.StringIO(), on_settled=settled.append)
+        rows = [reconciler._normalize(row) for row in csv.DictReader(statement(('RCP1', 50, '1500', '254712345678', 'ws_CO_1')))]
+        real_lock = Payment.objects.select_for_update
+
+        def callback_wins(*args, **kwargs):
+            # The callback commits between the unlocked read and the locked write
+            Payment.objects.filter(pk=payment.pk).update(status='SUCCESS', mpesa_receipt_number='CB1')
+            return real_lock(*args, **kwargs)
+
+        with mock.patch.object(Payment.objects, 'select_for_update', callback_wins):
+            reconciler.process_chunk(rows)
+        self.assertEqual(settled, [])
+        self.assertEqual(reconciler.stats['settled_elsewhere'], 1)
+        self.assertEqual(Payment.objects.get(pk=payment.pk).mpesa_receipt_number, 'CB1')
+
+
+class CallbackTests(TestCase):
+    def setUp(self):
+        self.payment = Payment.objects.create(phone_number='0712345678', amount=Decimal(1500), checkout_request_id='ws_CO_1')
+
+    def post(self, body):
+        return self.client.post(reverse('mpesa_callback'), json.dumps(body), content_type='application/json')
+
+    @mock.patch('payments.views.process_successful_payment')
+    def test_retried_callback_settles_once(self, activate):
+        self.post(callback('ws_CO_1'))
+        self.post(callback('ws_CO_1'))
+        self.assertEqual(activate.call_count, 1)
+        self.assertEqual(Payment.objects.get(pk=self.payment.pk).status, 'SUCCESS')
+
+    @mock.patch('payments.views.process_successful_payment')
+    def test_callback_after_reconciliation_does_nothing(self, activate):
+        settled = []
+        Reconciler(io.StringIO(), on_settled=settled.append).run(
+            statement(('RCP1', 1, '1500', '254712345678', 'ws_CO_1')))
+        self.post(callback('ws_CO_1', receipt='RCP1'))
+        self.assertEqual(len(settled), 1)
+        activate.assert_not_called()
+
+    @mock.patch('payments.views.process_successful_payment')
+    def test_late_failure_callback_does_not_undo_a_settled_payment(self, activate):
+        self.post(callback('ws_CO_1'))
+        self.post(callback('ws_CO_1', result_code=1032))
+        self.assertEqual(Payment.objects.get(pk=self.payment.pk).status, 'SUCCESS')
@@ -1,5 +1,4 @@
 import json
-import africastalking
 from datetime import timedelta
 from decimal import Decimal 
 from django.conf import settings
@@ -15,10 +14,13 @@ from .forms import PaymentForm
 from .mpesa import MpesaClient
 from users.models import DealerProfile
 from cars.models import Booking 
-from wallet.models import Wallet, Transaction 
+from wallet.models import Wallet
+from wallet.payouts import credit_wallet
+from jobs.queue import enqueue
 
 # --- HELPER: SEND SMS ---
 def send_sms_notification(phone_number, message):
+    """Queues the SMS (payments.send_sms) so M-Pesa callbacks never wait on Africa's Talking."""
     # Safe check: If phone is dummy or empty, skip SMS
     if not phone_number or phone_number == '0000000000':
         return
@@ -28,12 +30,8 @@ def send_sms_notification(phone_number, message):
     if not api_key or not username or username == 'sandbox':
         return 
     try:
-        africastalking.initialize(username, api_key)
-        sms = africastalking.SMS
-        if phone_number.startswith('0'): phone_number = '+254' + phone_number[1:]
-        elif phone_number.startswith('254'): phone_number = '+' + phone_number
-        sms.send(message, [phone_number])
-    except Exception as e: print(f"Error sending SMS: {str(e)}")
+        enqueue('payments.send_sms', {'phone_number': phone_number, 'message': message})
+    except Exception as e: print(f"Error queueing SMS: {str(e)}")
 
 # --- HELPER: SHARED SUCCESS LOGIC ---
 def process_successful_payment(payment):
@@ -63,14 +61,7 @@ def process_successful_payment(payment):
             commission = total_amount * Decimal('0.10') 
             dealer_share = total_amount - commission
             
-            wallet.balance += dealer_share
-            wallet.total_earned += dealer_share
-            wallet.save()
-            
-            Transaction.objects.create(
-                wallet=wallet, amount=dealer_share, transaction_type='CREDIT',
-                description=f"Rental: {car.make} {car.model}", reference=f"Pay #{payment.id}"
-            )
+            credit_wallet(wallet, dealer_share, f"Rental: {car.make} {car.model}", reference=f"Pay #{payment.id}")
             
             if hasattr(dealer, 'dealer_profile') and dealer.dealer_profile.phone_number:
                 send_sms_notification(dealer.dealer_profile.phone_number, f"Earned KES {dealer_share:,.0f} from booking!")
@@ -220,7 +211,7 @@ def initiate_payment(request):
             return JsonResponse({'status': 'error', 'message': str(e)})
     return JsonResponse({'status': 'error', 'message': 'Invalid request'})
 
-# --- API: MPESA CALLBACK (Unchanged) ---
+# --- API: MPESA CALLBACK ---
 @csrf_exempt
 def mpesa_callback(request):
     if request.method == 'POST':
@@ -229,13 +220,18 @@ def mpesa_callback(request):
             stk = body.get('Body', {}).get('stkCallback', {})
             pay = Payment.objects.filter(checkout_request_id=stk.get('CheckoutRequestID')).first()
             if pay:
+                # Only a still-PENDING payment changes: a retried callback, or one arriving after
+                # reconcile_mpesa settled it, must not credit the wallet or extend the plan again
+                pending = Payment.objects.filter(pk=pay.pk, status='PENDING')
                 if stk.get('ResultCode') == 0:
-                    pay.status = 'SUCCESS'
-                    pay.save()
-                    process_successful_payment(pay)
+                    items = stk.get('CallbackMetadata', {}).get('Item', [])
+                    receipt = next((i.get('Value') for i in items if i.get('Name') == 'MpesaReceiptNumber'), None)
+                    if receipt: pay.mpesa_receipt_number = receipt
+                    if pending.update(status='SUCCESS', mpesa_receipt_number=pay.mpesa_receipt_number, updated_at=timezone.now()):
+                        pay.status = 'SUCCESS'
+                        process_successful_payment(pay)
                 else:
-                    pay.status = 'FAILED'
-                    pay.save()
+                    pending.update(status='FAILED', updated_at=timezone.now())
             return JsonResponse({'status': 'OK'})
         except: pass
     return JsonResponse({'error': 'POST only'}, status=400)
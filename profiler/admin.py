@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Profile
+
+
+@admin.register(Profile)
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = ('id', 'view_name', 'method', 'path', 'status', 'duration_ms', 'queries', 'samples', 'trigger', 'created_at')
+    list_filter = ('trigger', 'view_name')
+    search_fields = ('path', 'view_name')
+    readonly_fields = [field.name for field in Profile._meta.fields]
+    ordering = ('-created_at',)
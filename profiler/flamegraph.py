@@ -0,0 +1,130 @@
+import zlib
+from collections import Counter
+from pathlib import Path
+from django.conf import settings
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+WIDTH = 1200  # SVG user units; the graph scales to the page width
+ROW = 18
+MIN_WIDTH = 0.3  # Frames narrower than this are left out
+CHAR = 6.5  # Approximate width of one character at font-size 11
+
+
+def parse(collapsed):
+    """[(frames tuple, samples)] from "a;b;c 12" lines."""
+    stacks = []
+    for line in collapsed.splitlines():
+        stack, _, count = line.rpartition(' ')
+        if stack and count.isdigit():
+            stacks.append((tuple(stack.split(';')), int(count)))
+    return stacks
+
+
+class Node:
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+        self.children = {}
+
+    def child(self, name):
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = Node(name)
+        return node
+
+    def ordered(self):
+        return sorted(self.children.values(), key=lambda child: child.name)
+
+
+def build(stacks):
+    """Call tree of the whole profile."""
+    root = Node('all')
+    for frames, count in stacks:
+        root.value += count
+        node = root
+        for name in frames:
+            node = node.child(name)
+            node.value += count
+    return root
+
+
+def find(root, focus):
+    """
+    Follows `focus`, a path of child positions like "0.3.1" (short enough for a
+    link, unlike the frame names), to ([frame names on the way], node). None if stale.
+    """
+    names, node = [], root
+    for position in filter(None, focus.split('.')):
+        children = node.ordered()
+        if not position.isdigit() or int(position) >= len(children):
+            return None
+        node = children[int(position)]
+        names.append(node.name)
+    return names, node
+
+
+def top_functions(stacks, limit=25):
+    """[(function, self samples, total samples)]: self = on top of the stack, total = anywhere in it."""
+    own, total = Counter(), Counter()
+    for frames, count in stacks:
+        own[frames[-1]] += count
+        for name in set(frames):
+            total[name] += count
+    return [(name, own[name], total[name]) for name, _ in own.most_common(limit)]
+
+
+def _project_modules():
+    return {path.name for path in Path(settings.BASE_DIR).iterdir() if (path / '__init__.py').exists()}
+
+
+def _colour(name, project):
+    """Our code in warm colours, Django in blue, everything else (stdlib, drivers, libraries) in grey-green."""
+    shade = zlib.crc32(name.encode()) % 40
+    package = name.split('.', 1)[0]
+    if package in project:
+        return f"rgb({215 + shade // 2},{110 + shade * 2},{40 + shade})"
+    if package == 'django':
+        return f"rgb({90 + shade},{150 + shade},{220})"
+    return f"rgb({140 + shade},{170 + shade},{140 + shade})"
+
+
+def render(root, focus='', link=None):
+    """
+    Icicle-style flame graph of `root` (a build() tree or a node of one) as inline
+    SVG: the request at the top, callees below, width proportional to samples.
+    Hover shows the full name and share; with `link` (a function of the focus path)
+    each frame links to a zoomed-in view of itself.
+    """
+    if not root.value:
+        return ''
+    project = _project_modules()
+    scale = WIDTH / root.value
+    parts, depth = [], 0
+    pending = [(root, 0.0, 0, focus)]
+    while pending:
+        node, x, level, path = pending.pop()
+        width = node.value * scale
+        depth = max(depth, level)
+        title = escape(f"{node.name} — {node.value} samples ({node.value / root.value:.1%})")
+        label = node.name if width >= len(node.name) * CHAR + 6 else node.name[:int(width / CHAR) - 2] + '…'
+        rect = (
+            f'<g><title>{title}</title>'
+            f'<rect x="{x:.2f}" y="{level * ROW}" width="{width:.2f}" height="{ROW - 1}" rx="2" '
+            f'fill="{"#e9ecef" if level == 0 else _colour(node.name, project)}"/>'
+            + (f'<text x="{x + 3:.2f}" y="{level * ROW + 13}">{escape(label)}</text>' if width > 3 * CHAR else '')
+            + '</g>'
+        )
+        if link and level:
+            rect = f'<a href="{escape(link(path))}">{rect}</a>'
+        parts.append(rect)
+        offset = x
+        for position, child in enumerate(node.ordered()):
+            if child.value * scale >= MIN_WIDTH:
+                pending.append((child, offset, level + 1, f"{path}.{position}" if path else str(position)))
+            offset += child.value * scale
+    height = (depth + 1) * ROW
+    return mark_safe(
+        f'<svg class="flamegraph" viewBox="0 0 {WIDTH} {height}" width="100%" '
+        f'font-family="monospace" font-size="11" xmlns="http://www.w3.org/2000/svg">{"".join(parts)}</svg>'
+    )
@@ -0,0 +1,89 @@
+import random
+import time
+from django.conf import settings
+from django.core import signing
+from django.db import DatabaseError
+from django.urls import Resolver404, resolve
+from .models import Profile
+from .sampler import sampler
+
+HEADER = 'X-Profile'
+_SALT = 'profiler.header'
+
+
+def make_token(user):
+    """Value for the X-Profile header; valid for PROFILE_TOKEN_MAX_AGE seconds (shown on the profiles page)."""
+    return signing.TimestampSigner(salt=_SALT).sign(str(user.pk))
+
+
+def _valid_token(token):
+    try:
+        signing.TimestampSigner(salt=_SALT).unsign(token, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:  # Includes SignatureExpired
+        return False
+    return True
+
+
+class ProfilingMiddleware:
+    """
+    Samples the call stack of a share of requests (PROFILE_SAMPLE_RATE, limited to
+    the URL names in PROFILE_VIEWS when set) and of any request carrying a valid
+    signed X-Profile header. Sampled requests slower than PROFILE_MIN_MS, and every
+    header request, are stored as a Profile (collapsed stacks) for /super-admin/profiles/.
+    Goes before RequestMetricsMiddleware so the query count is available.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def trigger(self, request):
+        token = request.headers.get(HEADER)
+        if token and _valid_token(token):
+            return 'HEADER'
+        if settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE:
+            if not settings.PROFILE_VIEWS:
+                return 'SAMPLE'
+            try:
+                if resolve(request.path_info).view_name in settings.PROFILE_VIEWS:
+                    return 'SAMPLE'
+            except Resolver404:
+                pass
+        return None
+
+    def __call__(self, request):
+        trigger = self.trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        recording = sampler.start(ProfilingMiddleware.__call__.__code__)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop(recording)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        if trigger == 'SAMPLE' and (match is None or duration_ms < settings.PROFILE_MIN_MS):
+            return response
+        metrics = getattr(response, 'request_metrics', None)
+        user = getattr(request, 'user', None)
+        try:
+            profile = Profile.objects.create(
+                view_name=(match.view_name or match._func_path) if match else '',
+                method=request.method,
+                path=request.get_full_path()[:500],
+                status=response.status_code,
+                duration_ms=round(duration_ms, 2),
+                queries=metrics.queries if metrics else None,
+                samples=recording.samples,
+                interval_ms=settings.PROFILE_INTERVAL_MS,
+                stacks=recording.collapsed(),
+                trigger=trigger,
+                user=user if user is not None and user.is_authenticated else None,
+            )
+        except DatabaseError as e:
+            print(f"Profiler: could not save profile of {request.path}: {e}")
+            return response
+        if trigger == 'HEADER':
+            response['X-Profile-Id'] = str(profile.pk)
+        return response
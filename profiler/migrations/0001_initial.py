@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(blank=True, max_length=150)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('status', models.PositiveSmallIntegerField(default=0)),
+                ('duration_ms', models.FloatField()),
+                ('queries', models.PositiveIntegerField(blank=True, null=True)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('interval_ms', models.FloatField()),
+                ('stacks', models.TextField(blank=True)),
+                ('trigger', models.CharField(choices=[('SAMPLE', 'Random sample'), ('HEADER', 'X-Profile header')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['view_name', '-duration_ms'], name='profiler_view_slowest_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import models
+
+
+class Profile(models.Model):
+    """
+    One sampled request (see profiler.middleware). `stacks` holds collapsed stacks,
+    one "outer;inner;leaf <samples>" line per distinct stack, as flamegraph tools expect.
+    """
+    TRIGGER_CHOICES = [
+        ('SAMPLE', 'Random sample'),
+        ('HEADER', 'X-Profile header'),
+    ]
+
+    view_name = models.CharField(max_length=150, blank=True)  # URL name, e.g. 'dealer_dashboard'
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status = models.PositiveSmallIntegerField(default=0)
+    duration_ms = models.FloatField()
+    queries = models.PositiveIntegerField(null=True, blank=True)  # From RequestMetricsMiddleware, when it ran
+    samples = models.PositiveIntegerField(default=0)
+    interval_ms = models.FloatField()
+    stacks = models.TextField(blank=True)
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['view_name', '-duration_ms'], name='profiler_view_slowest_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,95 @@
+import sys
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+
+# code object -> "module.Qualified.name" (Python 3.11+ co_qualname includes the class)
+_labels = {}
+
+
+def _label(frame):
+    code = frame.f_code
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{frame.f_globals.get('__name__', '?')}.{code.co_qualname}".replace(';', ':')
+    return label
+
+
+class Recording:
+    """Stack samples of one thread, from the frame below `stop_code` down to whatever was running."""
+    def __init__(self, ident, stop_code, max_samples):
+        self.ident = ident
+        self.stop_code = stop_code
+        self.max_samples = max_samples
+        self.samples = 0
+        self.stacks = Counter()  # (outermost, ..., leaf) -> samples
+
+    def add(self, frame):
+        if self.samples >= self.max_samples:
+            return
+        stack = []
+        while frame is not None and frame.f_code is not self.stop_code:
+            stack.append(_label(frame))
+            frame = frame.f_back
+        if frame is None or not stack:
+            return  # Caught outside the profiled call (just starting or finishing)
+        self.samples += 1
+        self.stacks[tuple(reversed(stack))] += 1
+
+    def collapsed(self):
+        """The "a;b;c 12" lines flamegraph tools read, busiest stack first."""
+        return '\n'.join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common())
+
+
+class Sampler:
+    """
+    One daemon thread per process that wakes every PROFILE_INTERVAL_MS while any
+    request is being profiled and records where each of those threads is. It sleeps
+    when nothing is profiled, so unprofiled requests pay nothing.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.recordings = {}  # thread ident -> Recording
+        self.thread = None
+
+    def start(self, stop_code):
+        """Starts sampling the calling thread; pass the code object of the frame that should be the root."""
+        recording = Recording(threading.get_ident(), stop_code, settings.PROFILE_MAX_SAMPLES)
+        with self.lock:
+            self.recordings[recording.ident] = recording
+            if self.thread is None or not self.thread.is_alive():  # Also after a fork
+                self.thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+                self.thread.start()
+            self.wake.set()
+        return recording
+
+    def stop(self, recording):
+        with self.lock:
+            self.recordings.pop(recording.ident, None)
+        return recording
+
+    def _run(self):
+        interval = settings.PROFILE_INTERVAL_MS / 1000
+        while True:
+            # Held while sampling, so stop() never returns mid-sample
+            with self.lock:
+                if not self.recordings:
+                    self.wake.clear()
+                    idle = True
+                else:
+                    idle = False
+                    frames = sys._current_frames()
+                    for ident, recording in self.recordings.items():
+                        frame = frames.get(ident)
+                        if frame is not None:
+                            recording.add(frame)
+                    frames = frame = None  # Don't keep other threads' frames (and their locals) alive while sleeping
+            if idle:
+                self.wake.wait()
+            else:
+                time.sleep(interval)
+
+
+sampler = Sampler()
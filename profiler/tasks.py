@@ -0,0 +1,13 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from jobs.queue import task
+from .models import Profile
+
+
+@task('profiler.prune')
+def prune_profiles():
+    """Deletes profiles older than PROFILE_KEEP_DAYS (scheduled in JOB_SCHEDULE)."""
+    cutoff = timezone.now() - timedelta(days=settings.PROFILE_KEEP_DAYS)
+    deleted, _ = Profile.objects.filter(created_at__lt=cutoff).delete()
+    print(f"Pruned {deleted} profile(s).")
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.profile_list, name='profile_list'),
+    path('<int:profile_id>/', views.profile_detail, name='profile_detail'),
+    path('<int:profile_id>/stacks/', views.profile_stacks, name='profile_stacks'),
+]
@@ -0,0 +1,71 @@
+from datetime import timedelta
+from urllib.parse import urlencode
+from django.conf import settings
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils import timezone
+from users.views import is_superuser
+from . import flamegraph
+from .middleware import HEADER, make_token
+from .models import Profile
+
+
+@login_required
+@user_passes_test(is_superuser)
+def profile_list(request):
+    """Slowest stored profiles of the last few days, plus a header token for profiling a request on demand."""
+    try:
+        days = max(1, int(request.GET.get('days', 7)))
+    except ValueError:
+        days = 7
+    view_name = request.GET.get('view', '')
+
+    recent = Profile.objects.filter(created_at__gte=timezone.now() - timedelta(days=days))
+    view_names = recent.order_by('view_name').values_list('view_name', flat=True).distinct()
+    if view_name:
+        recent = recent.filter(view_name=view_name)
+    profiles = recent.defer('stacks').select_related('user').order_by('-duration_ms')[:100]
+
+    return render(request, 'profiler/profile_list.html', {
+        'profiles': profiles,
+        'days': days,
+        'view_name': view_name,
+        'view_names': list(view_names),
+        'header': HEADER,
+        'token': make_token(request.user),
+        'token_hours': settings.PROFILE_TOKEN_MAX_AGE // 3600,
+        'sample_rate': settings.PROFILE_SAMPLE_RATE,
+        'sampled_views': settings.PROFILE_VIEWS,
+        'example_url': request.build_absolute_uri('/dashboard/'),
+    })
+
+
+@login_required
+@user_passes_test(is_superuser)
+def profile_detail(request, profile_id):
+    profile = get_object_or_404(Profile.objects.select_related('user'), pk=profile_id)
+    stacks = flamegraph.parse(profile.stacks)
+    tree = flamegraph.build(stacks)
+    focus = request.GET.get('focus', '')
+    found = flamegraph.find(tree, focus)
+    if found is None:  # Mistyped or hand-edited link: show the whole request
+        focus, found = '', ([], tree)
+    names, node = found
+
+    return render(request, 'profiler/profile_detail.html', {
+        'profile': profile,
+        'graph': flamegraph.render(node, focus, link=lambda path: '?' + urlencode({'focus': path})),
+        'focus': names,
+        'top': flamegraph.top_functions(stacks),
+    })
+
+
+@login_required
+@user_passes_test(is_superuser)
+def profile_stacks(request, profile_id):
+    """The raw collapsed stacks, for speedscope, flamegraph.pl and similar tools."""
+    profile = get_object_or_404(Profile, pk=profile_id)
+    response = HttpResponse(profile.stacks + '\n', content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="profile-{profile.pk}.folded"'
+    return response
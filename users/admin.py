@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html # <--- Critical for Image Previews
-from .models import User, DealerProfile, CustomerProfile # <--- Added CustomerProfile
+from .models import User, DealerProfile, CustomerProfile, EmailDelivery # <--- Added CustomerProfile
 
 class DealerProfileInline(admin.StackedInline):
     model = DealerProfile
@@ -67,5 +67,13 @@ class CustomerProfileAdmin(admin.ModelAdmin):
         ('Documents', {'fields': ('id_front_image', 'id_front_image_preview', 'driving_license_image', 'driving_license_image_preview')}),
     )
 
+# --- BULK MAIL LOG ---
+@admin.register(EmailDelivery)
+class EmailDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'kind', 'status', 'attempts', 'subject', 'created_at', 'sent_at')
+    list_filter = ('kind', 'status', 'created_at')
+    search_fields = ('recipient', 'subject', 'run')
+    readonly_fields = ('run', 'kind', 'recipient', 'subject', 'status', 'attempts', 'error', 'created_at', 'sent_at')
+
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(DealerProfile)
\ No newline at end of file
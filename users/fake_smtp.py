@@ -0,0 +1,128 @@
+import socketserver
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class ReceivedMessage:
+    mail_from: str
+    recipients: list
+    data: bytes
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib / Django's SMTP backend: no TLS, AUTH or extensions."""
+
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)  # One simulated network round-trip per reply
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 fake-smtp ready")
+        mail_from, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb, _, arg = line.decode(errors='replace').strip().partition(' ')
+            verb = verb.upper()
+
+            if verb in ('HELO', 'EHLO'):
+                self.reply("250 fake-smtp")
+            elif verb == 'MAIL':
+                mail_from, recipients = arg.partition(':')[2].strip(' <>'), []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                address = arg.partition(':')[2].strip(' <>')
+                with server.lock:
+                    server.rcpt_count += 1
+                    deferred = server.defer_every and server.rcpt_count % server.defer_every == 0
+                if address in server.reject:
+                    self.reply(f"550 No such user {address}")
+                elif deferred:
+                    self.reply("451 Try again later")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == 'DATA':
+                if not recipients:
+                    self.reply("503 No valid recipients")
+                    continue
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(chunk[1:] if chunk.startswith(b'..') else chunk)  # Undo dot-stuffing
+                with server.lock:
+                    server.messages.append(ReceivedMessage(mail_from, recipients, b''.join(lines)))
+                mail_from, recipients = None, []
+                self.reply("250 Queued")
+            elif verb == 'RSET':
+                mail_from, recipients = None, []
+                self.reply("250 OK")
+            elif verb == 'NOOP':
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply(f"502 {verb} not implemented")
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    In-process SMTP sink for exercising users.mailer without a real provider.
+    Point Django at it and everything "sent" lands in `server.messages`:
+
+        with FakeSMTPServer(latency=0.05, reject={'bad@example.com'}) as server:
+            with override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+                                   EMAIL_HOST=server.host, EMAIL_PORT=server.port):
+                result = mailer.dispatch(messages, kind='test')
+
+    `latency` delays every reply (a provider's round-trip), `reject` answers
+    those recipients with a permanent 550, and `defer_every=n` answers every
+    n-th RCPT with a transient 451 so retries can be exercised.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, reject=(), defer_every=0):
+        super().__init__((host, port), _SMTPHandler)
+        self.latency = latency
+        self.reject = set(reject)
+        self.defer_every = defer_every
+        self.lock = threading.Lock()
+        self.messages = []
+        self.connections = 0
+        self.rcpt_count = 0
+        self._thread = None
+
+    @property
+    def host(self):
+        return self.server_address[0]
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-smtp', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
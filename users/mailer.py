@@ -0,0 +1,148 @@
+import math
+import smtplib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from django.conf import settings
+from django.core.mail import get_connection
+from django.utils import timezone
+from .models import EmailDelivery
+
+
+@dataclass
+class Outcome:
+    delivery_id: int
+    recipient: str
+    ok: bool
+    attempts: int
+    error: str = ''
+
+
+@dataclass
+class DispatchResult:
+    run: uuid.UUID
+    sent: list = field(default_factory=list)    # Recipients
+    failed: list = field(default_factory=list)  # (recipient, error)
+
+
+def is_permanent(exc):
+    """5xx replies won't change on retry; disconnects, timeouts and 4xx deferrals might."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code >= 500
+    return False
+
+
+def describe(exc):
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return '; '.join(f"{code} {msg.decode(errors='replace') if isinstance(msg, bytes) else msg}"
+                         for code, msg in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        msg = exc.smtp_error.decode(errors='replace') if isinstance(exc.smtp_error, bytes) else exc.smtp_error
+        return f"{exc.smtp_code} {msg}"
+    return f"{type(exc).__name__}: {exc}"
+
+
+def _close(connection):
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def send_batch(batch, max_attempts=None, retry_delay=None):
+    """
+    Sends [(delivery id, message), ...] over one SMTP connection, reconnecting
+    only after a transient failure. Returns one Outcome per message.
+    Runs in a worker thread, so it never touches the database.
+    """
+    max_attempts = max_attempts or settings.MAIL_MAX_ATTEMPTS
+    retry_delay = settings.MAIL_RETRY_DELAY if retry_delay is None else retry_delay
+    outcomes = []
+    connection = None
+    try:
+        for position, (delivery_id, message) in enumerate(batch):
+            recipient = ', '.join(message.recipients())
+            if not recipient:
+                outcomes.append(Outcome(delivery_id, recipient, False, 0, 'No recipient address'))
+                continue
+            attempts = 0
+            while True:
+                attempts += 1
+                try:
+                    if connection is None:
+                        connection = get_connection(fail_silently=False)
+                        connection.open()
+                    connection.send_messages([message])
+                    outcomes.append(Outcome(delivery_id, recipient, True, attempts))
+                    break
+                except smtplib.SMTPAuthenticationError as e:
+                    # Every message on this connection would fail the same way; don't hammer the login
+                    outcomes.append(Outcome(delivery_id, recipient, False, attempts, describe(e)))
+                    outcomes += [Outcome(i, ', '.join(m.recipients()), False, 0, describe(e)) for i, m in batch[position + 1:]]
+                    return outcomes
+                except Exception as e:
+                    if is_permanent(e) or attempts >= max_attempts:
+                        outcomes.append(Outcome(delivery_id, recipient, False, attempts, describe(e)))
+                        break
+                    # The connection may be half-dead; retry on a fresh one after a backoff
+                    _close(connection)
+                    connection = None
+                    time.sleep(retry_delay * 2 ** (attempts - 1))
+    finally:
+        _close(connection)
+    return outcomes
+
+
+def _record(outcomes):
+    now = timezone.now()
+    deliveries = [
+        EmailDelivery(
+            id=o.delivery_id, status='SENT' if o.ok else 'FAILED', attempts=o.attempts,
+            error=o.error, sent_at=now if o.ok else None,
+        )
+        for o in outcomes
+    ]
+    EmailDelivery.objects.bulk_update(deliveries, ['status', 'attempts', 'error', 'sent_at'])
+
+
+def dispatch(messages, kind, workers=None, batch_size=None):
+    """
+    Sends an iterable of EmailMessage objects (one recipient each) for a bulk job:
+      1. messages are split into per-connection batches, each logged as QUEUED EmailDelivery rows,
+      2. a bounded thread pool sends each batch over a single reused SMTP connection,
+      3. failures are retried with backoff unless the server rejected them permanently,
+      4. each batch's per-recipient outcomes are written back as it finishes.
+    SMTP round-trips, not CPU, are what a report run waits on, so wall time drops
+    roughly by the worker count plus the handshakes saved by connection reuse.
+    """
+    workers = workers or settings.MAIL_WORKERS
+    batch_size = batch_size or settings.MAIL_BATCH_SIZE
+    result = DispatchResult(run=uuid.uuid4())
+
+    def queue(pool, batch):
+        rows = EmailDelivery.objects.bulk_create([
+            EmailDelivery(run=result.run, kind=kind, recipient=', '.join(m.recipients())[:254], subject=m.subject[:255])
+            for m in batch
+        ])
+        return pool.submit(send_batch, [(row.id, m) for row, m in zip(rows, batch)])
+
+    messages = list(messages)
+    # Spread small runs over every worker rather than filling one connection first
+    size = max(1, min(batch_size, math.ceil(len(messages) / workers)))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mail') as pool:
+        futures = [queue(pool, messages[i:i + size]) for i in range(0, len(messages), size)]
+
+        for future in as_completed(futures):
+            outcomes = future.result()
+            _record(outcomes)
+            for o in outcomes:
+                if o.ok:
+                    result.sent.append(o.recipient)
+                else:
+                    result.failed.append((o.recipient, o.error))
+    return result
@@ -0,0 +1,117 @@
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from cars.models import Car, CarView, Lead
+from users.models import DealerProfile
+from users.reports import DealerReport
+
+User = get_user_model()
+
+
+def legacy_stats(profile, since):
+    """
+    The per-dealer queries send_weekly_report used to run, kept as the baseline
+    (plus an id tie-break on the star car so both paths are deterministic).
+    """
+    user = profile.user
+    return {
+        'new_views': CarView.objects.filter(car__dealer=user, timestamp__gte=since).count(),
+        'new_leads': Lead.objects.filter(car__dealer=user, timestamp__gte=since).count(),
+        'active_cars': Car.objects.filter(dealer=user, status='AVAILABLE').count(),
+        'sold_cars': Car.objects.filter(dealer=user, status='SOLD').count(),
+        'total_cars': Car.objects.filter(dealer=user).count(),
+        'top_car': Car.objects.filter(dealer=user, status='AVAILABLE')
+            .annotate(recent_views=Count('views', filter=Q(views__timestamp__gte=since)))
+            .order_by('-recent_views', 'id').first(),
+    }
+
+
+class QueryCounter:
+    # execute_wrapper rather than CaptureQueriesContext, whose log caps at 9000 queries
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Compares per-dealer vs. set-based weekly report queries on a throwaway seeded dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dealers', type=int, default=500)
+        parser.add_argument('--cars', type=int, default=8, help='Cars per dealer')
+        parser.add_argument('--views', type=int, default=20, help='Views per car (spread over 14 days)')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=7)
+        with transaction.atomic():
+            self.seed(options['dealers'], options['cars'], options['views'])
+            profiles = list(DealerProfile.objects.select_related('user').filter(user__username__startswith='bench_weekly_'))
+
+            old_q, new_q = QueryCounter(), QueryCounter()
+            with connection.execute_wrapper(old_q):
+                started = time.perf_counter()
+                old = {p.user_id: legacy_stats(p, since) for p in profiles}
+                old_s = time.perf_counter() - started
+
+            with connection.execute_wrapper(new_q):
+                started = time.perf_counter()
+                new = dict(DealerReport(since).items())
+                new_s = time.perf_counter() - started
+
+            new = {dealer_id: self.legacy_shape(m) for dealer_id, m in new.items()}
+            mismatches = [p.user_id for p in profiles if self.comparable(old[p.user_id]) != self.comparable(new.get(p.user_id))]
+            transaction.set_rollback(True)  # Leave no benchmark rows behind
+
+        self.stdout.write(f"{len(profiles)} dealers, {options['cars']} cars each, {options['views']} views per car")
+        self.stdout.write(f"{'path':<12}{'queries':>10}{'seconds':>10}")
+        self.stdout.write(f"{'per-dealer':<12}{old_q.count:>10}{old_s:>10.3f}")
+        self.stdout.write(f"{'set-based':<12}{new_q.count:>10}{new_s:>10.3f}")
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"❌ {len(mismatches)} dealer(s) differ, e.g. #{mismatches[0]}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Identical results, {old_s / max(new_s, 1e-9):.0f}x faster"))
+
+    @staticmethod
+    def legacy_shape(metrics):
+        return {
+            'new_views': metrics.views, 'new_leads': metrics.leads, 'active_cars': metrics.active_cars,
+            'sold_cars': metrics.sold_cars, 'total_cars': metrics.total_cars, 'top_car': metrics.hot_car,
+        }
+
+    @staticmethod
+    def comparable(stats):
+        if stats is None:
+            return None
+        return {**stats, 'top_car': stats['top_car'].id if stats['top_car'] else None}
+
+    def seed(self, dealers, cars_per_dealer, views_per_car):
+        rng = random.Random(7)
+        now = timezone.now()
+        User.objects.bulk_create([
+            User(username=f"bench_weekly_{i}", email=f"bench{i}@example.com", role='DEALER') for i in range(dealers)
+        ])
+        users = list(User.objects.filter(username__startswith='bench_weekly_'))
+        DealerProfile.objects.bulk_create([DealerProfile(user=u, business_name=u.username) for u in users])
+        Car.objects.bulk_create([
+            Car(dealer=u, make='Toyota', model='Vitz', year=2018, price=1_000_000, description='-',
+                status=rng.choice(['AVAILABLE', 'AVAILABLE', 'AVAILABLE', 'SOLD', 'HIDDEN']))
+            for u in users for _ in range(cars_per_dealer)
+        ])
+        cars = list(Car.objects.filter(dealer__in=users))
+        views = [CarView(car=c) for c in cars for _ in range(rng.randint(0, views_per_car * 2))]
+        CarView.objects.bulk_create(views, batch_size=5000)
+        # Spread timestamps across two weeks (auto_now_add ignores values passed to bulk_create)
+        for view in views:
+            view.timestamp = now - timedelta(hours=rng.randint(0, 14 * 24))
+        CarView.objects.bulk_update(views, ['timestamp'], batch_size=5000)
+        leads = [Lead(car=c, action_type='CALL') for c in rng.sample(cars, len(cars) // 3)]
+        Lead.objects.bulk_create(leads)
+        self.stdout.write(f"Seeded {len(users)} dealers, {len(cars)} cars, {len(views)} views, {len(leads)} leads")
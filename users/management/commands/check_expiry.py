@@ -1,68 +1,71 @@
+from collections import Counter
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
-from django.db.models import Count
 from users.models import DealerProfile
 from cars.models import Car
 
-# Define the limit for the free tier (Centralized logic)
-STARTER_CAR_LIMIT = 5
-
 class Command(BaseCommand):
-    help = 'Checks for expired subscriptions and downgrades dealers to STARTER plan'
+    help = 'Downgrades expired subscriptions and hides cars beyond the new plan limit (safe to run every minute)'
 
-    def handle(self, *args, **kwargs):
-        today = timezone.now().date()
-        
-        # 1. Find dealers who are expired but still on paid plans
-        expired_dealers = DealerProfile.objects.filter(
-            subscription_expiry__lt=today,
-            plan_type__in=['LITE', 'PRO']
-        )
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change, then roll back')
 
-        if not expired_dealers.exists():
-            self.stdout.write(self.style.SUCCESS('No expired subscriptions found today.'))
-            return
+    def handle(self, *args, **options):
+        now = timezone.now()
 
-        self.stdout.write(self.style.WARNING(f'Found {expired_dealers.count()} expired dealers. Processing...'))
+        with transaction.atomic():
+            # 1. Lock the expired paid profiles. Rows another run is already handling are skipped,
+            # so overlapping runs never downgrade the same dealer twice.
+            expired = list(
+                DealerProfile.objects.select_for_update(skip_locked=True)
+                .filter(subscription_expiry__lt=now, plan_type__in=DealerProfile.PLAN_DOWNGRADES)
+                .values_list('id', 'user_id', 'plan_type')
+            )
+            if not expired:
+                self.stdout.write(self.style.SUCCESS('No expired subscriptions found.'))
+                return
+            profile_ids = [profile_id for profile_id, _, _ in expired]
+            dealer_ids = [dealer_id for _, dealer_id, _ in expired]
 
-        for profile in expired_dealers:
-            old_plan = profile.plan_type
-            
-            # --- ACTION 1: DOWNGRADE PLAN ---
-            profile.plan_type = 'STARTER'
-            profile.subscription_expiry = None # Clear the date so they don't get flagged again
-            profile.save()
-            
-            self.stdout.write(f"Downgraded {profile.business_name} ({profile.user.username}) from {old_plan} to STARTER.")
+            # 2. Downgrade them all in one UPDATE; clearing the date means they won't match again
+            DealerProfile.objects.filter(id__in=profile_ids).update(
+                plan_type=Case(*[When(plan_type=old, then=Value(new)) for old, new in DealerProfile.PLAN_DOWNGRADES.items()]),
+                subscription_expiry=None,
+            )
 
-            # --- ACTION 2: ENFORCE INVENTORY LIMITS ---
-            # Get all their currently AVAILABLE cars, ordered by newest first
-            my_cars = Car.objects.filter(
-                dealer=profile.user, 
-                status='AVAILABLE'
-            ).order_by('-created_at')
-            
-            total_active = my_cars.count()
+            # 3. Rank each dealer's AVAILABLE cars newest first and hide everything past
+            # the new plan's limit, in one UPDATE
+            car_limit = Case(
+                *[When(dealer__dealer_profile__plan_type=plan, then=Value(limits['cars']))
+                  for plan, limits in DealerProfile.PLAN_LIMITS.items()],
+                default=Value(0), output_field=IntegerField(),
+            )
+            excess = (
+                Car.objects.filter(dealer_id__in=dealer_ids, status='AVAILABLE')
+                .annotate(
+                    rank=Window(RowNumber(), partition_by=[F('dealer_id')], order_by=[F('created_at').desc(), F('id').desc()]),
+                    car_limit=car_limit,
+                )
+                .filter(rank__gt=F('car_limit'))
+                .values('id')
+            )
+            hidden = Car.objects.filter(id__in=excess).update(status='HIDDEN')
 
-            if total_active > STARTER_CAR_LIMIT:
-                # Calculate how many to hide
-                excess_count = total_active - STARTER_CAR_LIMIT
-                
-                # Identify the oldest cars (the ones exceeding the limit)
-                # We slice from the limit onwards [5:]
-                cars_to_hide = my_cars[STARTER_CAR_LIMIT:]
-                
-                # Bulk update them to a new status 'HIDDEN' or just 'DRAFT'
-                # Since we don't have a HIDDEN status yet, we will use a custom status
-                # ensuring your frontend filters exclude it.
-                count_hidden = 0
-                for car in cars_to_hide:
-                    car.status = 'HIDDEN' # Ensure your views filter exclude 'HIDDEN'
-                    car.save()
-                    count_hidden += 1
-                
-                self.stdout.write(self.style.ERROR(f"   - Locked {count_hidden} excess vehicles."))
+            # 4. Summary
+            downgrades = Counter(f"{old} → {DealerProfile.PLAN_DOWNGRADES[old]}" for _, _, old in expired)
+            verb = 'Would downgrade' if options['dry_run'] else 'Downgraded'
+            self.stdout.write(self.style.WARNING(
+                f"{verb} {len(expired)} expired dealer(s): " + ', '.join(f"{n}× {move}" for move, n in sorted(downgrades.items()))
+            ))
+            if hidden:
+                self.stdout.write(self.style.ERROR(f"   - {'Would lock' if options['dry_run'] else 'Locked'} {hidden} excess vehicle(s)."))
             else:
-                self.stdout.write(self.style.SUCCESS(f"   - Inventory within limits ({total_active}/{STARTER_CAR_LIMIT}). No locking needed."))
+                self.stdout.write(self.style.SUCCESS("   - Inventory within limits. No locking needed."))
+
+            if options['dry_run']:
+                transaction.set_rollback(True)
 
-        self.stdout.write(self.style.SUCCESS('Subscription check complete.'))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS('Subscription check complete.'))
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from users.fake_smtp import FakeSMTPServer
+
+class Command(BaseCommand):
+    help = 'Runs a local SMTP sink that accepts (and discards) mail, for trying out report runs without a real provider'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=1025)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds of delay before every SMTP reply')
+        parser.add_argument('--reject', nargs='*', default=[], help='Addresses to refuse with a permanent 550')
+        parser.add_argument('--defer-every', type=int, default=0, help='Answer every n-th recipient with a transient 451')
+
+    def handle(self, *args, **options):
+        server = FakeSMTPServer(options['host'], options['port'], latency=options['latency'],
+                                reject=options['reject'], defer_every=options['defer_every']).start()
+        self.stdout.write(self.style.SUCCESS(f"📭 Fake SMTP listening on {server.host}:{server.port}"))
+        self.stdout.write(f"Run jobs with EMAIL_BACKEND=django.core.mail.backends.smtp.EmailBackend "
+                          f"EMAIL_HOST={server.host} EMAIL_PORT={server.port}. Ctrl+C to stop.")
+        seen = 0
+        try:
+            while True:
+                time.sleep(1)
+                with server.lock:
+                    new = server.messages[seen:]
+                    connections = server.connections
+                for message in new:
+                    self.stdout.write(f"  {', '.join(message.recipients)} ({len(message.data)} bytes)")
+                seen += len(new)
+                if new:
+                    self.stdout.write(f"📨 {seen} message(s) over {connections} connection(s)")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
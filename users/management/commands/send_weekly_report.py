@@ -3,10 +3,10 @@ from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Count, Q
 from django.conf import settings
 from users.models import DealerProfile
-from cars.models import Car, CarView, Lead
+from users import mailer
+from users.reports import DealerReport
 
 class Command(BaseCommand):
     help = 'Sends weekly performance summary emails to dealers (HTML Version)'
@@ -21,7 +21,10 @@ class Command(BaseCommand):
         # 2. Get active dealers with valid emails
         dealers = DealerProfile.objects.select_related('user').filter(user__email__isnull=False)
 
-        count_sent = 0
+        # 3. Calculate Stats (Last 7 Days) for every dealer in one pass
+        report = DealerReport(seven_days_ago, today).compute()
+
+        messages = []
 
         for profile in dealers:
             user = profile.user
@@ -30,40 +33,27 @@ class Command(BaseCommand):
             if not email:
                 continue
 
-            # 3. Calculate Stats (Last 7 Days)
-            
-            # A. Traffic & Leads
-            new_views = CarView.objects.filter(car__dealer=user, timestamp__gte=seven_days_ago).count()
-            new_leads = Lead.objects.filter(car__dealer=user, timestamp__gte=seven_days_ago).count()
-
-            # B. Inventory Health
-            active_cars = Car.objects.filter(dealer=user, status='AVAILABLE').count()
-            sold_cars = Car.objects.filter(dealer=user, status='SOLD').count()
-            total_cars = Car.objects.filter(dealer=user).count()
+            stats = report[user.id]
+            new_views, new_leads, active_cars = stats.views, stats.leads, stats.active_cars
 
             # SKIP LOGIC: Don't spam inactive users (0 cars, 0 views, 0 leads)
-            if active_cars == 0 and new_views == 0 and new_leads == 0:
+            if stats.is_idle:
                 continue 
 
-            # 4. Find "Star Car" (Most viewed this week)
-            top_car = Car.objects.filter(dealer=user, status='AVAILABLE')\
-                .annotate(recent_views=Count('views', filter=Q(views__timestamp__gte=seven_days_ago)))\
-                .order_by('-recent_views').first()
-            
-            # 5. Prepare Data for HTML Template
+            # 4. Prepare Data for HTML Template
             context = {
                 'business_name': profile.business_name,
                 'start_date': seven_days_ago.strftime('%b %d'),
                 'end_date': today.strftime('%b %d'),
-                'new_leads': new_leads,
                 'new_views': new_views,
+                'new_leads': new_leads,
                 'active_cars': active_cars,
-                'sold_cars': sold_cars,
-                'total_cars': total_cars,
-                'top_car': top_car,
+                'sold_cars': stats.sold_cars,
+                'total_cars': stats.total_cars,
+                'top_car': stats.hot_car,
             }
 
-            # 6. Render the HTML
+            # 5. Render the HTML
             # This looks for templates/emails/weekly_report.html
             html_content = render_to_string('emails/weekly_report.html', context)
             
@@ -77,26 +67,27 @@ class Command(BaseCommand):
             Login to your dashboard for full details: https://buycars-africa.onrender.com/dashboard/
             """
 
-            # 7. Dynamic Subject Line
+            # 6. Dynamic Subject Line
             if new_leads > 0:
                 subject = f"🚀 You got {new_leads} new leads this week!"
             else:
                 subject = f"📈 Your Weekly Performance Report - BuyCars.Africa"
 
-            # 8. Send the Email
-            try:
-                msg = EmailMultiAlternatives(
-                    subject, 
-                    text_content, 
-                    settings.DEFAULT_FROM_EMAIL, 
-                    [email]
-                )
-                msg.attach_alternative(html_content, "text/html")
-                msg.send()
-                
-                count_sent += 1
-                self.stdout.write(f"✅ Sent to {profile.business_name} ({email})")
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"❌ Failed to send to {email}: {e}"))
+            msg = EmailMultiAlternatives(
+                subject, 
+                text_content, 
+                settings.DEFAULT_FROM_EMAIL, 
+                [email]
+            )
+            msg.attach_alternative(html_content, "text/html")
+            messages.append(msg)
+
+        # 7. Send everything over pooled SMTP connections (outcomes are logged as EmailDelivery rows)
+        result = mailer.dispatch(messages, kind='weekly_report')
+
+        for email in result.sent:
+            self.stdout.write(f"✅ Sent to {email}")
+        for email, error in result.failed:
+            self.stdout.write(self.style.ERROR(f"❌ Failed to send to {email}: {error}"))
 
-        self.stdout.write(self.style.SUCCESS(f"Done. Sent {count_sent} weekly reports."))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(f"Done. Sent {len(result.sent)} weekly reports."))
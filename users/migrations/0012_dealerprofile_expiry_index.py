@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_emaildelivery'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dealerprofile',
+            index=models.Index(fields=['subscription_expiry'], name='users_deale_subscri_7a2387_idx'),
+        ),
+    ]
@@ -43,6 +43,17 @@ class DealerProfile(models.Model):
         ('LITE', 'Lite (15 Cars)'),      # KES 5,000
         ('PRO', 'Pro (50 Cars)'),        # KES 12,000
     ]
+    # Monthly price in KES (reports use it for cost-per-lead)
+    PLAN_PRICES = {'FREE': 0, 'STARTER': 1500, 'LITE': 5000, 'PRO': 12000}
+    # Limits per tier (live AVAILABLE cars, Featured Slots, Lead Views, Photos per car)
+    PLAN_LIMITS = {
+        'FREE':    {'cars': 0,  'featured': 0, 'leads': 0,  'images': 0},
+        'STARTER': {'cars': 5,  'featured': 0, 'leads': 7,  'images': 8},
+        'LITE':    {'cars': 15, 'featured': 2, 'leads': 16, 'images': 15},
+        'PRO':     {'cars': 50, 'featured': 5, 'leads': 30, 'images': 30},
+    }
+    # Where an expired plan lands (check_expiry)
+    PLAN_DOWNGRADES = {'PRO': 'STARTER', 'LITE': 'STARTER', 'STARTER': 'FREE'}
 
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='dealer_profile')
     business_name = models.CharField(max_length=100)
@@ -83,6 +94,10 @@ class DealerProfile(models.Model):
     # This enables the verified checkmark on the frontend
     is_verified = models.BooleanField(default=False, help_text="Designates a trusted/pro dealer (Blue Tick)")
 
+    class Meta:
+        # check_expiry runs every minute against this
+        indexes = [models.Index(fields=['subscription_expiry'])]
+
     def __str__(self):
         return self.business_name
 
@@ -100,34 +115,19 @@ class DealerProfile(models.Model):
     @property
     def plan_limits(self):
         """Return limits dictionary based on the current plan"""
-        # Define limits for each tier (Cars, Featured Slots, Lead Views)
-        # IMAGES are unlimited for all paid plans.
-        LIMITS = {
-            'FREE':    {'cars': 0,  'featured': 0, 'leads': 0},
-            'STARTER': {'cars': 5,  'featured': 0, 'leads': 7},
-            'LITE':    {'cars': 15, 'featured': 2, 'leads': 16},
-            'PRO':     {'cars': 50, 'featured': 5, 'leads': 30},
-        }
-        
         # If plan is expired or Free, return restricted limits
         if not self.is_plan_active:
-            return LIMITS['FREE']
+            return self.PLAN_LIMITS['FREE']
             
-        return LIMITS.get(self.plan_type, LIMITS['FREE'])
+        return self.PLAN_LIMITS.get(self.plan_type, self.PLAN_LIMITS['FREE'])
 
     def can_add_car(self):
         """
-        Returns True if the dealer can add more cars based on their plan limits.
+        Returns True if the dealer can list another car based on their plan limits.
+        Only live (AVAILABLE) cars count, as in check_expiry and bulk relisting.
         """
         limit = self.plan_limits['cars']
-        
-        # Access cars via related_name 'cars' (defined in Car model)
-        if hasattr(self.user, 'cars'):
-            current_count = self.user.cars.count()
-        else:
-            current_count = self.user.car_set.count()
-
-        return current_count < limit
+        return self.user.cars.filter(status='AVAILABLE').count() < limit
 
     def can_feature_car(self):
         """
@@ -161,4 +161,32 @@ class CustomerProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Customer: {self.user.username}"
\ No newline at end of file
+        return f"Customer: {self.user.username}"
+# --- BULK MAIL DELIVERY LOG ---
+class EmailDelivery(models.Model):
+    """
+    One message of a bulk send (users.mailer.dispatch), so failed report emails
+    can be seen and retried instead of only scrolling past in a cron log.
+    """
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    run = models.UUIDField(db_index=True)  # Shared by every message of one dispatch() call
+    kind = models.CharField(max_length=30)  # e.g. 'weekly_report'
+    recipient = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'Email deliveries'
+        indexes = [models.Index(fields=['kind', 'status', 'id'])]
+
+    def __str__(self):
+        return f"{self.kind} → {self.recipient}: {self.status}"
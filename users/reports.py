@@ -0,0 +1,176 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from django.conf import settings
+from django.db.models import Count, Min, Q, Sum
+from django.utils import timezone
+from buycars_project.instrumentation import note_cache
+from cars.models import Car, CarView, Lead
+from .models import DealerProfile
+
+# What a lead would cost on Facebook Ads (KES), for the "x cheaper" line in reports
+FACEBOOK_CPL = 400
+
+
+@dataclass
+class DealerMetrics:
+    """
+    One dealer's numbers for a report window. Traffic (views, leads, hot car) is
+    counted inside the window; stock figures are a snapshot of the inventory now.
+    """
+    views: int = 0
+    leads: int = 0
+    whatsapp_clicks: int = 0
+    calls: int = 0
+    total_cars: int = 0
+    active_cars: int = 0
+    sold_cars: int = 0
+    inventory_value: int = 0  # Asking prices of AVAILABLE cars
+    hot_car: object = None    # Most viewed AVAILABLE car in the window (oldest listing if none were viewed)
+    hot_car_views: int = 0
+    plan_cost: int = 0
+
+    @property
+    def cpl(self):
+        """Cost per lead in KES (0 when there were no leads or the plan is free)."""
+        return int(self.plan_cost / self.leads) if self.leads and self.plan_cost else 0
+
+    @property
+    def roi_multiplier(self):
+        return round(FACEBOOK_CPL / self.cpl, 1) if 0 < self.cpl < FACEBOOK_CPL else 1
+
+    @property
+    def is_idle(self):
+        """Nothing listed and nothing happened: not worth an email."""
+        return self.active_cars == 0 and self.views == 0 and self.leads == 0
+
+
+class DealerReport:
+    """
+    Computes DealerMetrics for many dealers over one window [start, end) with a
+    fixed number of grouped queries, however many dealers are asked for.
+    start=None means since the beginning, end=None means up to now.
+
+        report = DealerReport(start, end)
+        report.compute()              # Every dealer in one pass (report emails)
+        report[request.user.id]       # Or just the dealers you index (dashboard, PDF)
+
+    Results are memoized per dealer on the instance; DealerReport.for_window
+    additionally shares instances for closed windows across callers.
+    """
+    _shared = OrderedDict()  # (start, end) -> (created monotonic, DealerReport)
+    _shared_max = 16
+
+    def __init__(self, start=None, end=None):
+        self.start, self.end = start, end
+        self._metrics = {}
+        self._complete = False
+
+    @classmethod
+    def for_window(cls, start, end):
+        """
+        A memoized report for a window that has already ended, so a monthly email
+        run and the PDFs for the same month reuse one computation. Stock snapshot
+        figures can lag by up to REPORT_MEMO_SECONDS.
+        """
+        if end is None or end > timezone.now():
+            return cls(start, end)  # Still filling up; never share
+        key = (start, end)
+        hit = cls._shared.get(key)
+        if hit and time.monotonic() - hit[0] < settings.REPORT_MEMO_SECONDS:
+            cls._shared.move_to_end(key)
+            note_cache('report_memo', hit=True)
+            return hit[1]
+        note_cache('report_memo', hit=False)
+        report = cls(start, end)
+        cls._shared[key] = (time.monotonic(), report)
+        while len(cls._shared) > cls._shared_max:
+            cls._shared.popitem(last=False)
+        return report
+
+    def __getitem__(self, dealer_id):
+        if dealer_id not in self._metrics and not self._complete:
+            self.compute([dealer_id])
+        return self._metrics.get(dealer_id) or DealerMetrics()
+
+    def items(self):
+        self.compute()
+        return self._metrics.items()
+
+    def _window(self, field):
+        q = Q()
+        if self.start is not None:
+            q &= Q(**{f"{field}__gte": self.start})
+        if self.end is not None:
+            q &= Q(**{f"{field}__lt": self.end})
+        return q
+
+    def compute(self, dealer_ids=None):
+        """Fills in metrics for `dealer_ids` (or every dealer) that aren't memoized yet."""
+        if self._complete:
+            return self
+        if dealer_ids is not None:
+            dealer_ids = [d for d in dealer_ids if d not in self._metrics]
+            if not dealer_ids:
+                return self
+
+        def scoped(qs, field):
+            return qs if dealer_ids is None else qs.filter(**{f"{field}__in": dealer_ids})
+
+        metrics = {} if dealer_ids is None else {d: DealerMetrics() for d in dealer_ids}
+
+        def entry(dealer_id):
+            if dealer_id not in metrics:
+                metrics[dealer_id] = DealerMetrics()
+            return metrics[dealer_id]
+
+        # 1. Traffic inside the window
+        views = scoped(CarView.objects.filter(self._window('timestamp')), 'car__dealer_id')
+        for row in views.values('car__dealer_id').annotate(n=Count('id')):
+            entry(row['car__dealer_id']).views = row['n']
+
+        leads = scoped(Lead.objects.filter(self._window('timestamp')), 'car__dealer_id')
+        for row in leads.values('car__dealer_id').annotate(
+            n=Count('id'),
+            whatsapp=Count('id', filter=Q(action_type='WHATSAPP')),
+            calls=Count('id', filter=Q(action_type='CALL')),
+        ):
+            m = entry(row['car__dealer_id'])
+            m.leads, m.whatsapp_clicks, m.calls = row['n'], row['whatsapp'], row['calls']
+
+        # 2. Stock snapshot, plus each dealer's oldest AVAILABLE car as the hot-car fallback
+        hot = {}
+        for row in scoped(Car.objects.all(), 'dealer_id').values('dealer_id').annotate(
+            total=Count('id'),
+            active=Count('id', filter=Q(status='AVAILABLE')),
+            sold=Count('id', filter=Q(status='SOLD')),
+            value=Sum('price', filter=Q(status='AVAILABLE')),
+            first_available=Min('id', filter=Q(status='AVAILABLE')),
+        ):
+            m = entry(row['dealer_id'])
+            m.total_cars, m.active_cars, m.sold_cars = row['total'], row['active'], row['sold']
+            m.inventory_value = row['value'] or 0
+            if row['first_available'] is not None:
+                hot[row['dealer_id']] = (row['first_available'], 0)
+
+        # 3. Hot car: most viewed AVAILABLE car in the window, lowest id on ties
+        viewed = scoped(CarView.objects.filter(self._window('timestamp'), car__status='AVAILABLE'), 'car__dealer_id')
+        for row in viewed.values('car_id', 'car__dealer_id').annotate(n=Count('id')):
+            best = hot.get(row['car__dealer_id'])
+            if best is None or (row['n'], -row['car_id']) > (best[1], -best[0]):
+                hot[row['car__dealer_id']] = (row['car_id'], row['n'])
+
+        cars = Car.objects.in_bulk([car_id for car_id, _ in hot.values()])
+        for dealer_id, (car_id, n) in hot.items():
+            m = entry(dealer_id)
+            m.hot_car, m.hot_car_views = cars.get(car_id), n
+
+        # 4. Plan prices for cost-per-lead
+        profiles = scoped(DealerProfile.objects.all(), 'user_id').values_list('user_id', 'plan_type')
+        for dealer_id, plan_type in profiles:
+            if dealer_id in metrics:
+                metrics[dealer_id].plan_cost = DealerProfile.PLAN_PRICES.get(plan_type, 0)
+
+        self._metrics.update(metrics)
+        self._complete = dealer_ids is None
+        return self
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.core.management import call_command
+from jobs.queue import task
+
+
+@task('users.send_email', priority=10)
+def send_email(subject, message, recipient_list, from_email=None, html_message=None):
+    """One transactional email; raising lets the queue retry it with backoff."""
+    msg = EmailMultiAlternatives(subject, message, from_email or settings.DEFAULT_FROM_EMAIL, recipient_list)
+    if html_message:
+        msg.attach_alternative(html_message, "text/html")
+    msg.send(fail_silently=False)
+
+
+@task('users.check_expiry')
+def check_expiry():
+    call_command('check_expiry')
+
+
+@task('users.weekly_report', max_attempts=1)  # Not retried: a half-finished run would re-mail dealers
+def weekly_report():
+    call_command('send_weekly_report')
+
+
+@task('users.monthly_report', max_attempts=1)
+def monthly_report():
+    call_command('send_monthly_report')
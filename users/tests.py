@@ -1,3 +1,94 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from buycars_project.testing import QueryBudgetMixin
+from cars.models import Car
+from cars.seeding import existing_dealers, seed
+from users.models import DealerProfile
 
-# Create your tests here.
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp(prefix='buycars-tests-')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, ALLOWED_HOSTS=['*'])
+class DashboardQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Account pages on a small seed_benchmark dataset; query counts must not grow with dealers or cars."""
+    @classmethod
+    def setUpTestData(cls):
+        seed(dealers=5, cars=100, views=500, leads=50, masters=4, log=lambda message: None)
+        cls.admin = User.objects.create(username='test_admin', is_superuser=True, is_staff=True)
+        cls.dealer = existing_dealers().order_by('id').first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_admin_dashboard(self):
+        self.client.force_login(self.admin)
+        self.assertQueryBudget('admin_dashboard')  # QUERY_BUDGETS entry
+
+    def test_profile_settings(self):
+        self.client.force_login(self.dealer)
+        self.assertQueryBudget('profile_settings', queries=10)
+
+
+class CheckExpiryTests(TestCase):
+    """check_expiry downgrades expired plans and hides the oldest AVAILABLE cars past the new limit."""
+    def dealer(self, username, plan, cars, expired=True, status='AVAILABLE'):
+        user = User.objects.create(username=username)
+        DealerProfile.objects.create(
+            user=user, business_name=username, plan_type=plan,
+            subscription_expiry=timezone.now() + timedelta(days=-1 if expired else 10),
+        )
+        start = timezone.now() - timedelta(days=30)
+        for n in range(cars):
+            car = Car.objects.create(dealer=user, make='Toyota', model='Vitz', year=2015, price=800_000, description='-', status=status)
+            Car.objects.filter(pk=car.pk).update(created_at=start + timedelta(days=n))  # Car n is the (n+1)th oldest
+        return user
+
+    def check_expiry(self, *args):
+        out = StringIO()
+        call_command('check_expiry', *args, stdout=out)
+        return out.getvalue()
+
+    def statuses(self, user):
+        return list(user.cars.order_by('created_at').values_list('status', flat=True))
+
+    def test_partial_downgrade_keeps_the_newest_cars(self):
+        pro = self.dealer('pro', 'PRO', 8)
+        self.check_expiry()
+        pro.dealer_profile.refresh_from_db()
+        self.assertEqual((pro.dealer_profile.plan_type, pro.dealer_profile.subscription_expiry), ('STARTER', None))
+        self.assertEqual(self.statuses(pro), ['HIDDEN'] * 3 + ['AVAILABLE'] * 5)
+
+    def test_starter_to_free_hides_everything(self):
+        starter = self.dealer('starter', 'STARTER', 3)
+        self.dealer('sold_out', 'STARTER', 2, status='SOLD')
+        self.check_expiry()
+        self.assertEqual(DealerProfile.objects.get(user=starter).plan_type, 'FREE')
+        self.assertEqual(self.statuses(starter), ['HIDDEN'] * 3)
+        self.assertEqual(set(Car.objects.filter(dealer__username='sold_out').values_list('status', flat=True)), {'SOLD'})
+
+    def test_dry_run_rolls_back(self):
+        lite = self.dealer('lite', 'LITE', 7)
+        out = self.check_expiry('--dry-run')
+        self.assertIn('Would downgrade 1 expired dealer(s): 1× LITE → STARTER', out)
+        self.assertIn('Would lock 2 excess vehicle(s)', out)
+        self.assertEqual(DealerProfile.objects.get(user=lite).plan_type, 'LITE')
+        self.assertEqual(self.statuses(lite), ['AVAILABLE'] * 7)
+
+    def test_dealers_within_limits_and_active_plans_are_left_alone(self):
+        small = self.dealer('small', 'LITE', 4)
+        active = self.dealer('active', 'PRO', 20, expired=False)
+        out = self.check_expiry()
+        self.assertIn('Inventory within limits', out)
+        self.assertEqual(self.statuses(small), ['AVAILABLE'] * 4)
+        self.assertEqual(DealerProfile.objects.get(user=active).plan_type, 'PRO')
+        self.assertEqual(self.statuses(active), ['AVAILABLE'] * 20)
+        self.assertIn('No expired subscriptions', self.check_expiry())  # Already downgraded: not again
@@ -7,7 +7,6 @@ from django.contrib import messages
 from django.db.models import Sum, Q, Count
 from django.utils import timezone
 from datetime import timedelta
-from django.core.management import call_command
 
 # --- DEBUGGING TOOLS IMPORTS ---
 from django.http import HttpResponse
@@ -19,6 +18,8 @@ from .models import DealerProfile, CustomerProfile
 from .forms import CustomUserCreationForm, UserUpdateForm, ProfileUpdateForm, CustomerSignUpForm
 from payments.models import Payment   
 from cars.models import Car, Lead, SearchTerm
+from cars import exports
+from jobs.scheduler import run_now
 
 User = get_user_model()
 
@@ -262,6 +263,20 @@ def admin_dashboard(request):
     }
     return render(request, 'users/admin_dashboard.html', context)
 
+# --- ACTION: EXPORT PAYMENTS ---
+@login_required
+@user_passes_test(is_superuser)
+def export_payments(request):
+    header = ['ID', 'Created', 'Updated', 'User', 'Phone', 'Amount (KES)', 'Plan', 'Booking ID', 'Status',
+              'M-Pesa Receipt', 'Checkout Request ID', 'Description']
+    fields = ['id', 'created_at', 'updated_at', 'user__username', 'phone_number', 'amount', 'plan_type', 'booking_id',
+              'status', 'mpesa_receipt_number', 'checkout_request_id', 'description']
+    payments = Payment.objects.order_by('-id')
+    if request.GET.get('status'):
+        payments = payments.filter(status=request.GET['status'])
+    filename = f"payments_{timezone.localdate():%Y-%m-%d}"
+    return exports.stream(filename, request.GET.get('format', 'csv'), header, exports.iterate(payments, fields))
+
 # --- ACTION: VERIFY DEALER ---
 @login_required
 @user_passes_test(is_superuser)
@@ -303,11 +318,12 @@ def trigger_weekly_report(request):
 
 @staff_member_required
 def trigger_subscription_check(request):
+    # Runs on the job workers like the scheduled check, never inside this request
     try:
-        call_command('check_expiry')
-        messages.success(request, "✅ SUCCESS: Subscription check complete.")
+        job = run_now('users.check_expiry')
+        messages.success(request, f"✅ SUCCESS: Subscription check queued (job #{job.pk}).")
     except Exception as e:
-        messages.error(request, f"❌ ERROR: Failed to check subscriptions. {e}")
+        messages.error(request, f"❌ ERROR: Failed to queue the subscription check. {e}")
     return redirect('admin_dashboard')
 
 # --- COMMENT ---
\ No newline at end of file
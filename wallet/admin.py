@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from django.utils import timezone
 from .models import Wallet, Transaction, PayoutRequest
+from .payouts import process_pending_payouts, reject_payouts
 
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
@@ -37,7 +39,7 @@ class PayoutRequestAdmin(admin.ModelAdmin):
     list_display = ('created_at', 'get_dealer', 'mpesa_number', 'get_amount', 'status_badge')
     list_filter = ('status', 'created_at')
     search_fields = ('wallet__user__username', 'mpesa_number')
-    actions = ['mark_as_processed', 'mark_as_rejected']
+    actions = ['disburse_selected', 'mark_as_processed', 'mark_as_rejected']
     ordering = ('-created_at',)
 
     def get_dealer(self, obj):
@@ -51,6 +53,7 @@ class PayoutRequestAdmin(admin.ModelAdmin):
     def status_badge(self, obj):
         colors = {
             'PENDING': 'orange',
+            'PROCESSING': 'steelblue',
             'PROCESSED': 'green',
             'REJECTED': 'red'
         }
@@ -62,15 +65,21 @@ class PayoutRequestAdmin(admin.ModelAdmin):
     status_badge.short_description = "Status"
 
     # --- ADMIN ACTIONS ---
+    def disburse_selected(self, request, queryset):
+        summary = process_pending_payouts(queryset=queryset)
+        self.message_user(
+            request,
+            f"Disbursed in {summary['batches']} batch(es): {summary['processed']} paid, "
+            f"{summary['rejected']} failed & refunded, {summary['unresolved']} awaiting confirmation."
+        )
+    disburse_selected.short_description = "Send selected via M-Pesa B2C"
+
     def mark_as_processed(self, request, queryset):
-        rows_updated = queryset.update(status='PROCESSED', processed_at=timezone.now())
+        rows_updated = queryset.filter(status__in=['PENDING', 'PROCESSING']).update(status='PROCESSED', processed_at=timezone.now())
         self.message_user(request, f"{rows_updated} request(s) marked as PROCESSED.")
     mark_as_processed.short_description = "Mark selected as PAID (Processed)"
 
     def mark_as_rejected(self, request, queryset):
-        # Note: In a real app, you might want to refund the wallet balance here
-        rows_updated = queryset.update(status='REJECTED')
-        self.message_user(request, f"{rows_updated} request(s) marked as REJECTED.")
-    mark_as_rejected.short_description = "Reject selected requests"
-    
-from django.utils import timezone
\ No newline at end of file
+        rows_updated = reject_payouts(queryset)
+        self.message_user(request, f"{rows_updated} request(s) marked as REJECTED and refunded.")
+    mark_as_rejected.short_description = "Reject selected requests (refund wallet)"
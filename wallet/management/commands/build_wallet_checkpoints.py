@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from wallet.models import Wallet
+from wallet.statement import build_checkpoints, CHECKPOINT_EVERY
+
+class Command(BaseCommand):
+    help = 'Writes running-balance checkpoints for wallet statements (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, default=CHECKPOINT_EVERY, help='Checkpoint at least every N transactions')
+
+    def handle(self, *args, **options):
+        every = max(options['every'], 1)
+        total = 0
+
+        for wallet in Wallet.objects.only('id').iterator(chunk_size=500):
+            total += build_checkpoints(wallet, every=every)
+
+        self.stdout.write(self.style.SUCCESS(f"Done. Created {total} balance checkpoints."))
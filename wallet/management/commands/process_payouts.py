@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from wallet.models import PayoutRequest
+from wallet.payouts import process_pending_payouts
+
+class Command(BaseCommand):
+    help = 'Disburses PENDING payout requests in batches via the configured B2C backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Payouts per disbursement batch (default: PAYOUT_BATCH_SIZE)')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many payouts')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what is waiting')
+
+    def handle(self, *args, **options):
+        pending = PayoutRequest.objects.filter(status='PENDING')
+
+        if options['dry_run']:
+            self.stdout.write(f"{pending.count()} payout(s) waiting for disbursement.")
+            return
+
+        summary = process_pending_payouts(batch_size=options['batch_size'], limit=options['limit'])
+
+        self.stdout.write(f"Batches sent: {summary['batches']}")
+        self.stdout.write(self.style.SUCCESS(f"✅ Paid: {summary['processed']}"))
+        if summary['rejected']:
+            self.stdout.write(self.style.ERROR(f"❌ Failed & refunded: {summary['rejected']}"))
+        if summary['unresolved']:
+            self.stdout.write(self.style.WARNING(f"⚠️ Awaiting confirmation (left PROCESSING): {summary['unresolved']}"))
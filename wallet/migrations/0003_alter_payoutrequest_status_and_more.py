@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0002_balancecheckpoint_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payoutrequest',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing (Sent to M-Pesa)'), ('PROCESSED', 'Processed'), ('REJECTED', 'Rejected')], default='PENDING', max_length=15),
+        ),
+        migrations.AddIndex(
+            model_name='payoutrequest',
+            index=models.Index(fields=['status', 'id'], name='wallet_payo_status_5b2627_idx'),
+        ),
+    ]
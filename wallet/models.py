@@ -24,12 +24,17 @@ class Transaction(models.Model):
     reference = models.CharField(max_length=100, null=True, blank=True) # e.g., Booking ID
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Keyset pagination for statements walks (wallet, id) newest-first
+        indexes = [models.Index(fields=['wallet', '-id'])]
+
     def __str__(self):
         return f"{self.transaction_type}: KES {self.amount}"
 
 class PayoutRequest(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing (Sent to M-Pesa)'),
         ('PROCESSED', 'Processed'),
         ('REJECTED', 'Rejected'),
     ]
@@ -40,4 +45,24 @@ class PayoutRequest(models.Model):
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='PENDING')
     admin_note = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    processed_at = models.DateTimeField(null=True, blank=True)
\ No newline at end of file
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'id'])]
+
+class BalanceCheckpoint(models.Model):
+    """
+    Snapshot of a wallet's running balance right after a given transaction.
+    Statements start summing from the nearest checkpoint instead of the first transaction.
+    """
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='checkpoints')
+    transaction = models.OneToOneField(Transaction, on_delete=models.CASCADE, related_name='checkpoint')
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-transaction_id']
+        indexes = [models.Index(fields=['wallet', 'transaction'])]
+
+    def __str__(self):
+        return f"{self.wallet.user.username} @ txn #{self.transaction_id}: KES {self.balance}"
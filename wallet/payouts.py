@@ -0,0 +1,224 @@
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Case, When, Value, DecimalField
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from buycars_project.metrics import track_call
+from .models import Wallet, Transaction, PayoutRequest
+
+
+@dataclass
+class PayoutResult:
+    payout_id: int
+    ok: bool
+    receipt: str = ''
+    error: str = ''
+
+
+# --- B2C BACKENDS ---
+
+class BaseB2CBackend:
+    """
+    Sends one disbursement batch to the payment provider.
+    Subclasses return one PayoutResult per payout in the batch, and should only raise
+    if the batch was never submitted (the engine re-queues it).
+    """
+    def disburse(self, payouts):
+        raise NotImplementedError
+
+
+class LocalB2CBackend(BaseB2CBackend):
+    """
+    Offline stand-in for M-Pesa B2C. Accepts any valid Kenyan number and fails the rest,
+    so the whole pipeline can be exercised without touching Safaricom.
+    """
+    def disburse(self, payouts):
+        results = []
+        for payout in payouts:
+            phone = normalize_msisdn(payout.mpesa_number)
+            if phone:
+                results.append(PayoutResult(payout.id, True, receipt=f"LCL{uuid.uuid4().hex[:7].upper()}"))
+            else:
+                results.append(PayoutResult(payout.id, False, error=f"Invalid M-Pesa number: {payout.mpesa_number}"))
+        return results
+
+
+def normalize_msisdn(phone):
+    """Returns 2547XXXXXXXX / 2541XXXXXXXX, or None if the number can't be paid."""
+    phone = str(phone or '').strip().replace(" ", "").replace("-", "").replace("+", "")
+    if phone.startswith('0'):
+        phone = '254' + phone[1:]
+    if phone.isdigit() and len(phone) == 12 and phone.startswith('254'):
+        return phone
+    return None
+
+
+def get_backend():
+    return import_string(settings.PAYOUT_BACKEND)()
+
+
+# --- SETTLEMENT ---
+
+def _refund_wallets(payouts, reason):
+    """
+    Credits each payout's amount back to its wallet: one UPDATE for all wallets
+    plus one bulk INSERT of refund transactions. Call inside a transaction.
+    """
+    totals = defaultdict(lambda: 0)
+    for payout in payouts:
+        totals[payout.wallet_id] += payout.amount
+    if not totals:
+        return
+
+    Wallet.objects.filter(id__in=totals).update(
+        balance=F('balance') + Case(
+            *[When(id=wallet_id, then=Value(amount)) for wallet_id, amount in totals.items()],
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+    )
+    Transaction.objects.bulk_create([
+        Transaction(
+            wallet_id=payout.wallet_id, amount=payout.amount, transaction_type='CREDIT',
+            description=f"Payout Refund ({reason})"[:255], reference=f"Payout #{payout.id}",
+        ) for payout in payouts
+    ], batch_size=1000)
+
+
+def reject_payouts(queryset, note="Rejected by admin"):
+    """
+    Rejects PENDING payouts, and PROCESSING ones the provider never confirmed
+    (check the B2C account first: a rejected payout is refunded to the wallet).
+    Returns the number of payouts rejected.
+    """
+    with transaction.atomic():
+        payouts = list(queryset.select_for_update().filter(status__in=('PENDING', 'PROCESSING')).only('id', 'wallet_id', 'amount'))
+        if not payouts:
+            return 0
+        PayoutRequest.objects.filter(id__in=[p.id for p in payouts]).update(
+            status='REJECTED', admin_note=note, processed_at=timezone.now()
+        )
+        _refund_wallets(payouts, note)
+    return len(payouts)
+
+
+def request_payout(wallet, amount, mpesa_number):
+    """
+    Holds `amount` from the wallet and files a PENDING payout for it. The balance check
+    and the debit are one conditional UPDATE, so concurrent withdrawals can't overdraw
+    and concurrent refunds aren't overwritten. Returns the PayoutRequest, or None if
+    the balance is too low.
+    """
+    with transaction.atomic():
+        held = Wallet.objects.filter(pk=wallet.pk, balance__gte=amount).update(balance=F('balance') - amount)
+        if not held:
+            return None
+        payout = PayoutRequest.objects.create(wallet=wallet, amount=amount, mpesa_number=mpesa_number)
+        Transaction.objects.create(
+            wallet=wallet, amount=amount, transaction_type='DEBIT',
+            description="Payout Request", reference="Pending Approval",
+        )
+    return payout
+
+
+def credit_wallet(wallet, amount, description, reference=''):
+    """Adds earnings to a wallet with an F() UPDATE (no read-modify-write) and records the CREDIT."""
+    with transaction.atomic():
+        Wallet.objects.filter(pk=wallet.pk).update(
+            balance=F('balance') + amount, total_earned=F('total_earned') + amount,
+        )
+        Transaction.objects.create(
+            wallet=wallet, amount=amount, transaction_type='CREDIT', description=description, reference=reference,
+        )
+
+
+def _claim_batch(batch_size, queryset=None):
+    """
+    Locks up to `batch_size` PENDING payouts and flips them to PROCESSING so no other
+    run (or admin action) can pick them up while the provider call is in flight.
+    """
+    qs = queryset if queryset is not None else PayoutRequest.objects.all()
+    with transaction.atomic():
+        batch = list(
+            qs.select_for_update(skip_locked=True)
+            .filter(status='PENDING')
+            .order_by('id')
+            .only('id', 'wallet_id', 'amount', 'mpesa_number')[:batch_size]
+        )
+        if batch:
+            PayoutRequest.objects.filter(id__in=[p.id for p in batch]).update(status='PROCESSING')
+    return batch
+
+
+def _settle_batch(batch, results):
+    by_id = {p.id: p for p in batch}
+    now = timezone.now()
+    paid, failed = [], []
+
+    for result in results:
+        payout = by_id.pop(result.payout_id, None)
+        if payout is None:
+            continue
+        payout.processed_at = now
+        if result.ok:
+            payout.status = 'PROCESSED'
+            payout.admin_note = f"B2C receipt {result.receipt}"
+            paid.append(payout)
+        else:
+            payout.status = 'REJECTED'
+            payout.admin_note = result.error or "Disbursement failed"
+            failed.append(payout)
+
+    # Payouts the backend said nothing about stay PROCESSING for a human to check;
+    # retrying them automatically could pay a dealer twice.
+    with transaction.atomic():
+        # An admin may have rejected (and refunded) some while the provider call was in flight
+        still_processing = set(PayoutRequest.objects.select_for_update().filter(
+            id__in=[p.id for p in paid + failed], status='PROCESSING',
+        ).values_list('id', flat=True))
+        paid = [p for p in paid if p.id in still_processing]
+        failed = [p for p in failed if p.id in still_processing]
+        PayoutRequest.objects.bulk_update(paid + failed, ['status', 'admin_note', 'processed_at'], batch_size=1000)
+        _refund_wallets(failed, "Disbursement failed")
+
+    return len(paid), len(failed), len(by_id)
+
+
+def process_pending_payouts(batch_size=None, limit=None, backend=None, queryset=None):
+    """
+    Clears PENDING payouts in disbursement batches: claim -> disburse -> settle/refund.
+    The provider call happens outside any DB transaction; each settlement is atomic.
+    Returns a dict of counts.
+    """
+    backend = backend or get_backend()
+    batch_size = batch_size or settings.PAYOUT_BATCH_SIZE
+    summary = {'batches': 0, 'processed': 0, 'rejected': 0, 'unresolved': 0}
+
+    while True:
+        done = summary['processed'] + summary['rejected'] + summary['unresolved']
+        if limit is not None and done >= limit:
+            break
+        size = batch_size if limit is None else min(batch_size, limit - done)
+
+        batch = _claim_batch(size, queryset)
+        if not batch:
+            break
+
+        try:
+            with track_call('mpesa', 'b2c'):
+                results = backend.disburse(batch)
+        except Exception as e:
+            # Nothing left the building: put the batch back in the queue
+            PayoutRequest.objects.filter(id__in=[p.id for p in batch], status='PROCESSING').update(status='PENDING')
+            print(f"Payout batch failed: {e}")
+            raise
+
+        paid, failed, unresolved = _settle_batch(batch, results)
+        summary['batches'] += 1
+        summary['processed'] += paid
+        summary['rejected'] += failed
+        summary['unresolved'] += unresolved
+
+    return summary
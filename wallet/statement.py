@@ -0,0 +1,104 @@
+from decimal import Decimal
+from django.db.models import Sum, Case, When, F, DecimalField
+from django.utils import timezone
+from .models import Transaction, BalanceCheckpoint
+
+# Write a checkpoint at least this often (in transactions), plus one at each day boundary
+CHECKPOINT_EVERY = 100
+STATEMENT_PAGE_SIZE = 25
+
+
+def signed(txn):
+    """CREDITs add to the balance, DEBITs (payouts) take away."""
+    return -txn.amount if txn.transaction_type == 'DEBIT' else txn.amount
+
+
+def ledger_sum(queryset):
+    """
+    Net effect of a set of transactions, summed in the database.
+    """
+    signed_amount = Case(
+        When(transaction_type='DEBIT', then=-F('amount')),
+        default=F('amount'),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    return queryset.aggregate(total=Sum(signed_amount))['total'] or Decimal('0.00')
+
+
+def balance_after(wallet, txn_id):
+    """
+    Running balance immediately after transaction `txn_id`.
+    Starts from the nearest checkpoint at or before it, so only the gap is summed.
+    """
+    checkpoint = BalanceCheckpoint.objects.filter(
+        wallet=wallet, transaction_id__lte=txn_id
+    ).order_by('-transaction_id').only('transaction_id', 'balance').first()
+
+    base = checkpoint.balance if checkpoint else Decimal('0.00')
+    start_id = checkpoint.transaction_id if checkpoint else 0
+    if start_id == txn_id:
+        return base
+
+    gap = Transaction.objects.filter(wallet=wallet, id__gt=start_id, id__lte=txn_id)
+    return base + ledger_sum(gap)
+
+
+def statement_page(wallet, before=None, limit=STATEMENT_PAGE_SIZE):
+    """
+    One page of a wallet statement, newest first, keyset-paginated on transaction id.
+    Each transaction gets a `running_balance` attribute (balance after it was applied).
+    Returns (transactions, next_cursor); pass next_cursor back as `before` for the older page.
+    """
+    qs = Transaction.objects.filter(wallet=wallet).order_by('-id')
+    if before:
+        qs = qs.filter(id__lt=before)
+
+    rows = list(qs[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if rows:
+        running = balance_after(wallet, rows[0].id)
+        for txn in rows:
+            txn.running_balance = running
+            running -= signed(txn)
+
+    next_cursor = rows[-1].id if has_more else None
+    return rows, next_cursor
+
+
+def build_checkpoints(wallet, every=CHECKPOINT_EVERY):
+    """
+    Writes checkpoints for transactions recorded since the wallet's last checkpoint:
+    one every `every` transactions, and one on the last transaction of each day.
+    Returns the number of checkpoints created.
+    """
+    last = BalanceCheckpoint.objects.filter(wallet=wallet).order_by('-transaction_id').first()
+    running = last.balance if last else Decimal('0.00')
+    start_id = last.transaction_id if last else 0
+
+    pending = Transaction.objects.filter(wallet=wallet, id__gt=start_id).order_by('id').only(
+        'id', 'amount', 'transaction_type', 'created_at'
+    )
+
+    new_checkpoints = []
+    since_last = 0
+    prev, prev_balance = None, running
+
+    for txn in pending.iterator(chunk_size=2000):
+        # Close the previous day before applying the first transaction of a new one
+        if prev and since_last and timezone.localdate(txn.created_at) != timezone.localdate(prev.created_at):
+            new_checkpoints.append(BalanceCheckpoint(wallet=wallet, transaction_id=prev.id, balance=prev_balance))
+            since_last = 0
+
+        running += signed(txn)
+        since_last += 1
+
+        if since_last >= every:
+            new_checkpoints.append(BalanceCheckpoint(wallet=wallet, transaction_id=txn.id, balance=running))
+            since_last = 0
+
+        prev, prev_balance = txn, running
+
+    BalanceCheckpoint.objects.bulk_create(new_checkpoints, batch_size=1000)
+    return len(new_checkpoints)
@@ -0,0 +1,15 @@
+from django.core.management import call_command
+from jobs.queue import task
+from .payouts import process_pending_payouts
+
+
+@task('wallet.process_payouts', max_attempts=1)  # The engine re-queues unsent batches itself
+def process_payouts(limit=None):
+    summary = process_pending_payouts(limit=limit)
+    print(f"Payouts: {summary['processed']} paid, {summary['rejected']} rejected, {summary['unresolved']} unresolved")
+
+
+@task('wallet.build_checkpoints', max_attempts=2)
+def build_checkpoints():
+    """Daily running-balance checkpoints, so statements never fall back to summing whole histories."""
+    call_command('build_wallet_checkpoints')
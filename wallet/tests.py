@@ -1,3 +1,128 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from jobs.queue import REGISTRY
+from .models import BalanceCheckpoint, PayoutRequest, Transaction, Wallet
+from .payouts import (
+    LocalB2CBackend, PayoutResult, _claim_batch, _settle_batch, credit_wallet, process_pending_payouts,
+    reject_payouts, request_payout,
+)
+from .statement import balance_after, build_checkpoints, ledger_sum, statement_page
 
-# Create your tests here.
+User = get_user_model()
+
+
+class CheckpointTests(TestCase):
+    def setUp(self):
+        self.wallet = Wallet.objects.create(user=User.objects.create(username='dealer'))
+        for i in range(1, 11):
+            Transaction.objects.create(
+                wallet=self.wallet, amount=Decimal(100 * i), description=f"txn {i}",
+                transaction_type='DEBIT' if i % 4 == 0 else 'CREDIT',
+            )
+        self.txns = list(Transaction.objects.filter(wallet=self.wallet).order_by('id'))
+
+    def full_scan(self, txn):
+        return ledger_sum(Transaction.objects.filter(wallet=self.wallet, id__lte=txn.id))
+
+    def test_checkpoint_holds_the_running_balance(self):
+        self.assertEqual(build_checkpoints(self.wallet, every=3), 3)
+        for checkpoint in BalanceCheckpoint.objects.filter(wallet=self.wallet):
+            self.assertEqual(checkpoint.balance, self.full_scan(checkpoint.transaction))
+
+    def test_balance_after_matches_a_full_scan(self):
+        build_checkpoints(self.wallet, every=3)
+        for txn in self.txns:
+            self.assertEqual(balance_after(self.wallet, txn.id), self.full_scan(txn))
+
+    def test_later_runs_continue_from_the_last_checkpoint(self):
+        build_checkpoints(self.wallet, every=4)
+        extra = Transaction.objects.create(wallet=self.wallet, amount=Decimal('55.50'), transaction_type='CREDIT', description='late')
+        build_checkpoints(self.wallet, every=1)
+        self.assertEqual(BalanceCheckpoint.objects.get(transaction=extra).balance, self.full_scan(extra))
+
+    def test_statement_running_balances(self):
+        build_checkpoints(self.wallet, every=3)
+        rows, cursor = statement_page(self.wallet, limit=4)
+        older, _ = statement_page(self.wallet, before=cursor, limit=4)
+        for txn in rows + older:
+            self.assertEqual(txn.running_balance, self.full_scan(txn))
+
+    def test_scheduled_task_closes_each_day(self):
+        yesterday = self.txns[4]
+        Transaction.objects.filter(id__lte=yesterday.id).update(created_at=timezone.now() - timedelta(days=1))
+        REGISTRY['wallet.build_checkpoints']()
+        checkpoint = BalanceCheckpoint.objects.get(wallet=self.wallet)
+        self.assertEqual(checkpoint.transaction_id, yesterday.id)
+        self.assertEqual(checkpoint.balance, self.full_scan(yesterday))
+
+
+class PayoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='payee')
+        self.wallet = Wallet.objects.create(user=self.user, balance=Decimal('1000.00'))
+
+    def balance(self):
+        return Wallet.objects.get(pk=self.wallet.pk).balance
+
+    def test_withdrawal_holds_the_amount(self):
+        payout = request_payout(self.wallet, Decimal('600'), '0712345678')
+        self.assertEqual(payout.status, 'PENDING')
+        self.assertEqual(self.balance(), Decimal('400.00'))
+        self.assertTrue(Transaction.objects.filter(wallet=self.wallet, transaction_type='DEBIT', amount=600).exists())
+
+    def test_second_withdrawal_cannot_overdraw(self):
+        # Both requests saw the same 1000 balance; only one may pass
+        stale = Wallet.objects.get(pk=self.wallet.pk)
+        self.assertIsNotNone(request_payout(self.wallet, Decimal('700'), '0712345678'))
+        self.assertIsNone(request_payout(stale, Decimal('700'), '0712345678'))
+        self.assertEqual(self.balance(), Decimal('300.00'))
+        self.assertEqual(PayoutRequest.objects.count(), 1)
+
+    def test_credit_does_not_overwrite_a_concurrent_refund(self):
+        stale = Wallet.objects.get(pk=self.wallet.pk)
+        payout = request_payout(self.wallet, Decimal('500'), '0712345678')
+        reject_payouts(PayoutRequest.objects.filter(pk=payout.pk))
+        credit_wallet(stale, Decimal('250'), 'Rental')
+        self.assertEqual(self.balance(), Decimal('1250.00'))
+        self.assertEqual(Wallet.objects.get(pk=self.wallet.pk).total_earned, Decimal('250.00'))
+
+    def test_withdraw_view(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('dealer_wallet'), {'amount': '5000', 'phone': '0712345678'})
+        self.assertEqual(self.balance(), Decimal('1000.00'))
+        self.client.post(reverse('dealer_wallet'), {'amount': 'abc', 'phone': '0712345678'})
+        self.assertEqual(self.balance(), Decimal('1000.00'))
+        response = self.client.post(reverse('dealer_wallet'), {'amount': '800', 'phone': '0712345678'})
+        self.assertRedirects(response, reverse('dealer_wallet'), fetch_redirect_response=False)
+        self.assertEqual(self.balance(), Decimal('200.00'))
+
+    def test_stuck_processing_payout_can_be_rejected_and_refunded(self):
+        payout = request_payout(self.wallet, Decimal('600'), '0712345678')
+        PayoutRequest.objects.filter(pk=payout.pk).update(status='PROCESSING')
+        self.assertEqual(reject_payouts(PayoutRequest.objects.all(), note="No B2C receipt"), 1)
+        self.assertEqual(PayoutRequest.objects.get(pk=payout.pk).status, 'REJECTED')
+        self.assertEqual(self.balance(), Decimal('1000.00'))
+        # Already rejected: a second rejection refunds nothing
+        self.assertEqual(reject_payouts(PayoutRequest.objects.all()), 0)
+        self.assertEqual(self.balance(), Decimal('1000.00'))
+
+    def test_late_provider_failure_after_rejection_is_not_refunded_twice(self):
+        payout = request_payout(self.wallet, Decimal('600'), '0712345678')
+        batch = _claim_batch(10)
+        reject_payouts(PayoutRequest.objects.filter(pk=payout.pk))
+        _settle_batch(batch, [PayoutResult(payout.id, False, error='Timed out')])
+        self.assertEqual(PayoutRequest.objects.get(pk=payout.pk).status, 'REJECTED')
+        self.assertEqual(self.balance(), Decimal('1000.00'))
+
+    def test_disbursement_settles_and_refunds_failures(self):
+        good = request_payout(self.wallet, Decimal('300'), '0712345678')
+        bad = request_payout(self.wallet, Decimal('200'), 'not-a-number')
+        summary = process_pending_payouts(backend=LocalB2CBackend())
+        self.assertEqual((summary['processed'], summary['rejected']), (1, 1))
+        self.assertEqual(PayoutRequest.objects.get(pk=good.pk).status, 'PROCESSED')
+        self.assertEqual(PayoutRequest.objects.get(pk=bad.pk).status, 'REJECTED')
+        self.assertEqual(self.balance(), Decimal('700.00'))
@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('', views.dealer_wallet, name='dealer_wallet'),
+    path('statement/', views.wallet_statement, name='wallet_statement'),
 ]
\ No newline at end of file
@@ -2,42 +2,64 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Sum
-from .models import Wallet, Transaction, PayoutRequest
-from decimal import Decimal
+from django.http import JsonResponse
+from .models import Wallet
+from .payouts import request_payout
+from .statement import statement_page, STATEMENT_PAGE_SIZE
+from decimal import Decimal, InvalidOperation
+
+def _cursor(request):
+    before = request.GET.get('before')
+    return int(before) if before and before.isdigit() else None
 
 @login_required
 def dealer_wallet(request):
     wallet, created = Wallet.objects.get_or_create(user=request.user)
-    transactions = Transaction.objects.filter(wallet=wallet).order_by('-created_at')
+    transactions, next_cursor = statement_page(wallet, before=_cursor(request))
     
     if request.method == 'POST':
-        amount = Decimal(request.POST.get('amount'))
+        try:
+            amount = Decimal(request.POST.get('amount'))
+        except (InvalidOperation, TypeError):
+            amount = None
         phone = request.POST.get('phone')
         
-        if amount > wallet.balance:
-            messages.error(request, "Insufficient balance.")
+        if amount is None or not amount.is_finite():
+            messages.error(request, "Enter a valid amount.")
         elif amount < 500:
             messages.error(request, "Minimum withdrawal is KES 500.")
+        # Held from the wallet immediately (to prevent double withdraw)
+        elif request_payout(wallet, amount, phone) is None:
+            messages.error(request, "Insufficient balance.")
         else:
-            # Create Payout Request
-            PayoutRequest.objects.create(wallet=wallet, amount=amount, mpesa_number=phone)
-            
-            # Deduct from Wallet immediately (to prevent double withdraw)
-            wallet.balance -= amount
-            wallet.save()
-            
-            # Record Debit Transaction
-            Transaction.objects.create(
-                wallet=wallet,
-                amount=amount,
-                transaction_type='DEBIT',
-                description="Payout Request",
-                reference="Pending Approval"
-            )
             messages.success(request, "Withdrawal request received! We will process it shortly.")
             return redirect('dealer_wallet')
 
     return render(request, 'dealer/wallet.html', {
         'wallet': wallet,
-        'transactions': transactions
+        'transactions': transactions,
+        'next_cursor': next_cursor,
+    })
+
+# --- API: KEYSET-PAGINATED STATEMENT ---
+@login_required
+def wallet_statement(request):
+    wallet, created = Wallet.objects.get_or_create(user=request.user)
+    try:
+        limit = min(int(request.GET.get('limit', STATEMENT_PAGE_SIZE)), 200)
+    except ValueError:
+        limit = STATEMENT_PAGE_SIZE
+
+    transactions, next_cursor = statement_page(wallet, before=_cursor(request), limit=max(limit, 1))
+    return JsonResponse({
+        'transactions': [{
+            'id': txn.id,
+            'date': txn.created_at.isoformat(),
+            'type': txn.transaction_type,
+            'amount': str(txn.amount),
+            'description': txn.description,
+            'reference': txn.reference,
+            'running_balance': str(txn.running_balance),
+        } for txn in transactions],
+        'next_cursor': next_cursor,
     })
\ No newline at end of file